@@ -3,16 +3,40 @@
 The main program that is the entry point for the SeedboxManager application.
 Provides the ability to configure and start up processing.
 """
+import logging
 import os
 import tempfile
 
-import lockfile
+from oslo_config import cfg
 
+from seedbox.common import lock
 from seedbox import process
 from seedbox import service
 
+LOG = logging.getLogger(__name__)
+
+cfg.CONF.import_opt('command', 'seedbox.options')
+cfg.CONF.import_opt('lock_wait', 'seedbox.options')
+cfg.CONF.import_opt('lock_stale_after', 'seedbox.options')
+
+LOCK_PATH = os.path.join(tempfile.gettempdir(), __package__ + '.lock')
+
+
+def _process():
+    try:
+        with lock.SingletonLock(LOCK_PATH,
+                                wait=cfg.CONF.lock_wait) as run_lock:
+            # time to start processing
+            process.start(heartbeat=run_lock.heartbeat)
+    except lock.AlreadyLocked as held:
+        if (cfg.CONF.lock_stale_after and
+                lock.is_stale(held.record, cfg.CONF.lock_stale_after)):
+            LOG.warning('%s; no progress since %s, possibly stuck', held,
+                        held.record['heartbeat_at'])
+        else:
+            LOG.info('%s; exiting', held)
+
 
-@lockfile.locked(os.path.join(tempfile.gettempdir(), __package__), timeout=10)
 def main():
     """Entry point for seedmgr"""
 
@@ -21,5 +45,9 @@ def main():
     # the info
     service.prepare_service()
 
-    # time to start processing
-    process.start()
+    if cfg.CONF.command == 'worker':
+        # any number of workers run alongside each other
+        from seedbox.process import worker
+        worker.run()
+    else:
+        _process()
@@ -0,0 +1,141 @@
+"""Ensures a single instance of a process runs at a time.
+
+The lock is an exclusive ``flock`` held on a file for as long as the
+process runs; released by the operating system when the process exits, even
+when killed, so a stale lock never has to be cleaned up. Acquiring fails
+immediately when already held, or waits for the lock to be released.
+
+While held, the file records the pid of the holder along with when it
+started and when it last reported progress (heartbeat), such that a stuck
+process can be detected.
+"""
+import datetime
+import errno
+import fcntl
+import json
+import logging
+import os
+import socket
+
+from seedbox.common import timeutil
+
+LOG = logging.getLogger(__name__)
+
+DATE_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
+
+class AlreadyLocked(Exception):
+    """Represents when the lock is held by another process.
+
+    :param dict record: details recorded by the holder of the lock
+    """
+    def __init__(self, record):
+        self.record = record
+        super(AlreadyLocked, self).__init__(
+            'lock held by pid {0} on {1} since {2}'.format(
+                record.get('pid'), record.get('host'),
+                record.get('started_at')))
+
+
+def read_record(path):
+    """Reads the details recorded by the holder of the lock.
+
+    :param str path: location of the lock file
+    :return: pid, host, started_at and heartbeat_at of the holder; empty
+             when not recorded
+    :rtype: dict
+    """
+    try:
+        with open(path) as lock_file:
+            record = json.loads(lock_file.read() or '{}')
+    except (IOError, ValueError):
+        return {}
+    for name in ('started_at', 'heartbeat_at'):
+        if record.get(name):
+            record[name] = datetime.datetime.strptime(record[name],
+                                                      DATE_FORMAT)
+    return record
+
+
+def is_stale(record, seconds):
+    """Checks if the holder of the lock has not reported progress recently.
+
+    :param dict record: details recorded by the holder of the lock
+    :param int seconds: seconds without a heartbeat
+    :return: flag indicating the holder appears stuck
+    :rtype: boolean
+    """
+    heartbeat_at = record.get('heartbeat_at')
+    return heartbeat_at is not None and timeutil.is_older_than(heartbeat_at,
+                                                               seconds)
+
+
+class SingletonLock(object):
+    """An exclusive lock held on a file.
+
+    ::
+
+        with SingletonLock('/tmp/seedbox.lock') as lock:
+            ...
+            lock.heartbeat()
+
+    :param str path: location of the lock file
+    :param bool wait: flag to wait for the lock to be released; otherwise
+                      :class:`AlreadyLocked` is raised immediately
+    """
+
+    def __init__(self, path, wait=False):
+        self.path = path
+        self.wait = wait
+        self._file = None
+        self._started_at = None
+
+    def acquire(self):
+        """Acquires the lock.
+
+        :raises: :class:`AlreadyLocked` when held by another process
+        """
+        # opened without truncating so the record of the holder remains
+        lock_file = open(self.path, 'a+')
+        flags = fcntl.LOCK_EX if self.wait else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            fcntl.flock(lock_file.fileno(), flags)
+        except (IOError, OSError) as err:
+            lock_file.close()
+            if err.errno not in (errno.EAGAIN, errno.EACCES):
+                raise
+            raise AlreadyLocked(read_record(self.path))
+
+        self._file = lock_file
+        self._started_at = timeutil.utcnow()
+        self.heartbeat()
+
+    def heartbeat(self):
+        """Records the holder of the lock is still making progress."""
+        if self._file is None:
+            return
+        record = {'pid': os.getpid(),
+                  'host': socket.gethostname(),
+                  'started_at': self._started_at.strftime(DATE_FORMAT),
+                  'heartbeat_at': timeutil.utcnow().strftime(DATE_FORMAT)}
+        self._file.seek(0)
+        self._file.truncate()
+        self._file.write(json.dumps(record))
+        self._file.flush()
+
+    def release(self):
+        """Releases the lock."""
+        if self._file is None:
+            return
+        self._file.seek(0)
+        self._file.truncate()
+        fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        self._file.close()
+        self._file = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
@@ -75,4 +75,5 @@ def total_seconds(delta):
 
 
 # Defined here such that total_seconds is properly defined prior to usage
+ONE_DAY = total_seconds(datetime.timedelta(days=1))
 ONE_WEEK = total_seconds(datetime.timedelta(weeks=1))
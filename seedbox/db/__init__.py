@@ -1,5 +1,6 @@
 """Provides access to database API for interacting with the torrent data."""
 import logging
+import os
 
 from oslo_config import cfg
 import six.moves.urllib.parse as urlparse
@@ -17,12 +18,29 @@ _DBAPI = {}
 
 def _get_connection(conf):
     """Load the configured engine and return an instance."""
-    engine_name = urlparse.urlparse(conf.database.connection).scheme
+    # scheme may name the python driver as well, e.g. postgresql+psycopg2
+    engine_name = urlparse.urlparse(
+        conf.database.connection).scheme.split('+')[0]
     LOG.debug('looking for %s driver in %s', engine_name, DB_ENGINE_NAMESPACE)
     mgr = driver.DriverManager(DB_ENGINE_NAMESPACE, engine_name)
     return mgr.driver(conf)
 
 
+def init_worker():
+    """Prepares a worker process for accessing the database.
+
+    Used as the initializer of a process pool. The database API inherited
+    from the parent process is discarded without closing the connections
+    the parent still uses; the worker creates its own database API, with
+    its own connections, on first use.
+    """
+    inherited = _DBAPI.pop(DB_ENGINE_NAMESPACE, None)
+    if inherited is not None:
+        inherited.impl.dispose(close=False)
+    _DBAPI['pid'] = os.getpid()
+    _DBAPI['worker'] = True
+
+
 def dbapi(conf=cfg.CONF):
     """Retrieves an instance of the configured database API.
 
@@ -31,7 +49,17 @@ def dbapi(conf=cfg.CONF):
     :return: database API instance
     :rtype: :class:`~seedbox.db.api.DBApi`
     """
-    if not _DBAPI:
+    pid = os.getpid()
+    if _DBAPI.get('pid', pid) != pid:
+        # forked without using init_worker
+        init_worker()
+
+    if DB_ENGINE_NAMESPACE not in _DBAPI:
         _DBAPI[DB_ENGINE_NAMESPACE] = api.DBApi(_get_connection(conf))
-        _DBAPI[DB_ENGINE_NAMESPACE].shrink_db()
+        _DBAPI['pid'] = pid
+        # maintenance is left to the parent process
+        if not _DBAPI.get('worker'):
+            _DBAPI[DB_ENGINE_NAMESPACE].shrink_db_if_needed(
+                conf.database.vacuum_free_ratio,
+                conf.database.vacuum_interval)
     return _DBAPI[DB_ENGINE_NAMESPACE]
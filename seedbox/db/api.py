@@ -3,16 +3,26 @@
 Public facing database api that leverages a provided implementation to
 execute database operations.
 """
+import datetime
 import logging
-import os
+import time
+import uuid
 
 from seedbox.common import timeutil
 from seedbox import constants
 from seedbox.db import models
+from seedbox.db import retention
 
 LOG = logging.getLogger(__name__)
 
 
+def _copy_appstate(appstate):
+    # callers are free to modify the instance returned
+    if appstate is None:
+        return None
+    return models.AppState(appstate.name, appstate.value)
+
+
 class DBApi(object):
     """Provides API for supported database operations.
 
@@ -22,9 +32,15 @@ class DBApi(object):
 
     def __init__(self, impl):
         self.impl = impl
+        # (appstate, expires at) by name; saves and deletes made through
+        # the api are written through. Not found is not cached, so an
+        # appstate created by another process is read on the next lookup.
+        self._appstates = {}
+        self._appstate_ttl = impl.conf.database.appstate_cache_ttl
 
     def clear(self):
         """Clears all data from database."""
+        self._appstates.clear()
         self.impl.clear()
 
     def backup(self):
@@ -35,6 +51,45 @@ class DBApi(object):
         """Shrink database."""
         self.impl.shrink_db()
 
+    def shrink_db_if_needed(self, free_ratio, interval):
+        """Shrink database only when worthwhile.
+
+        Space is reclaimed when the ratio of unused pages exceeds the
+        threshold, or once the interval since space was last reclaimed
+        passes.
+
+        :param float free_ratio: ratio of unused pages to total pages above
+                                 which space is reclaimed
+        :param int interval: days between reclaiming space; 0 to disable
+        :return: flag indicating space was reclaimed
+        :rtype: boolean
+        """
+        lvd = self.get_appstate('last_vacuum_date')
+        last_vacuum_date = lvd.value if lvd else None
+        ratio = self.impl.free_page_ratio()
+        LOG.debug('last_vacuum_date: %s free page ratio: %.2f',
+                  last_vacuum_date, ratio)
+
+        required = ratio > free_ratio
+        if interval and last_vacuum_date is not None:
+            required = required or timeutil.is_older_than(
+                last_vacuum_date, interval * timeutil.ONE_DAY)
+
+        if required:
+            LOG.info('reclaiming unused database space')
+            size = self.impl.db_size()
+            self.shrink_db()
+            reclaimed = max(size - self.impl.db_size(), 0)
+            LOG.info('database space reclaimed: %d bytes', reclaimed)
+            self.save_appstate(models.AppState('last_vacuum_reclaimed',
+                                               reclaimed))
+
+        if required or last_vacuum_date is None:
+            # never been shrunk so start the interval from today
+            self.save_appstate(models.AppState('last_vacuum_date',
+                                               timeutil.utcnow()))
+        return required
+
     def save_torrent(self, torrent):
         """Performs save (insert/update) operation on an instance of torrent.
 
@@ -51,8 +106,22 @@ class DBApi(object):
 
         :param value_map: data attributes and values to update
         :param qfilter: query filter to determine instances to update
+        :return: total torrents updated
+        :rtype: int
+        """
+        return self.impl.bulk_update(value_map, models.Torrent, qfilter)
+
+    def purge_torrents(self, qfilter, limit):
+        """Deletes the media files of torrents and marks the torrents purged.
+
+        Both within a single transaction.
+
+        :param qfilter: query filter to determine torrents to purge
+        :param int limit: maximum torrents purged
+        :return: total torrents purged and media files deleted
+        :rtype: tuple
         """
-        self.impl.bulk_update(value_map, models.Torrent, qfilter)
+        return self.impl.purge(qfilter, limit)
 
     def delete_torrent(self, torrent):
         """Performs delete operation on specific instance of torrent.
@@ -65,33 +134,44 @@ class DBApi(object):
         """Performs delete operation on selection of torrent instances.
 
         :param qfilter: query filter to determine instances to delete.
+        :return: total torrents deleted
+        :rtype: int
         """
-        self.impl.delete_by(models.Torrent, qfilter)
+        return self.impl.delete_by(models.Torrent, qfilter)
 
-    def get_torrents(self, qfilter):
+    def get_torrents(self, qfilter, with_media=True):
         """Perform select operation on selection of torrent instances.
 
+        When media files are not loaded the media_files of each torrent is
+        None, and saving the torrent leaves its media files unchanged.
+
         :param qfilter: query filter to determine instances to fetch.
+        :param bool with_media: flag indicating to load the media files
         :return: torrent instance(s)
         :rtype: :class:`~seedbox.db.models.Torrent`
         """
-        return self.impl.fetch_by(models.Torrent, qfilter)
+        return self.impl.fetch_by(models.Torrent, qfilter, with_media)
 
-    def get_torrents_active(self):
+    def get_torrents_active(self, with_media=True):
         """Retrieves active torrents.
 
         Perform select operation using a pre-defined criteria for what
-        constitutes an active torrent.
+        constitutes an active torrent. Torrents waiting to be retried are
+        excluded until the time of the retry is reached.
 
+        :param bool with_media: flag indicating to load the media files
         :return: torrent instance(s)
         :rtype: :class:`~seedbox.db.models.Torrent`
         """
         qfilter = {'and': [{'=': {'invalid': False}},
                            {'=': {'purged': False}},
                            {'=': {'failed': False}},
-                           {'in': {'state': constants.ACTIVE_STATES}}
+                           {'in': {'state': constants.ACTIVE_STATES}},
+                           {'or': [{'=': {'retry_at': None}},
+                                   {'<=': {'retry_at': timeutil.utcnow()}}
+                                   ]}
                            ]}
-        return self.get_torrents(qfilter)
+        return self.get_torrents(qfilter, with_media)
 
     def get_torrents_by_state(self, state, failed=False):
         """Retrieve torrents by specified state.
@@ -118,11 +198,7 @@ class DBApi(object):
         :return: torrent instance(s)
         :rtype: :class:`~seedbox.db.models.Torrent`
         """
-        qfilter = {'and': [{'=': {'invalid': False}},
-                           {'=': {'purged': False}},
-                           {'in': {'state': constants.INACTIVE_STATES}}
-                           ]}
-        return self.get_torrents(qfilter)
+        return self.get_torrents(retention.PURGE_FILTER, with_media=False)
 
     def get_torrents_eligible_for_removal(self):
         """Retrieve torrents eligible for removal.
@@ -136,19 +212,36 @@ class DBApi(object):
         qfilter = {'and': [{'=': {'purged': True}},
                            {'in': {'state': constants.INACTIVE_STATES}}
                            ]}
-        return self.get_torrents(qfilter)
+        return self.get_torrents(qfilter, with_media=False)
+
+    def get_torrents_parsed(self):
+        """Retrieves torrents that no longer require parsing.
+
+        Perform select operation using a pre-defined criteria for what
+        constitutes a torrent already parsed: invalid, purged, or having
+        media files. Media files are not loaded.
+
+        :return: torrent instance(s)
+        :rtype: :class:`~seedbox.db.models.Torrent`
+        """
+        qfilter = {'or': [{'=': {'invalid': True}},
+                          {'=': {'purged': True}},
+                          {'exists': {'media_files': True}}
+                          ]}
+        return self.get_torrents(qfilter, with_media=False)
 
-    def get_torrent_by_name(self, name):
+    def get_torrent_by_name(self, name, with_media=True):
         """Fetch torrent by name.
 
         Perform select operation using the name of torrent to fetch torrent.
 
         :param name: the name of torrent
+        :param bool with_media: flag indicating to load the media files
         :return: torrent instance(s)
         :rtype: :class:`~seedbox.db.models.Torrent`
         """
         qfilter = {'=': {'name': name}}
-        return list(self.get_torrents(qfilter))
+        return list(self.get_torrents(qfilter, with_media))
 
     def get_torrent(self, torrent_id):
         """Fetch torrent by id.
@@ -162,7 +255,7 @@ class DBApi(object):
         """
         return self.impl.fetch(models.Torrent, torrent_id)
 
-    def fetch_or_create_torrent(self, name):
+    def fetch_or_create_torrent(self, name, with_media=True):
         """Fetch or create torrent by name.
 
         Performs select operation using the name of torrent to fetch torrent,
@@ -170,10 +263,11 @@ class DBApi(object):
         performed using the name of the torrent.
 
         :param name: the name of a torrent
+        :param bool with_media: flag indicating to load the media files
         :return: torrent instance(s)
         :rtype: :class:`~seedbox.db.models.Torrent`
         """
-        _torrent = self.get_torrent_by_name(name)
+        _torrent = self.get_torrent_by_name(name, with_media)
         if not _torrent:
             _torrent = self.save_torrent(models.Torrent(None, name))
         else:
@@ -217,8 +311,10 @@ class DBApi(object):
         Perform delete operation on a list of instances of media.
 
         :param qfilter: query filter to determine instances to delete
+        :return: total media files deleted
+        :rtype: int
         """
-        self.impl.delete_by(models.MediaFile, qfilter)
+        return self.impl.delete_by(models.MediaFile, qfilter)
 
     def get_medias(self, qfilter):
         """Retrieves metadata for multiple media files.
@@ -309,6 +405,151 @@ class DBApi(object):
         """
         return self.impl.fetch(models.MediaFile, media_id)
 
+    def save_sync_progress(self, progress):
+        """Saves transfer progress of a media file.
+
+        Perform save (insert/update) operation on an instance of sync
+        progress.
+
+        :param progress: an instance of sync progress
+        :return: sync progress instance
+        :rtype: :class:`~seedbox.db.models.SyncProgress`
+        """
+        return self.impl.save(progress)
+
+    def get_sync_progress(self, media_id):
+        """Fetch transfer progress by media id.
+
+        Perform select operation using media primary key to fetch the
+        transfer progress of the media.
+
+        :param media_id: media primary key
+        :return: sync progress instance
+        :rtype: :class:`~seedbox.db.models.SyncProgress`
+        """
+        return self.impl.fetch(models.SyncProgress, media_id)
+
+    def save_task_results(self, medias, checkpoints):
+        """Saves the media files processed by a task and its checkpoints.
+
+        Both are saved within a single transaction such that a checkpoint
+        is never recorded without the outcome of the task.
+
+        :param list medias: media files processed by the task
+        :param list checkpoints: checkpoints of the task
+                                 (:class:`~seedbox.db.models.TaskCheckpoint`)
+        :return: media file instances
+        :rtype: list
+        """
+        medias = list(medias)
+        saved = self.impl.save_all(medias + list(checkpoints))
+        return saved[:len(medias)]
+
+    def get_task_checkpoints(self, media_ids, phase):
+        """Retrieve the checkpoints of tasks completed on media files.
+
+        :param list media_ids: primary keys of media files
+        :param str phase: name of workflow phase
+        :return: task checkpoint instance(s)
+        :rtype: :class:`~seedbox.db.models.TaskCheckpoint`
+        """
+        return self.impl.fetch_by(models.TaskCheckpoint,
+                                  {'and': [{'in': {'media_id': media_ids}},
+                                           {'=': {'phase': phase}}]})
+
+    def enqueue_jobs(self, jobs):
+        """Queues jobs for execution by workers.
+
+        :param list jobs: instances of job
+        :return: job instances
+        :rtype: list
+        """
+        return self.impl.save_all(jobs)
+
+    def get_jobs(self, qfilter=None):
+        """Retrieves queued jobs.
+
+        :param qfilter: query filter to determine instances to fetch
+                        (default: None; all jobs)
+        :return: job instance(s)
+        :rtype: :class:`~seedbox.db.models.Job`
+        """
+        if qfilter is None:
+            qfilter = {'!=': {'id': None}}
+        return self.impl.fetch_by(models.Job, qfilter)
+
+    def claim_job(self, owner, lease_timeout, max_attempts):
+        """Claims the next queued job available for execution.
+
+        A job is available when not leased, or the lease has expired, and
+        has been claimed fewer than max_attempts times; jobs of higher
+        priority are claimed first, then in the order queued. The job is
+        claimed with a single update guarded by the same criteria, such that
+        a job is never claimed by more than one worker at a time.
+
+        :param str owner: name of the worker claiming the job
+        :param int lease_timeout: seconds until the lease expires
+        :param int max_attempts: maximum times a job is claimed
+        :return: job instance or None when no job available
+        :rtype: :class:`~seedbox.db.models.Job`
+        """
+        now = timeutil.utcnow()
+        available = {'and': [{'<': {'attempts': max_attempts}},
+                             {'or': [{'=': {'lease_expires_at': None}},
+                                     {'<=': {'lease_expires_at': now}}]}]}
+        lease = '{0}/{1}'.format(owner, uuid.uuid4().hex)
+        claimed = self.impl.bulk_update(
+            {'owner': lease,
+             'lease_expires_at': now + datetime.timedelta(
+                 seconds=lease_timeout)},
+            models.Job,
+            {'and': [available,
+                     {'in': {'id': {'model': 'Job', 'field': 'id',
+                                    'filter': available, 'limit': 1,
+                                    'order_by': ['-priority', 'id']}}}]})
+        if not claimed:
+            return None
+
+        job = next(iter(self.get_jobs({'=': {'owner': lease}})))
+        job.attempts = (job.attempts or 0) + 1
+        return self.impl.save(job)
+
+    def renew_job(self, job, lease_timeout):
+        """Extends the lease of a claimed job.
+
+        :param job: an instance of job claimed by the worker
+        :param int lease_timeout: seconds until the lease expires
+        :return: flag indicating the lease is still held
+        :rtype: boolean
+        """
+        return bool(self.impl.bulk_update(
+            {'lease_expires_at': timeutil.utcnow() + datetime.timedelta(
+                seconds=lease_timeout)},
+            models.Job,
+            {'and': [{'=': {'id': job.job_id}},
+                     {'=': {'owner': job.owner}}]}))
+
+    def complete_job(self, job):
+        """Removes a job executed by a worker from the queue.
+
+        :param job: an instance of job claimed by the worker
+        :return: flag indicating the lease was still held
+        :rtype: boolean
+        """
+        return bool(self.impl.delete_by(
+            models.Job,
+            {'and': [{'=': {'id': job.job_id}},
+                     {'=': {'owner': job.owner}}]}))
+
+    def delete_jobs(self, qfilter):
+        """Removes jobs from the queue regardless of the lease.
+
+        :param qfilter: query filter to determine instances to delete
+        :return: total jobs deleted
+        :rtype: int
+        """
+        return self.impl.delete_by(models.Job, qfilter)
+
     def save_appstate(self, appstate):
         """Perform save (insert/update) operation on an instance of appstate.
 
@@ -316,7 +557,23 @@ class DBApi(object):
         :return: appstate instance
         :rtype: :class:`~seedbox.db.models.AppState`
         """
-        return self.impl.save(appstate)
+        return self.save_appstates([appstate])[0]
+
+    def save_appstates(self, appstates):
+        """Perform save (insert/update) operation on instances of appstate.
+
+        All instances are saved within a single transaction.
+
+        :param list appstates: instances of appstate
+        :return: appstate instances
+        :rtype: list
+        """
+        saved = self.impl.save_all(appstates)
+        if self._appstate_ttl:
+            expires_at = time.time() + self._appstate_ttl
+            for appstate in saved:
+                self._appstates[appstate.name] = (appstate, expires_at)
+        return [_copy_appstate(appstate) for appstate in saved]
 
     def delete_appstate(self, appstate):
         """Perform delete operation on an instance of appstate.
@@ -324,81 +581,60 @@ class DBApi(object):
         :param appstate: an instance of appstate
         """
         self.impl.delete(appstate)
+        self._appstates.pop(appstate.name, None)
 
     def get_appstate(self, name):
         """Retrieve appstate by name.
 
         Perform select operation using name of appstate to fetch an instance
-        of appstate.
+        of appstate; served from memory for ``appstate_cache_ttl`` seconds
+        once retrieved.
 
         :param name: name of an appstate instance
         :return: appstate instance
         :rtype: :class:`~seedbox.db.models.AppState`
         """
-        return self.impl.fetch(models.AppState, name)
+        return self.get_appstates([name])[name]
 
-    def clean_up(self):
-        """Cleans up data within tables.
+    def get_appstates(self, names):
+        """Retrieve appstates by name.
+
+        Names not retrieved within the last ``appstate_cache_ttl`` seconds,
+        or not found, are fetched with a single select operation.
 
-        Periodically check for data no longer needed (fully processed,
-        invalid, or deleted) and then remove from the database.
+        :param list names: names of appstate instances
+        :return: appstate instance (or None when not found) by name
+        :rtype: dict
         """
-        LOG.debug('starting perform_db_cleanup...')
+        now = time.time()
+        appstates = {}
+        for name in names:
+            appstate, expires_at = self._appstates.get(name, (None, 0))
+            if expires_at > now:
+                appstates[name] = appstate
+
+        missing = [name for name in names if name not in appstates]
+        if missing:
+            for appstate in self.impl.fetch_by(models.AppState,
+                                               {'in': {'name': missing}}):
+                appstates[appstate.name] = appstate
+                if self._appstate_ttl:
+                    self._appstates[appstate.name] = (
+                        appstate, now + self._appstate_ttl)
+        return dict((name, _copy_appstate(appstates.get(name)))
+                    for name in names)
 
-        lpd = self.get_appstate('last_purge_date')
-        last_purge_date = lpd.value if lpd else None
-        LOG.debug('last_purge_date: %s', last_purge_date)
+    def clean_up(self):
+        """Cleans up data within tables.
 
-        if last_purge_date is None:
-            LOG.info('First running...setting last purge date to now')
-            # never been purged so need to set an initial date (today)
-            self.save_appstate(models.AppState('last_purge_date',
-                                               timeutil.utcnow()))
-            return
-
-        if timeutil.is_older_than(last_purge_date, timeutil.ONE_WEEK):
-            LOG.debug('last purge > 1 week ago....ready for some clean up.')
-            # ready to start purge process....
-            torrents = list(self.get_torrents_eligible_for_purging())
-            if torrents:
-                LOG.debug('found torrents eligible for purging: %s',
-                          len(torrents))
-                # perform database backup
-                self.backup()
-
-                LOG.debug('purging media associated with torrents....')
-                qfilter = {
-                    'in': {'torrent_id': [tor.torrent_id for tor in torrents]}
-                }
-                self.delete_medias(qfilter)
-
-                qfilter = {
-                    'in': {'id': [tor.torrent_id for tor in torrents]}
-                }
-                self.bulk_save_torrents({'purged': True}, qfilter)
-
-                # now reset the last purge date to now.
-                self.save_appstate(models.AppState('last_purge_date',
-                                                   timeutil.utcnow()))
-
-            else:
-                # no torrents eligible for purging
-                LOG.debug('no torrents found eligible for purging...')
-
-        # done deleting mediafiles; now delete any torrents that were
-        # found to be missing from filesystem thereby no longer in
-        # need of caching.
-        torrents_to_delete = []
-        for torrent in self.get_torrents_eligible_for_removal():
-            if not os.path.exists(os.path.join(
-                    self.impl.conf.torrent.torrent_path, torrent.name)):
-                # actual torrent file no longer exists so we can safely
-                # delete the torrent from cache
-                torrents_to_delete.append(torrent.torrent_id)
-
-        if torrents_to_delete:
-            LOG.debug('found torrents eligible for removal: %s',
-                      len(torrents_to_delete))
-            self.delete_torrents({'in': {'id': torrents_to_delete}})
+        Trims data no longer needed (fully processed, invalid, or deleted)
+        based on the retention policies; a bounded amount per run.
 
+        :return: total torrents purged, media files deleted and torrents
+                 removed
+        :rtype: dict
+        """
+        LOG.debug('starting perform_db_cleanup...')
+        stats = retention.apply(self, self.impl.conf)
         LOG.debug('perform_db_cleanup completed')
+        return stats
@@ -21,6 +21,15 @@ class Connection(object):
         """Migrate the database to `version` or most recent version."""
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def dispose(self, close=True):
+        """Release the connections to the database.
+
+        :param bool close: flag to close the connections; otherwise the
+                           connections are dropped without being closed
+        """
+        raise NotImplementedError
+
     @abc.abstractmethod
     def clear(self):
         """Clear database."""
@@ -36,6 +45,16 @@ class Connection(object):
         """Shrink database."""
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def free_page_ratio(self):
+        """Ratio of unused pages to total pages of database."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def db_size(self):
+        """Size of database in bytes."""
+        raise NotImplementedError
+
     @abc.abstractmethod
     def save(self, instance):
         """Save the instance to the database.
@@ -44,6 +63,16 @@ class Connection(object):
         """
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def save_all(self, instances):
+        """Save the instances to the database within a single transaction.
+
+        :param list instances: a list of instance of modeled data object
+        :return: the saved instances
+        :rtype: list
+        """
+        raise NotImplementedError
+
     @abc.abstractmethod
     def bulk_create(self, instances):
         """Save the instances in bulk to the database.
@@ -60,6 +89,8 @@ class Connection(object):
                           an instance.
         :param entity_type: the model type
         :param qfilter: query filter to determine which rows to update
+        :return: total rows updated
+        :rtype: int
         """
         raise NotImplementedError
 
@@ -69,6 +100,19 @@ class Connection(object):
 
         :param entity_type: the model type
         :param qfilter: query filter to determine which rows to update
+        :return: total rows deleted
+        :rtype: int
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def purge(self, qfilter, limit):
+        """Purge the media files of torrents within a single transaction.
+
+        :param qfilter: query filter to determine which torrents to purge
+        :param int limit: maximum torrents purged
+        :return: total torrents purged and media files deleted
+        :rtype: tuple
         """
         raise NotImplementedError
 
@@ -81,11 +125,12 @@ class Connection(object):
         raise NotImplementedError
 
     @abc.abstractmethod
-    def fetch_by(self, entity_type, qfilter):
+    def fetch_by(self, entity_type, qfilter, with_related=True):
         """Fetch the instance(s) based on filter from the database.
 
         :param entity_type: the model type
         :param qfilter: query filter to determine which rows to update
+        :param bool with_related: flag indicating to load related instances
         """
         raise NotImplementedError
 
@@ -1,13 +1,85 @@
 """Provides the ability to perform maintenance on a database."""
+import gzip
 import logging
 import os
 import shutil
+import sqlite3
 
+from oslo_config import cfg
 import six.moves.urllib.parse as urlparse
 
 LOG = logging.getLogger(__name__)
-# total of 8 weeks/2 months of backups
-MAX_BACKUP_COUNT = 8
+
+cfg.CONF.import_group('retention', 'seedbox.options')
+GZIP_SUFFIX = '.gz'
+
+
+def _copy_db(source_name, target_name, pages, sleep):
+    """Copies a live database using the sqlite online backup API.
+
+    The copy is consistent even when the database is being written to at
+    the same time; writes made while copying restart the copy of the
+    remaining pages.
+    """
+    source = sqlite3.connect(source_name)
+    target = sqlite3.connect(target_name)
+    try:
+        if hasattr(source, 'backup'):
+            source.backup(target, pages=pages, sleep=sleep)
+        else:
+            # online backup API not available (python < 3.7); copy the file
+            # while holding a write lock with all changes checkpointed.
+            target.close()
+            source.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            source.execute('BEGIN IMMEDIATE')
+            try:
+                shutil.copy2(source_name, target_name)
+            finally:
+                source.rollback()
+    finally:
+        target.close()
+        source.close()
+
+
+def _compress(source_name, target_name):
+    with open(source_name, 'rb') as source:
+        with gzip.open(target_name, 'wb') as target:
+            shutil.copyfileobj(source, target)
+    os.remove(source_name)
+
+
+def _backup_names(db_name, index):
+    name = '%s.%d' % (db_name, index)
+    return [name, name + GZIP_SUFFIX]
+
+
+def _rotate(db_name, compress, count):
+    """Shifts each backup down by one, dropping the oldest.
+
+    When compress is enabled every backup except the most recent one is
+    compressed as it is rotated.
+    """
+    # drop backups beyond the count, e.g. after lowering the count
+    index = count + 1
+    while any(os.path.exists(dfn) for dfn in _backup_names(db_name, index)):
+        for dfn in _backup_names(db_name, index):
+            if os.path.exists(dfn):
+                os.remove(dfn)
+        index += 1
+
+    for i in range(count - 1, 0, -1):
+        for dfn in _backup_names(db_name, i + 1):
+            if os.path.exists(dfn):
+                os.remove(dfn)
+
+        sfn, sfn_gz = _backup_names(db_name, i)
+        if os.path.exists(sfn_gz):
+            os.rename(sfn_gz, _backup_names(db_name, i + 1)[1])
+        elif os.path.exists(sfn):
+            if compress:
+                _compress(sfn, _backup_names(db_name, i + 1)[1])
+            else:
+                os.rename(sfn, _backup_names(db_name, i + 1)[0])
 
 
 def backup(conf):
@@ -21,16 +93,19 @@ def backup(conf):
         conf.database.connection).path.replace('//', '/')
     LOG.debug('location of database: [%s]', default_db_name)
     if os.path.exists(default_db_name):
-        for i in range(MAX_BACKUP_COUNT - 1, 0, -1):
-            sfn = '%s.%d' % (default_db_name, i)
-            dfn = '%s.%d' % (default_db_name, i + 1)
-            if os.path.exists(sfn):
-                if os.path.exists(dfn):
-                    os.remove(dfn)
-                os.rename(sfn, dfn)
+        _rotate(default_db_name, conf.database.backup_compress,
+                conf.retention.backup_count)
+
         dfn = default_db_name + '.1'
         LOG.info('backing up db [%s] to [%s]', default_db_name, dfn)
-        shutil.copy2(default_db_name, dfn)
+        # copy to a temporary file first so an interrupted backup never
+        # replaces a good one.
+        tmp_name = dfn + '.tmp'
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+        _copy_db(default_db_name, tmp_name, conf.database.backup_pages,
+                 conf.database.backup_sleep)
+        os.rename(tmp_name, dfn)
         LOG.info('backup complete')
     else:
         LOG.warning('Database [%s] does not exist, no backup taken.',
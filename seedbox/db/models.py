@@ -3,20 +3,47 @@ import inspect
 
 import six
 
+# inspect.getargspec is deprecated (and removed) in python 3
+_getargspec = getattr(inspect, 'getfullargspec', None) or inspect.getargspec
+# attribute names by model class
+_FIELD_NAMES = {}
+
+
+def _restore(cls, values):
+    """Restores a pickled model without invoking __init__.
+
+    __init__ may replace values, e.g. media_files of None (not loaded) with
+    an empty list, changing the meaning of the model.
+    """
+    instance = cls.__new__(cls)
+    for name, value in zip(cls.field_names(), values):
+        setattr(instance, name, value)
+    return instance
+
 
 class Model(object):
     """Provides base methods for interacting with database model
 
+    Subclasses declare their attributes as ``__slots__`` so instances carry
+    no per-instance dictionary; the attributes of a model are the
+    parameters of its ``__init__``.
+
     :param kwds: keyword parameters and values of the model
     :type kwds: dict
     """
+    __slots__ = ()
+
     PK_NAME = 'id'
 
     def __init__(self, **kwds):
-        self.fields = list(kwds)
         for name, value in six.iteritems(kwds):
             setattr(self, name, value)
 
+    @property
+    def fields(self):
+        """Names of the attributes of the model."""
+        return self.field_names()
+
     def as_dict(self):
         """Generates a dictionary representation of the model.
 
@@ -38,8 +65,23 @@ class Model(object):
         for name in self.fields:
             yield name, getattr(self, name)
 
+    def _values(self):
+        return tuple(getattr(self, name) for name in self.fields)
+
     def __eq__(self, other):
-        return self.as_dict() == other.as_dict()
+        if not isinstance(other, Model) or self.fields != other.fields:
+            return False
+        return self._values() == other._values()
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __reduce__(self):
+        # pickled as the values in the order of the parameters of the
+        # model; keeps the payload sent to worker processes small.
+        return _restore, (self.__class__, self._values())
 
     def __iter__(self):
         return iter(self.fields)
@@ -74,6 +116,22 @@ class Model(object):
         """
         return {cls.PK_NAME: value}
 
+    @classmethod
+    def field_names(cls):
+        """Names of the attributes of the model.
+
+        Based on the parameters of the model; inspected once per model.
+
+        :return: attribute names
+        :rtype: tuple
+        """
+        names = _FIELD_NAMES.get(cls)
+        if names is None:
+            # remove self; always first arg of __init__
+            names = tuple(_getargspec(cls.__init__).args[1:])
+            _FIELD_NAMES[cls] = names
+        return names
+
     @classmethod
     def make_empty(cls):
         """Create an instance of the model.
@@ -83,10 +141,20 @@ class Model(object):
         :return: model class
         :rtype: :class:`~seedbox.db.models.Model`
         """
-        args = inspect.getargspec(cls.__init__).args
-        # remove self; always first arg of __init__
-        args = args[1:]
-        return cls(**dict.fromkeys(args))
+        return cls(**dict.fromkeys(cls.field_names()))
+
+    @classmethod
+    def from_values(cls, values):
+        """Create an instance of the model without invoking __init__.
+
+        :param dict values: value of every attribute of the model
+        :return: model class
+        :rtype: :class:`~seedbox.db.models.Model`
+        """
+        instance = cls.__new__(cls)
+        for name, value in six.iteritems(values):
+            setattr(instance, name, value)
+        return instance
 
 
 class Torrent(Model):
@@ -95,11 +163,16 @@ class Torrent(Model):
     Also the associated state based on parsing and processing of the torrent.
     """
 
+    __slots__ = ('torrent_id', 'name', 'created_at', 'updated_at', 'state',
+                 'retry_count', 'failed', 'error_msg', 'invalid', 'purged',
+                 'media_files', 'retry_at', 'priority')
+
     PK_NAME = 'torrent_id'
 
     def __init__(self, torrent_id, name, created_at=None, updated_at=None,
                  state=None, retry_count=None, failed=None, error_msg=None,
-                 invalid=None, purged=None, media_files=None):
+                 invalid=None, purged=None, media_files=None, retry_at=None,
+                 priority=None):
         """Initializes new instance.
 
         :param int torrent_id: primary key identifier of torrent
@@ -115,6 +188,10 @@ class Torrent(Model):
         :param bool invalid: flag indicating entry was invalid
         :param bool purged: flag indicating entry details were purged
         :param list media_files: list of associated media file(s)
+        :param datetime.datetime retry_at: date when processing is retried
+        :param int priority: priority of processing the torrent; higher
+                             first (None until assigned by the priority
+                             rules)
         :return: an instance of the Torrent object
         :rtype: :class:`~seedbox.db.models.Torrent`
         """
@@ -130,7 +207,9 @@ class Torrent(Model):
             error_msg=error_msg,
             invalid=invalid,
             purged=purged,
-            media_files=media_files if media_files else []
+            media_files=media_files if media_files else [],
+            retry_at=retry_at,
+            priority=priority
         )
 
 
@@ -140,11 +219,16 @@ class MediaFile(Model):
     Also the associated state based on parsing and processing.
     """
 
+    __slots__ = ('media_id', 'torrent_id', 'filename', 'file_ext', 'file_path',
+                 'size', 'compressed', 'synced', 'missing', 'skipped',
+                 'error_msg', 'total_time', 'retryable')
+
     PK_NAME = 'media_id'
 
     def __init__(self, media_id, torrent_id, filename, file_ext,
                  file_path=None, size=None, compressed=None, synced=None,
-                 missing=None, skipped=None, error_msg=None, total_time=None):
+                 missing=None, skipped=None, error_msg=None, total_time=None,
+                 retryable=None):
         """Initializes new instance.
 
         :param int media_id: primary key identifier of media file
@@ -159,6 +243,8 @@ class MediaFile(Model):
         :param bool skipped: flag indicating if skipped during processing
         :param str error_msg: error message that happened during processing
         :param int total_time: total amount of time to process file
+        :param bool retryable: flag indicating the error is transient and
+                               processing is retried
         :return: an instance of the MediaFile object
         :rtype: :class:`~seedbox.db.models.MediaFile`
         """
@@ -175,13 +261,16 @@ class MediaFile(Model):
             missing=missing,
             skipped=skipped,
             error_msg=error_msg,
-            total_time=total_time
+            total_time=total_time,
+            retryable=retryable
         )
 
 
 class AppState(Model):
     """Represents the state of the application and internal processing."""
 
+    __slots__ = ('name', 'value')
+
     PK_NAME = 'name'
 
     def __init__(self, name, value):
@@ -199,3 +288,117 @@ class AppState(Model):
             name=name,
             value=value
         )
+
+
+class SyncProgress(Model):
+    """Represents the transfer progress of a media file being synced."""
+
+    __slots__ = ('media_id', 'bytes_transferred', 'percent', 'rate', 'eta',
+                 'created_at', 'updated_at')
+
+    PK_NAME = 'media_id'
+
+    def __init__(self, media_id, bytes_transferred=None, percent=None,
+                 rate=None, eta=None, created_at=None, updated_at=None):
+        """Initializes new instance.
+
+        :param int media_id: primary key identifier of media file
+        :param int bytes_transferred: total bytes transferred so far
+        :param int percent: percentage of the file transferred
+        :param float rate: current transfer rate in bytes per second
+        :param int eta: estimated seconds remaining until completed
+        :param datetime.datetime created_at: date when transfer started
+        :param datetime.datetime updated_at: date when progress last saved
+        :return: an instance of the SyncProgress object
+        :rtype: :class:`~seedbox.db.models.SyncProgress`
+        """
+        Model.__init__(
+            self,
+            media_id=media_id,
+            bytes_transferred=bytes_transferred,
+            percent=percent,
+            rate=rate,
+            eta=eta,
+            created_at=created_at,
+            updated_at=updated_at
+        )
+
+
+class TaskCheckpoint(Model):
+    """Represents a task completed on a media file."""
+
+    __slots__ = ('checkpoint_id', 'media_id', 'phase', 'task', 'started_at',
+                 'finished_at')
+
+    PK_NAME = 'checkpoint_id'
+
+    def __init__(self, checkpoint_id, media_id, phase, task, started_at=None,
+                 finished_at=None):
+        """Initializes new instance.
+
+        :param int checkpoint_id: primary key identifier
+        :param int media_id: primary key identifier of media file
+        :param str phase: name of workflow phase the task executed within
+        :param str task: name of the task
+        :param datetime.datetime started_at: date when task started
+        :param datetime.datetime finished_at: date when task finished
+        :return: an instance of the TaskCheckpoint object
+        :rtype: :class:`~seedbox.db.models.TaskCheckpoint`
+        """
+        Model.__init__(
+            self,
+            checkpoint_id=checkpoint_id,
+            media_id=media_id,
+            phase=phase,
+            task=task,
+            started_at=started_at,
+            finished_at=finished_at
+        )
+
+
+class Job(Model):
+    """Represents a task queued for execution by a worker.
+
+    A job claimed by a worker is leased to the worker until the lease
+    expires, after which any worker may claim the job again.
+    """
+
+    __slots__ = ('job_id', 'torrent_id', 'phase', 'task', 'media_ids', 'owner',
+                 'lease_expires_at', 'attempts', 'created_at', 'updated_at',
+                 'priority')
+
+    PK_NAME = 'job_id'
+
+    def __init__(self, job_id, torrent_id, phase, task, media_ids, owner=None,
+                 lease_expires_at=None, attempts=0, created_at=None,
+                 updated_at=None, priority=0):
+        """Initializes new instance.
+
+        :param int job_id: primary key identifier
+        :param int torrent_id: primary key identifier of torrent
+        :param str phase: name of workflow phase the task executes within
+        :param str task: name of the task
+        :param list media_ids: primary keys of the media files to process
+        :param str owner: lease of the worker that claimed the job
+        :param datetime.datetime lease_expires_at: date when lease expires
+        :param int attempts: number of times the job was claimed
+        :param datetime.datetime created_at: date when job queued
+        :param datetime.datetime updated_at: date when job last updated
+        :param int priority: priority of executing the job; higher first
+        :return: an instance of the Job object
+        :rtype: :class:`~seedbox.db.models.Job`
+        """
+        Model.__init__(
+            self,
+            job_id=job_id,
+            torrent_id=torrent_id,
+            phase=phase,
+            task=task,
+            media_ids=media_ids,
+            owner=owner,
+            lease_expires_at=lease_expires_at,
+            attempts=attempts,
+            created_at=created_at,
+            updated_at=updated_at,
+            priority=priority
+        )
@@ -0,0 +1,179 @@
+"""Retention of the data cached within the database.
+
+Data no longer needed is trimmed by a bounded number of rows on every run,
+spreading the work across runs instead of purging everything at once:
+
+- purge: details of the media files of torrents done processing; once older
+  than ``torrent_age`` days, beyond the most recent ``torrent_count``
+  torrents, or while the database exceeds ``max_db_size``.
+- removal: purged torrents whose torrent file no longer exists.
+"""
+import datetime
+import logging
+import os
+
+from oslo_config import cfg
+
+from seedbox.common import timeutil
+from seedbox import constants
+from seedbox.db import models
+
+LOG = logging.getLogger(__name__)
+
+cfg.CONF.import_group('retention', 'seedbox.options')
+
+MEGABYTE = 1024 * 1024
+
+# torrents done processing whose media files can be purged
+PURGE_FILTER = {'and': [{'=': {'invalid': False}},
+                        {'=': {'purged': False}},
+                        {'in': {'state': constants.INACTIVE_STATES}}
+                        ]}
+
+
+def purge_filter(conf, db_size):
+    """Creates the filter of torrents eligible for purging by policy.
+
+    :param oslo_config.cfg.ConfigOpts conf: an instance of configuration
+    :param int db_size: current size of database in bytes
+    :return: query filter
+    :rtype: dict
+    """
+    if conf.retention.max_db_size and \
+            db_size > conf.retention.max_db_size * MEGABYTE:
+        LOG.info('database size %d exceeds %d MB; purging regardless of age',
+                 db_size, conf.retention.max_db_size)
+        return PURGE_FILTER
+
+    if not conf.retention.torrent_age:
+        return PURGE_FILTER
+
+    cutoff = timeutil.utcnow() - datetime.timedelta(
+        days=conf.retention.torrent_age)
+    policies = [{'<=': {'updated_at': cutoff}},
+                {'and': [{'=': {'updated_at': None}},
+                         {'<=': {'created_at': cutoff}}]}]
+    if conf.retention.torrent_count:
+        # all except the most recent torrents
+        policies.append({'not': {'in': {'id': {
+            'model': 'Torrent',
+            'field': 'id',
+            'filter': PURGE_FILTER,
+            'limit': conf.retention.torrent_count,
+            'order': 'desc'}}}})
+
+    return {'and': [PURGE_FILTER, {'or': policies}]}
+
+
+def purge(dbapi, qfilter, max_rows, chunk_size):
+    """Purges the media files of torrents eligible for purging.
+
+    Torrents are purged in chunks, each within its own transaction so that
+    no chunk holds the write lock for long; the media files of a chunk are
+    deleted and its torrents marked purged together.
+
+    :param dbapi: an instance of the database api
+    :type dbapi: :class:`~seedbox.db.api.DBApi`
+    :param dict qfilter: query filter of torrents eligible for purging
+    :param int max_rows: maximum torrents purged
+    :param int chunk_size: torrents purged per chunk
+    :return: total torrents purged and media files deleted
+    :rtype: tuple
+    """
+    torrents = medias = 0
+    while torrents < max_rows:
+        limit = min(chunk_size, max_rows - torrents)
+        purged, deleted = dbapi.purge_torrents(qfilter, limit)
+        medias += deleted
+        torrents += purged
+        if purged < limit:
+            break
+    return torrents, medias
+
+
+def remove(dbapi, torrent_path, max_rows, chunk_size):
+    """Removes purged torrents whose torrent file no longer exists.
+
+    :param dbapi: an instance of the database api
+    :type dbapi: :class:`~seedbox.db.api.DBApi`
+    :param str torrent_path: location of the torrent files
+    :param int max_rows: maximum torrents removed
+    :param int chunk_size: torrents removed per statement
+    :return: total torrents removed
+    :rtype: int
+    """
+    try:
+        torrent_names = set(os.listdir(torrent_path))
+    except OSError:
+        LOG.warning('unable to list torrents in [%s]; skipping removal',
+                    torrent_path)
+        return 0
+
+    # actual torrent file no longer exists so we can safely
+    # delete the torrent from cache
+    torrents_to_delete = []
+    for torrent in dbapi.get_torrents_eligible_for_removal():
+        if torrent.name not in torrent_names:
+            torrents_to_delete.append(torrent.torrent_id)
+            if len(torrents_to_delete) >= max_rows:
+                break
+
+    total = 0
+    for idx in range(0, len(torrents_to_delete), chunk_size):
+        ids = torrents_to_delete[idx:idx + chunk_size]
+        total += dbapi.delete_torrents({'in': {'id': ids}})
+    return total
+
+
+def _backup_if_needed(dbapi, interval):
+    lbd = dbapi.get_appstate('last_backup_date')
+    last_backup_date = lbd.value if lbd else None
+    if last_backup_date is None or timeutil.is_older_than(
+            last_backup_date, interval * timeutil.ONE_DAY):
+        dbapi.backup()
+        dbapi.save_appstate(models.AppState('last_backup_date',
+                                            timeutil.utcnow()))
+
+
+def apply(dbapi, conf):
+    """Trims the data no longer needed based on the retention policies.
+
+    The outcome of each run is captured as application state:
+    ``last_purge_date`` and ``last_purge_rows`` (media files deleted and
+    torrents removed).
+
+    :param dbapi: an instance of the database api
+    :type dbapi: :class:`~seedbox.db.api.DBApi`
+    :param oslo_config.cfg.ConfigOpts conf: an instance of configuration
+    :return: total torrents purged, media files deleted and torrents removed
+    :rtype: dict
+    """
+    max_rows = conf.retention.max_rows
+    chunk_size = conf.database.purge_chunk_size
+    stats = dict.fromkeys(['torrents_purged', 'medias_deleted',
+                           'torrents_removed'], 0)
+
+    qfilter = purge_filter(conf, dbapi.impl.db_size())
+    if any(True for _ in dbapi.get_torrents(qfilter, with_media=False)):
+        # perform database backup
+        _backup_if_needed(dbapi, conf.retention.backup_interval)
+
+        LOG.debug('purging media associated with torrents....')
+        stats['torrents_purged'], stats['medias_deleted'] = purge(
+            dbapi, qfilter, max_rows, chunk_size)
+
+    # done deleting mediafiles; now delete any torrents that were
+    # found to be missing from filesystem thereby no longer in
+    # need of caching.
+    stats['torrents_removed'] = remove(
+        dbapi, conf.torrent.torrent_path, max_rows, chunk_size)
+
+    rows = stats['medias_deleted'] + stats['torrents_removed']
+    if rows or stats['torrents_purged']:
+        LOG.info('retention: torrents purged: %(torrents_purged)d media '
+                 'files deleted: %(medias_deleted)d torrents removed: '
+                 '%(torrents_removed)d', stats)
+        dbapi.save_appstates([
+            models.AppState('last_purge_date', timeutil.utcnow()),
+            models.AppState('last_purge_rows', rows)])
+    return stats
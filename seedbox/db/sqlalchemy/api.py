@@ -1,6 +1,10 @@
 """Private database API implemented for sqlalchemy for database operations."""
 import logging
 
+import sqlalchemy as sa
+from sqlalchemy.ext import baked
+from sqlalchemy import orm
+
 from seedbox.db import base
 from seedbox.db import maintenance
 from seedbox.db.sqlalchemy import migration
@@ -10,6 +14,32 @@ from seedbox.db.sqlalchemy import session as db_session
 
 LOG = logging.getLogger(__name__)
 
+# queries generated by fetch_by; shared by all connections
+_BAKERY = baked.bakery(size=200)
+
+
+def _primary_key(row):
+    return sa.inspect(row).identity[0]
+
+
+def _after(query):
+    _pk = sa.inspect(query.column_descriptions[0]['entity']).primary_key[0]
+    return query.filter(_pk > sa.bindparam('last_pk'))
+
+
+def _order_by_pk(query):
+    _pk = sa.inspect(query.column_descriptions[0]['entity']).primary_key[0]
+    return query.order_by(_pk)
+
+
+def _load_related(query):
+    # load the related rows of all instances with a single query per
+    # relationship instead of one per instance.
+    _model = query.column_descriptions[0]['entity']
+    return query.options(
+        *[orm.selectinload(getattr(_model, name))
+          for name in sa.inspect(_model).relationships.keys()])
+
 
 class Connection(base.Connection):
     """SQLAlchemy connection."""
@@ -28,9 +58,18 @@ class Connection(base.Connection):
     def upgrade(self):
         """Migrate the database to `version` or most recent version."""
         engine = self._engine_facade.engine
-        migration.db_sync(engine)
+        if not migration.is_current(engine):
+            migration.db_sync(engine)
         engine.dispose()
 
+    def dispose(self, close=True):
+        """Release the connections to the database.
+
+        :param bool close: flag to close the connections; otherwise the
+                           connections are dropped without being closed
+        """
+        self._engine_facade.dispose(close)
+
     def clear(self):
         """Clear database."""
         engine = self._engine_facade.engine
@@ -49,24 +88,62 @@ class Connection(base.Connection):
             conn.execute('VACUUM')
             LOG.debug('db space reclaimed')
 
+    def free_page_ratio(self):
+        """Ratio of unused pages to total pages of database."""
+        engine = self._engine_facade.engine
+        if engine.dialect.name != 'sqlite':
+            return 0.0
+        with engine.connect() as conn:
+            page_count = conn.execute('pragma page_count').scalar()
+            freelist_count = conn.execute('pragma freelist_count').scalar()
+        if not page_count:
+            return 0.0
+        return float(freelist_count) / page_count
+
+    def db_size(self):
+        """Size of database in bytes."""
+        engine = self._engine_facade.engine
+        if engine.dialect.name != 'sqlite':
+            return 0
+        with engine.connect() as conn:
+            page_count = conn.execute('pragma page_count').scalar()
+            page_size = conn.execute('pragma page_size').scalar()
+        return page_count * page_size
+
+    def _save_row(self, session, instance):
+        _model = getattr(db_model, instance.__class__.__name__)
+        _pk = getattr(instance, instance.PK_NAME)
+        if _pk is not None:
+            _row = session.query(_model).get(_pk)
+            _row = model_util.to_db(instance, _row)
+        else:
+            _row = model_util.to_db(instance)
+            session.add(_row)
+        _row.save(session)
+        return _row
+
     def save(self, instance):
         """Save the instance to the database
 
         :param instance: an instance of modeled data object
         """
-        _model = getattr(db_model, instance.__class__.__name__)
         session = self._engine_facade.session
         with session.begin():
-            _pk = getattr(instance, instance.PK_NAME)
-            if _pk is not None:
-                _row = session.query(_model).get(_pk)
-                _row = model_util.to_db(instance, _row)
-            else:
-                _row = model_util.to_db(instance)
-                session.add(_row)
-            _row.save(session)
+            _row = self._save_row(session, instance)
         return model_util.from_db(_row)
 
+    def save_all(self, instances):
+        """Save the instances to the database within a single transaction.
+
+        :param list instances: a list of instance of modeled data object
+        :return: the saved instances
+        :rtype: list
+        """
+        session = self._engine_facade.session
+        with session.begin():
+            _rows = [self._save_row(session, item) for item in instances]
+        return [model_util.from_db(_row) for _row in _rows]
+
     def bulk_create(self, instances):
         """Save the instances in bulk to the database.
 
@@ -91,6 +168,8 @@ class Connection(base.Connection):
                                data of an instance.
         :param class entity_type: the model type
         :param dict qfilter: query filter to determine which rows to update
+        :return: total rows updated
+        :rtype: int
         """
         _model = getattr(db_model, entity_type.__name__)
         session = self._engine_facade.session
@@ -100,12 +179,15 @@ class Connection(base.Connection):
             _query = transformer.apply_filter(qfilter)
             total = _query.update(value_map, synchronize_session=False)
             LOG.debug('total rows updated: %d', total)
+        return total
 
     def delete_by(self, entity_type, qfilter):
         """Delete instances of a specific type based on filter criteria
 
         :param entity_type: the model type
         :param qfilter: query filter to determine which rows to update
+        :return: total rows deleted
+        :rtype: int
         """
         _model = getattr(db_model, entity_type.__name__)
         session = self._engine_facade.session
@@ -115,6 +197,38 @@ class Connection(base.Connection):
             _query = transformer.apply_filter(qfilter)
             total = _query.delete(synchronize_session=False)
             LOG.debug('total rows deleted: %d', total)
+        return total
+
+    def purge(self, qfilter, limit):
+        """Purge the media files of torrents within a single transaction.
+
+        The torrents are selected once, locked until the transaction ends
+        (database server), such that only torrents whose media files were
+        deleted are marked purged.
+
+        :param qfilter: query filter to determine which torrents to purge
+        :param int limit: maximum torrents purged
+        :return: total torrents purged and media files deleted
+        :rtype: tuple
+        """
+        session = self._engine_facade.session
+        with session.begin():
+            transformer = db_model.QueryTransformer(
+                db_model.Torrent, session.query(db_model.Torrent.id))
+            _ids = [_row.id for _row in transformer.apply_filter(qfilter)
+                    .order_by(db_model.Torrent.id).limit(limit)
+                    .with_for_update()]
+            if not _ids:
+                return 0, 0
+            medias = session.query(db_model.MediaFile).filter(
+                db_model.MediaFile.torrent_id.in_(_ids)).delete(
+                    synchronize_session=False)
+            torrents = session.query(db_model.Torrent).filter(
+                db_model.Torrent.id.in_(_ids)).update(
+                    {'purged': True}, synchronize_session=False)
+            LOG.debug('total torrents purged: %d media files deleted: %d',
+                      torrents, medias)
+        return torrents, medias
 
     def delete(self, instance):
         """Delete the instance(s) based on filter from the database.
@@ -132,20 +246,56 @@ class Connection(base.Connection):
             else:
                 LOG.debug('no rows deleted')
 
-    def fetch_by(self, entity_type, qfilter):
+    def fetch_by(self, entity_type, qfilter, with_related=True):
         """Fetch the instance(s) based on filter from the database.
 
+        Rows are retrieved in chunks ordered by primary key (keyset
+        pagination) each within its own transaction, so iterating over the
+        results holds at most a chunk of rows in memory.
+
         :param entity_type: the model type
         :param qfilter: query filter to determine which rows to update
+        :param bool with_related: flag indicating to load related instances
         """
         _model = getattr(db_model, entity_type.__name__)
+        shape, params = db_model.QueryTransformer.parameterize(qfilter)
+        chunk_size = self.conf.database.fetch_chunk_size
+
+        # the query is built and compiled once per model and shape of
+        # filter; afterwards only the values of the filter are bound.
+        _baked = _BAKERY(lambda session: session.query(_model), _model)
+        if with_related:
+            _baked.add_criteria(_load_related, _model)
+        _baked.add_criteria(
+            lambda query: db_model.QueryTransformer(
+                _model, query).apply_shape(shape), shape)
+
         session = self._engine_facade.session
-        with session.begin():
-            transformer = db_model.QueryTransformer(_model,
-                                                    session.query(_model))
-            _query = transformer.apply_filter(qfilter)
-            for _row in _query.all():
-                yield model_util.from_db(_row)
+        if not chunk_size:
+            with session.begin():
+                _items = [model_util.from_db(_row, with_related)
+                          for _row in _baked(session).params(**params)]
+            for _item in _items:
+                yield _item
+            return
+
+        def _limit(query):
+            return _order_by_pk(query).limit(chunk_size)
+
+        _first = _baked.with_criteria(_limit, chunk_size)
+        _next = _baked.with_criteria(_after).with_criteria(_limit, chunk_size)
+        _query = _first
+        while True:
+            with session.begin():
+                _rows = _query(session).params(**params).all()
+                _items = [model_util.from_db(_row, with_related)
+                          for _row in _rows]
+            for _item in _items:
+                yield _item
+            if len(_rows) < chunk_size:
+                break
+            params['last_pk'] = _primary_key(_rows[-1])
+            _query = _next
 
     def fetch(self, entity_type, pk):
         """Fetch the instance using primary key from the database.
@@ -158,3 +308,140 @@ class Connection(base.Connection):
         with session.begin():
             _row = session.query(_model).get(pk)
         return model_util.from_db(_row)
+
+
+def upsert_statement(dialect_name, row):
+    """Creates an insert statement that updates the row when it exists.
+
+    Columns left as None that have a default are not inserted so that the
+    default applies; columns with an onupdate value are updated with it.
+
+    :param str dialect_name: name of database dialect (postgresql, mysql)
+    :param row: an instance of database model object
+    :returns: an insert statement
+    """
+    table = row.__table__
+    insert_values = {}
+    update_values = {}
+    for prop in sa.inspect(row).mapper.column_attrs:
+        column = prop.columns[0]
+        value = getattr(row, prop.key)
+        if value is None and column.default is not None:
+            continue
+        insert_values[column.name] = value
+        if not column.primary_key:
+            update_values[column.name] = value
+    for column in table.columns:
+        if column.onupdate is not None:
+            update_values[column.name] = column.onupdate.arg(None)
+
+    pk_names = [column.name for column in table.primary_key]
+    # imported only by connections to the database server of the dialect
+    if dialect_name == 'postgresql':
+        from sqlalchemy.dialects import postgresql
+        stmt = postgresql.insert(table).values(**insert_values)
+        if not update_values:
+            return stmt.on_conflict_do_nothing(index_elements=pk_names)
+        return stmt.on_conflict_do_update(index_elements=pk_names,
+                                          set_=update_values)
+    if dialect_name == 'mysql':
+        from sqlalchemy.dialects import mysql
+        stmt = mysql.insert(table).values(**insert_values)
+        if not update_values:
+            update_values = dict((name, stmt.inserted[name])
+                                 for name in pk_names)
+        return stmt.on_duplicate_key_update(**update_values)
+    raise ValueError('upsert not supported by %s' % dialect_name)
+
+
+class ServerConnection(Connection):
+    """SQLAlchemy connection to a database server (PostgreSQL, MySQL).
+
+    Allows multiple hosts to share a single database: connections are
+    pooled, instances with a known primary key are saved with a single
+    atomic upsert, and maintenance is performed by the database server.
+    """
+
+    UPSERT_DIALECTS = ('postgresql', 'mysql')
+
+    @property
+    def _dialect_name(self):
+        return self._engine_facade.engine.dialect.name
+
+    def backup(self):
+        """Backup database.
+
+        Backups of a database server are managed by the tools of the
+        database server (pg_dump, mysqldump) instead.
+        """
+        if self._dialect_name not in self.UPSERT_DIALECTS:
+            return super(ServerConnection, self).backup()
+        LOG.info('backup of %s database skipped; use database server tools',
+                 self._dialect_name)
+
+    def shrink_db(self):
+        """Shrink database."""
+        engine = self._engine_facade.engine
+        if self._dialect_name == 'postgresql':
+            # VACUUM can not run within a transaction
+            with engine.connect() as conn:
+                conn.execution_options(
+                    isolation_level='AUTOCOMMIT').execute('VACUUM ANALYZE')
+        elif self._dialect_name == 'mysql':
+            with engine.connect() as conn:
+                conn.execute('OPTIMIZE TABLE ' + ', '.join(
+                    db_model.Base.metadata.tables))
+        else:
+            return super(ServerConnection, self).shrink_db()
+        LOG.debug('db space reclaimed')
+
+    def free_page_ratio(self):
+        """Ratio of unused space to total space of database.
+
+        For PostgreSQL the ratio of dead to total tuples, for MySQL the
+        ratio of free to total table space.
+        """
+        if self._dialect_name == 'postgresql':
+            query = ('SELECT coalesce(sum(n_dead_tup), 0), '
+                     'coalesce(sum(n_live_tup + n_dead_tup), 0) '
+                     'FROM pg_stat_user_tables')
+        elif self._dialect_name == 'mysql':
+            query = ('SELECT coalesce(sum(data_free), 0), '
+                     'coalesce(sum(data_length + index_length + '
+                     'data_free), 0) FROM information_schema.tables '
+                     'WHERE table_schema = database()')
+        else:
+            return super(ServerConnection, self).free_page_ratio()
+
+        with self._engine_facade.engine.connect() as conn:
+            free, total = conn.execute(query).first()
+        if not total:
+            return 0.0
+        return float(free) / total
+
+    def db_size(self):
+        """Size of database in bytes."""
+        if self._dialect_name == 'postgresql':
+            query = 'SELECT pg_database_size(current_database())'
+        elif self._dialect_name == 'mysql':
+            query = ('SELECT coalesce(sum(data_length + index_length + '
+                     'data_free), 0) FROM information_schema.tables '
+                     'WHERE table_schema = database()')
+        else:
+            return super(ServerConnection, self).db_size()
+
+        with self._engine_facade.engine.connect() as conn:
+            return int(conn.execute(query).scalar())
+
+    def _save_row(self, session, instance):
+        # instances with a primary key and without related instances are
+        # inserted or updated with a single statement.
+        _model = getattr(db_model, instance.__class__.__name__)
+        _pk = getattr(instance, instance.PK_NAME)
+        if (_pk is None or self._dialect_name not in self.UPSERT_DIALECTS or
+                sa.inspect(_model).relationships):
+            return super(ServerConnection, self)._save_row(session, instance)
+
+        session.execute(upsert_statement(self._dialect_name,
+                                         model_util.to_db(instance)))
+        return session.query(_model).populate_existing().get(_pk)
@@ -0,0 +1,39 @@
+"""Adds table for capturing transfer progress of media files."""
+from datetime import datetime
+
+import sqlalchemy as sa
+
+
+def upgrade(migrate_engine):
+    """Creates the sync_progress table.
+
+    :param migrate_engine: an instance of database connection engine
+    """
+    meta = sa.MetaData(bind=migrate_engine)
+
+    # required so the foreign key can be resolved
+    sa.Table('media_files', meta, autoload=True)
+
+    progress = sa.Table(
+        'sync_progress', meta,
+        sa.Column('id', sa.Integer,
+                  sa.ForeignKey('media_files.id', ondelete='CASCADE'),
+                  primary_key=True),
+        sa.Column('created_at', sa.DateTime, default=datetime.utcnow),
+        sa.Column('updated_at', sa.DateTime, onupdate=datetime.utcnow),
+        sa.Column('bytes_transferred', sa.BigInteger, default=0),
+        sa.Column('percent', sa.Integer, default=0),
+        sa.Column('rate', sa.Float, default=0),
+        sa.Column('eta', sa.Integer, default=None))
+    progress.create(checkfirst=True)
+
+
+def downgrade(migrate_engine):
+    """Drops the sync_progress table.
+
+    :param migrate_engine: an instance of database connection engine
+    """
+    meta = sa.MetaData(bind=migrate_engine)
+
+    progress = sa.Table('sync_progress', meta)
+    progress.drop(checkfirst=True)
@@ -0,0 +1,38 @@
+"""Adds columns for retrying torrents that failed due to transient errors."""
+import sqlalchemy as sa
+
+
+def upgrade(migrate_engine):
+    """Adds Torrent.retry_at and MediaFile.retryable columns.
+
+    :param migrate_engine: an instance of database connection engine
+    """
+    meta = sa.MetaData(bind=migrate_engine)
+
+    torrents = sa.Table('torrents', meta, autoload=True)
+    retry_at = sa.Column('retry_at', sa.DateTime, default=None)
+    retry_at.create(torrents)
+
+    media_files = sa.Table('media_files', meta, autoload=True)
+    retryable = sa.Column('retryable', sa.Boolean, default=False)
+    retryable.create(media_files)
+
+
+def _drop_column(migrate_engine, table_name, column_name):
+    try:
+        migrate_engine.execute('ALTER TABLE {0} DROP COLUMN {1}'.format(
+            table_name, column_name))
+    except sa.exc.OperationalError:
+        # older sqlite releases have to recreate the table instead
+        table = sa.Table(table_name, sa.MetaData(bind=migrate_engine),
+                         autoload=True)
+        table.c[column_name].drop()
+
+
+def downgrade(migrate_engine):
+    """Drops Torrent.retry_at and MediaFile.retryable columns.
+
+    :param migrate_engine: an instance of database connection engine
+    """
+    _drop_column(migrate_engine, 'torrents', 'retry_at')
+    _drop_column(migrate_engine, 'media_files', 'retryable')
@@ -0,0 +1,33 @@
+"""Adds indexes for the columns torrents and media files are filtered on."""
+import sqlalchemy as sa
+
+INDEXES = {
+    'torrents': ('ix_torrents_state',
+                 ['invalid', 'purged', 'failed', 'state']),
+    'media_files': ('ix_media_files_torrent_id',
+                    ['torrent_id', 'missing', 'skipped', 'synced']),
+}
+
+
+def upgrade(migrate_engine):
+    """Creates indexes on Torrent and MediaFile filter columns.
+
+    :param migrate_engine: an instance of database connection engine
+    """
+    meta = sa.MetaData(bind=migrate_engine)
+
+    for table_name, (name, columns) in INDEXES.items():
+        table = sa.Table(table_name, meta, autoload=True)
+        sa.Index(name, *[table.c[col] for col in columns]).create()
+
+
+def downgrade(migrate_engine):
+    """Drops indexes on Torrent and MediaFile filter columns.
+
+    :param migrate_engine: an instance of database connection engine
+    """
+    meta = sa.MetaData(bind=migrate_engine)
+
+    for table_name, (name, columns) in INDEXES.items():
+        table = sa.Table(table_name, meta, autoload=True)
+        sa.Index(name, *[table.c[col] for col in columns]).drop()
@@ -0,0 +1,37 @@
+"""Adds table for capturing the tasks completed on media files."""
+import sqlalchemy as sa
+
+
+def upgrade(migrate_engine):
+    """Creates the task_checkpoints table.
+
+    :param migrate_engine: an instance of database connection engine
+    """
+    meta = sa.MetaData(bind=migrate_engine)
+
+    # required so the foreign key can be resolved
+    sa.Table('media_files', meta, autoload=True)
+
+    checkpoints = sa.Table(
+        'task_checkpoints', meta,
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('media_id', sa.Integer,
+                  sa.ForeignKey('media_files.id', ondelete='CASCADE'),
+                  nullable=False),
+        sa.Column('phase', sa.String(30)),
+        sa.Column('task', sa.String(255)),
+        sa.Column('started_at', sa.DateTime, default=None),
+        sa.Column('finished_at', sa.DateTime, default=None),
+        sa.Index('ix_task_checkpoints_media_id', 'media_id', 'phase'))
+    checkpoints.create(checkfirst=True)
+
+
+def downgrade(migrate_engine):
+    """Drops the task_checkpoints table.
+
+    :param migrate_engine: an instance of database connection engine
+    """
+    meta = sa.MetaData(bind=migrate_engine)
+
+    checkpoints = sa.Table('task_checkpoints', meta)
+    checkpoints.drop(checkfirst=True)
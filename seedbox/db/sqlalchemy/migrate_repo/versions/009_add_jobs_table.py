@@ -0,0 +1,43 @@
+"""Adds table for queuing tasks executed by workers."""
+from datetime import datetime
+
+import sqlalchemy as sa
+
+
+def upgrade(migrate_engine):
+    """Creates the jobs table.
+
+    :param migrate_engine: an instance of database connection engine
+    """
+    meta = sa.MetaData(bind=migrate_engine)
+
+    # required so the foreign key can be resolved
+    sa.Table('torrents', meta, autoload=True)
+
+    jobs = sa.Table(
+        'jobs', meta,
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('created_at', sa.DateTime, default=datetime.utcnow),
+        sa.Column('updated_at', sa.DateTime, onupdate=datetime.utcnow),
+        sa.Column('torrent_id', sa.Integer,
+                  sa.ForeignKey('torrents.id', ondelete='CASCADE')),
+        sa.Column('phase', sa.String(30)),
+        sa.Column('task', sa.String(255)),
+        sa.Column('media_ids', sa.Text),
+        sa.Column('owner', sa.String(255), default=None),
+        sa.Column('lease_expires_at', sa.DateTime, default=None),
+        sa.Column('attempts', sa.Integer, default=0),
+        sa.Index('ix_jobs_lease_expires_at', 'lease_expires_at'),
+        sqlite_autoincrement=True)
+    jobs.create(checkfirst=True)
+
+
+def downgrade(migrate_engine):
+    """Drops the jobs table.
+
+    :param migrate_engine: an instance of database connection engine
+    """
+    meta = sa.MetaData(bind=migrate_engine)
+
+    jobs = sa.Table('jobs', meta)
+    jobs.drop(checkfirst=True)
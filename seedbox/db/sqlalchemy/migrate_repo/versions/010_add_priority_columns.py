@@ -0,0 +1,38 @@
+"""Adds columns for processing torrents by priority."""
+import sqlalchemy as sa
+
+
+def upgrade(migrate_engine):
+    """Adds Torrent.priority and Job.priority columns.
+
+    :param migrate_engine: an instance of database connection engine
+    """
+    meta = sa.MetaData(bind=migrate_engine)
+
+    torrents = sa.Table('torrents', meta, autoload=True)
+    priority = sa.Column('priority', sa.Integer, default=None)
+    priority.create(torrents)
+
+    jobs = sa.Table('jobs', meta, autoload=True)
+    priority = sa.Column('priority', sa.Integer, default=0)
+    priority.create(jobs)
+
+
+def _drop_column(migrate_engine, table_name, column_name):
+    try:
+        migrate_engine.execute('ALTER TABLE {0} DROP COLUMN {1}'.format(
+            table_name, column_name))
+    except sa.exc.OperationalError:
+        # older sqlite releases have to recreate the table instead
+        table = sa.Table(table_name, sa.MetaData(bind=migrate_engine),
+                         autoload=True)
+        table.c[column_name].drop()
+
+
+def downgrade(migrate_engine):
+    """Drops Torrent.priority and Job.priority columns.
+
+    :param migrate_engine: an instance of database connection engine
+    """
+    _drop_column(migrate_engine, 'torrents', 'priority')
+    _drop_column(migrate_engine, 'jobs', 'priority')
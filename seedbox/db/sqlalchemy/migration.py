@@ -36,17 +36,28 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
-"""Provides ability to manage versions of database models"""
+"""Provides ability to manage versions of database models
+
+sqlalchemy-migrate is only imported when the database has to be migrated;
+checking that a database is current reads the change script repository
+directly, such that a run against a current database never loads it.
+"""
 import os
+import re
 
-from migrate import exceptions as versioning_exceptions
-from migrate.versioning import api as versioning_api
-from migrate.versioning.repository import Repository
+from six.moves import configparser
+import sqlalchemy as sa
 
 from seedbox.db import exception
 
 INIT_VERSION = 0
+_REPO_PATH = os.path.join(os.path.abspath(os.path.dirname(__file__)),
+                          'migrate_repo')
+_VERSION_RE = re.compile(r'^(\d+)_.*\.py$')
 _REPO = None
+_REPO_INFO = None
+# databases known to be at the latest version
+_CURRENT = set()
 
 
 def db_sync(engine, version=None, init_version=INIT_VERSION):
@@ -60,6 +71,7 @@ def db_sync(engine, version=None, init_version=INIT_VERSION):
                          available version.
     :param init_version: Initial database version
     """
+    from migrate.versioning import api as versioning_api
 
     if version is not None:
         try:
@@ -68,6 +80,7 @@ def db_sync(engine, version=None, init_version=INIT_VERSION):
             raise exception.DbMigrationError(
                 message='version should be an integer')
 
+    _CURRENT.discard(str(engine.url))
     current_version = db_version(engine, init_version)
     repository = _find_migrate_repo()
     if version is None or version > current_version:
@@ -76,12 +89,50 @@ def db_sync(engine, version=None, init_version=INIT_VERSION):
         return versioning_api.downgrade(engine, repository, version)
 
 
+def is_current(engine):
+    """Checks if a database is at the latest version.
+
+    Once a file based database is known to be current the result is cached
+    to avoid checking again within the same process.
+
+    :param engine:  SQLAlchemy engine instance for a given database
+    :return: flag indicating database is current
+    :rtype: boolean
+    """
+    url = str(engine.url)
+    if url in _CURRENT:
+        return True
+
+    repository_id, version_table, latest = _repo_info()
+    try:
+        with engine.connect() as conn:
+            version = conn.execute(
+                sa.text('SELECT version FROM %s '
+                        'WHERE repository_id = :repository_id' %
+                        version_table),
+                repository_id=repository_id).scalar()
+    except sa.exc.DBAPIError:
+        # not under version control yet
+        return False
+
+    if version is None or int(version) != latest:
+        return False
+
+    # every in-memory database is a different database
+    if engine.url.database not in (None, '', ':memory:'):
+        _CURRENT.add(url)
+    return True
+
+
 def db_version(engine, init_version=INIT_VERSION):
     """Show the current version of the repository.
 
     :param engine:  SQLAlchemy engine instance for a given database
     :param init_version:  Initial database version
     """
+    from migrate import exceptions as versioning_exceptions
+    from migrate.versioning import api as versioning_api
+
     repository = _find_migrate_repo()
     try:
         return versioning_api.db_version(engine, repository)
@@ -99,15 +150,37 @@ def db_version_control(engine, version=None):
     :param engine:  SQLAlchemy engine instance for a given database
     :param version:  Initial database version
     """
+    from migrate.versioning import api as versioning_api
+
     versioning_api.version_control(engine, _find_migrate_repo(), version)
 
 
+def _repo_info():
+    """Get the repository id, version table and latest version.
+
+    Read from the configuration and the names of the change scripts of the
+    repository, as sqlalchemy-migrate does, without importing it.
+    """
+    global _REPO_INFO
+
+    if _REPO_INFO is None:
+        parser = configparser.ConfigParser()
+        parser.read(os.path.join(_REPO_PATH, 'migrate.cfg'))
+        versions = [int(match.group(1)) for match in
+                    (_VERSION_RE.match(name) for name in
+                     os.listdir(os.path.join(_REPO_PATH, 'versions')))
+                    if match]
+        _REPO_INFO = (parser.get('db_settings', 'repository_id'),
+                      parser.get('db_settings', 'version_table'),
+                      max(versions) if versions else INIT_VERSION)
+    return _REPO_INFO
+
+
 def _find_migrate_repo():
     """Get the project's change script repository"""
     global _REPO
 
     if _REPO is None:
-        abspath = os.path.join(os.path.abspath(os.path.dirname(__file__)),
-                               'migrate_repo')
-        _REPO = Repository(abspath)
+        from migrate.versioning.repository import Repository
+        _REPO = Repository(_REPO_PATH)
     return _REPO
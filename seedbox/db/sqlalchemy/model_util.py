@@ -2,14 +2,134 @@
 Provides utilities for managing models
 """
 import logging
+import operator
+
+import sqlalchemy as sa
 
 from seedbox.db import models as api_model
 from seedbox.db.sqlalchemy import models as db_model
 
 LOG = logging.getLogger(__name__)
 
+# mappers by name of model; created once per model
+_MAPPERS = {}
+
+
+class _Mapper(object):
+    """Converts between a database model and the corresponding api model.
+
+    Everything that depends only on the type of model (field names, which
+    fields hold relationships, how each value is read and written) is
+    determined once, so converting each row is just reading and writing
+    values.
+
+    :param api_cls: the api model class
+    :param db_cls: the database model class
+    """
+
+    def __init__(self, api_cls, db_cls):
+        self.api_cls = api_cls
+        self.db_cls = db_cls
+        self.pk_name = api_cls.PK_NAME
+
+        relationships = set(sa.inspect(db_cls).relationships.keys())
+        # models with custom accessors (e.g. AppState) have to be accessed
+        # as a dict; others can be accessed directly.
+        custom = (db_cls.get is not db_model.Base.get or
+                  db_cls.__setitem__ is not db_model.Base.__setitem__)
+
+        self.columns = []
+        self.relations = []
+        for name in api_cls.field_names():
+            # the public api model has a named primary key vs. the
+            # default database primary key field of id for better
+            # readability.
+            attr = 'id' if name == self.pk_name else name
+            if name in relationships:
+                self.relations.append(name)
+            elif custom:
+                self.columns.append((name, _item_getter(attr)))
+            else:
+                self.columns.append((name, operator.attrgetter(attr)))
+        self.custom = custom
+
+    def from_db(self, db_item, related=True):
+        """Converts database model object to api model object."""
+        values = dict((name, getter(db_item))
+                      for name, getter in self.columns)
+
+        # relationships not loaded are left as None so that saving the
+        # model leaves the related rows as is.
+        if not related:
+            for name in self.relations:
+                values[name] = None
+            return self.api_cls.from_values(values)
+
+        # if a relationship holds a list of values then every value is
+        # converted; the more items in the list the higher chance of
+        # impacting performance.
+        for name in self.relations:
+            value = getattr(db_item, name)
+            if isinstance(value, list):
+                value = [from_db(elm) for elm in value]
+            else:
+                value = from_db(value)
+            values[name] = value
+
+        return self.api_cls.from_values(values)
+
+    def to_db(self, api_item, db_item=None):
+        """Converts api model object to database model object."""
+        row = db_item
+        # if the optional row not provided then we assumed a new row
+        # and initialize instance with the primary key value.
+        if row is None:
+            row = self.db_cls(id=getattr(api_item, self.pk_name))
+
+        for name, _ in self.columns:
+            value = getattr(api_item, name)
+            if self.custom:
+                row[name] = value
+            else:
+                setattr(row, name, value)
+
+        for name in self.relations:
+            value = getattr(api_item, name)
+            # relationship was not loaded; nothing to update
+            if value is None:
+                continue
+            if isinstance(value, list):
+                value = [to_db(elm) for elm in value]
+            else:
+                value = to_db(value)
+            setattr(row, name, value)
 
-def from_db(db_item):
+        return row
+
+
+def _item_getter(name):
+    def _get(item):
+        return item.get(name)
+    return _get
+
+
+def get_mapper(name):
+    """Retrieves the mapper for a model.
+
+    Assumes that the name of the models at the database and api are the
+    same.
+
+    :param str name: name of the model class
+    :returns: mapper for the model
+    """
+    mapper = _MAPPERS.get(name)
+    if mapper is None:
+        mapper = _Mapper(getattr(api_model, name), getattr(db_model, name))
+        _MAPPERS[name] = mapper
+    return mapper
+
+
+def from_db(db_item, related=True):
     """Database to Model
 
     Handles the conversion from the database model object to the
@@ -17,42 +137,15 @@ def from_db(db_item):
     a reference to another model object then the call is recursive.
 
     :param db_item: an instance of a database model object
+    :param bool related: flag indicating to convert the related objects;
+                         otherwise the related fields are set to None
     :returns: an instance of an api model object
     """
     # if the input was None then return back what was provided
     if db_item is None:
         return db_item
 
-    # determine which object model we are converting to based
-    # on the model provided. Assumes that the name of the models
-    # at the database and api are the same.
-    _model = getattr(api_model, db_item.__class__.__name__)
-
-    # now start the conversion process
-    instance = _model.make_empty()
-    for name in instance:
-        # the public api model has a named primary key vs. the
-        # default database primary key field of id for better
-        # readability.
-        if name == instance.PK_NAME:
-            instance[name] = db_item.get('id')
-        else:
-            # need to inspect each attribute of the incoming object
-            # to determine if it is holding an instance to another
-            # object or potentially a list of another object.
-            _attr = db_item.get(name)
-            if isinstance(_attr, db_model.Base):
-                instance[name] = from_db(_attr)
-            # if it is a list with values and the values are of type
-            # defined within the database models then we handle the
-            # conversion for the entire list. The more items in the
-            # list the higher chance of impacting performance.
-            elif (isinstance(_attr, list) and _attr and
-                    isinstance(_attr[0], db_model.Base)):
-                instance[name] = [from_db(value) for value in _attr]
-            else:
-                instance[name] = _attr
-    return instance
+    return get_mapper(db_item.__class__.__name__).from_db(db_item, related)
 
 
 def to_db(api_item, db_item=None):
@@ -71,34 +164,4 @@ def to_db(api_item, db_item=None):
     if api_item is None:
         return api_item
 
-    row = db_item
-    # if the optional row not provided then we assumed a new row
-    # and initialize instance
-    if row is None:
-        # determine which object model we are converting to based
-        # on the model provided. Assumes that the name of the models
-        # at the database and api are the same.
-        _model = getattr(db_model, api_item.__class__.__name__)
-
-        # initialize the new db row object with the primary key
-        # value within the api object.
-        row = _model(id=getattr(api_item, api_item.PK_NAME))
-
-    # start conversion by taking the values within the api and
-    # setting onto the db row object (treating it as a dict)
-    for name, value in api_item.items():
-
-        # because of the relationship to another object exists
-        # then we need to check for values that are of the type
-        # of an api object or a list of an api object.
-        if isinstance(value, api_model.Model):
-            value = to_db(value)
-        elif isinstance(value, list) and value and isinstance(value[0],
-                                                              api_model.Model):
-            value = [to_db(elm) for elm in value]
-
-        # after all the converting just set the value onto
-        # the db row object.
-        row[name] = value
-
-    return row
+    return get_mapper(api_item.__class__.__name__).to_db(api_item, db_item)
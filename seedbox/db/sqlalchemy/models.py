@@ -111,6 +111,21 @@ class Base(six.Iterator):
         return six.iteritems(local)
 
 
+class IdList(sa.types.TypeDecorator):
+    """Stores a list of primary keys as comma separated text."""
+    impl = sa.Text
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return value
+        return ','.join(str(pk) for pk in value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return value
+        return [int(pk) for pk in value.split(',') if pk]
+
+
 class HasId(object):
     """Table mixin providing a class/table id attribute"""
     id = sa.Column(sa.Integer, primary_key=True)
@@ -125,17 +140,20 @@ class HasTimestamp(object):
 class Torrent(Base, HasId, HasTimestamp):
     """Class representing a torrent in the database"""
 
-    __table_args__ = {
-        'sqlite_autoincrement':  True,
-    }
+    __table_args__ = (
+        sa.Index('ix_torrents_state', 'invalid', 'purged', 'failed', 'state'),
+        {'sqlite_autoincrement':  True},
+    )
 
     name = sa.Column(sa.String(255), unique=True)
     state = sa.Column(sa.Enum(*constants.STATES), default=constants.INIT)
     retry_count = sa.Column(sa.Integer, default=0)
+    retry_at = sa.Column(sa.DateTime, default=None)
     failed = sa.Column(sa.Boolean, default=False)
     error_msg = sa.Column(sa.String(5000), default=None)
     invalid = sa.Column(sa.Boolean, default=False)
     purged = sa.Column(sa.Boolean, default=False)
+    priority = sa.Column(sa.Integer, default=None)
     media_files = orm.relationship('MediaFile', backref='torrents',
                                    cascade='all, delete-orphan')
 
@@ -143,9 +161,11 @@ class Torrent(Base, HasId, HasTimestamp):
 class MediaFile(Base, HasId):
     """Class representing a media file in the database"""
 
-    __table_args__ = {
-        'sqlite_autoincrement':  True,
-    }
+    __table_args__ = (
+        sa.Index('ix_media_files_torrent_id',
+                 'torrent_id', 'missing', 'skipped', 'synced'),
+        {'sqlite_autoincrement':  True},
+    )
 
     filename = sa.Column(sa.String(255))
     file_ext = sa.Column(sa.String(30))
@@ -156,10 +176,60 @@ class MediaFile(Base, HasId):
     missing = sa.Column(sa.Boolean, default=False)
     skipped = sa.Column(sa.Boolean, default=False)
     error_msg = sa.Column(sa.String(500), default=None)
+    retryable = sa.Column(sa.Boolean, default=False)
     total_time = sa.Column(sa.Float, default=0)
     torrent_id = sa.Column(sa.Integer, sa.ForeignKey('torrents.id'))
 
 
+class SyncProgress(Base, HasTimestamp):
+    """Class representing the transfer progress of a media file"""
+
+    __tablename__ = 'sync_progress'
+
+    id = sa.Column(sa.Integer,
+                   sa.ForeignKey('media_files.id', ondelete='CASCADE'),
+                   primary_key=True)
+    bytes_transferred = sa.Column(sa.BigInteger, default=0)
+    percent = sa.Column(sa.Integer, default=0)
+    rate = sa.Column(sa.Float, default=0)
+    eta = sa.Column(sa.Integer, default=None)
+
+
+class TaskCheckpoint(Base, HasId):
+    """Class representing a task completed on a media file"""
+
+    __table_args__ = (
+        sa.Index('ix_task_checkpoints_media_id', 'media_id', 'phase'),
+    )
+
+    media_id = sa.Column(sa.Integer,
+                         sa.ForeignKey('media_files.id', ondelete='CASCADE'),
+                         nullable=False)
+    phase = sa.Column(sa.String(30))
+    task = sa.Column(sa.String(255))
+    started_at = sa.Column(sa.DateTime, default=None)
+    finished_at = sa.Column(sa.DateTime, default=None)
+
+
+class Job(Base, HasId, HasTimestamp):
+    """Class representing a task queued for execution by a worker"""
+
+    __table_args__ = (
+        sa.Index('ix_jobs_lease_expires_at', 'lease_expires_at'),
+        {'sqlite_autoincrement':  True},
+    )
+
+    torrent_id = sa.Column(sa.Integer,
+                           sa.ForeignKey('torrents.id', ondelete='CASCADE'))
+    phase = sa.Column(sa.String(30))
+    task = sa.Column(sa.String(255))
+    media_ids = sa.Column(IdList)
+    owner = sa.Column(sa.String(255), default=None)
+    lease_expires_at = sa.Column(sa.DateTime, default=None)
+    attempts = sa.Column(sa.Integer, default=0)
+    priority = sa.Column(sa.Integer, default=0)
+
+
 class AppState(Base):
     """Class representing an app state in the database
 
@@ -306,6 +376,18 @@ class QueryTransformer(object):
     Provides the ability to transform a query filter into database query in
     the sqlalchemy compliant manner.
 
+    The values of an ``in`` filter are either a list, or a sub-select of a
+    field of another model::
+
+        {'in': {'torrent_id': {'model': 'Torrent', 'field': 'id',
+                               'filter': {'=': {'purged': False}},
+                               'limit': 500}}}
+
+    where limit (optional) restricts the sub-select to the first rows
+    ordered by the field; ``'order': 'desc'`` takes the last rows instead,
+    and ``'order_by': ['-priority', 'id']`` orders by other fields (a ``-``
+    prefix for descending).
+
     :param table: an instance of database table
     :type table: :class:`~seedbox.db.sqlalchemy.models.Base`
     :param query: an instance of database query
@@ -319,7 +401,9 @@ class QueryTransformer(object):
                  '>=': operator.ge,
                  '=>': operator.ge,
                  '!=': operator.ne,
-                 'in': lambda field_name, values: field_name.in_(values)
+                 'in': lambda field_name, values: field_name.in_(values),
+                 'exists': lambda field_name, value: (
+                     field_name.any() if value else ~field_name.any())
                  }
 
     complex_operators = {'or': sa.or_,
@@ -344,8 +428,34 @@ class QueryTransformer(object):
         op = self.operators[simple_op]
         field_name = list(nodes.keys())[0]
         value = list(nodes.values())[0]
+        if simple_op == 'in' and isinstance(value, dict):
+            model = globals()[value['model']]
+            value = self._select(model, value['field'], value.get('limit'),
+                                 value.get('order'),
+                                 QueryTransformer(model, None)._transform(
+                                     value['filter']),
+                                 value.get('order_by'))
         return op(getattr(self.table, field_name), value)
 
+    @staticmethod
+    def _select(model, field_name, limit, order, condition, order_by=None):
+        field = getattr(model, field_name)
+        # never correlated; the select may refer to the same table as the
+        # enclosing statement
+        select = sa.select([field]).where(condition).correlate(None)
+        if limit:
+            if order_by:
+                columns = [getattr(model, name[1:]).desc()
+                           if name.startswith('-') else getattr(model, name)
+                           for name in order_by]
+            else:
+                columns = [field.desc() if order == 'desc' else field]
+            select = select.order_by(*columns).limit(limit)
+        # nested so the select may refer to the table being updated or
+        # deleted from (required by MySQL)
+        select = select.alias()
+        return sa.select([select.c[field.key]]).correlate(None)
+
     def _transform(self, sub_tree):
         op = list(sub_tree.keys())[0]
         nodes = list(sub_tree.values())[0]
@@ -364,3 +474,78 @@ class QueryTransformer(object):
         condition = self._transform(expression_tree)
         self.query = self.query.filter(condition)
         return self.query
+
+    @classmethod
+    def _split(cls, sub_tree, params):
+        op = list(sub_tree.keys())[0]
+        nodes = list(sub_tree.values())[0]
+        if op in cls.complex_operators:
+            if cls.complex_operators[op] == sa.not_:
+                return op, cls._split(nodes, params)
+            return op, tuple(cls._split(node, params) for node in nodes)
+
+        field_name = list(nodes.keys())[0]
+        value = list(nodes.values())[0]
+        # None (IS NULL) and exists change the expression itself so
+        # they are part of the shape instead of a parameter.
+        if value is None or op == 'exists':
+            return op, field_name, False, value
+        if op == 'in' and isinstance(value, dict):
+            return op, field_name, False, (value['model'], value['field'],
+                                           value.get('limit'),
+                                           value.get('order'),
+                                           cls._split(value['filter'],
+                                                      params),
+                                           tuple(value.get('order_by') or
+                                                 ()))
+        name = 'p%d' % len(params)
+        params[name] = list(value) if op == 'in' else value
+        return op, field_name, True, name
+
+    @classmethod
+    def parameterize(cls, expression_tree):
+        """Splits the filter into its shape and the values of the filter.
+
+        Filters that differ only by their values have the same shape, which
+        makes the shape usable as a key for caching the generated query.
+
+        :param expression_tree: query filter
+        :return: the shape of the filter and the values by parameter name
+        :rtype: tuple
+        """
+        params = {}
+        shape = cls._split(expression_tree, params)
+        return shape, params
+
+    def _build(self, shape):
+        op = shape[0]
+        if op in self.complex_operators:
+            if self.complex_operators[op] == sa.not_:
+                return sa.not_(self._build(shape[1]))
+            return self.complex_operators[op](
+                *[self._build(node) for node in shape[1]])
+
+        _, field_name, bound, value = shape
+        if bound:
+            value = sa.bindparam(value, expanding=(op == 'in'))
+        elif isinstance(value, tuple):
+            (model_name, select_field, limit, order, select_shape,
+             order_by) = value
+            model = globals()[model_name]
+            value = self._select(model, select_field, limit, order,
+                                 QueryTransformer(model, None)._build(
+                                     select_shape), order_by)
+        return self.operators[op](getattr(self.table, field_name), value)
+
+    def apply_shape(self, shape):
+        """Uses the shape of a filter to update the query
+
+        The values of the filter are bound parameters of the query, named
+        as returned by :meth:`parameterize`.
+
+        :param shape: shape of the query filter to apply
+        :return: database query
+        :rtype: :class:`~sqlalchemy.orm.query.Query`
+        """
+        self.query = self.query.filter(self._build(shape))
+        return self.query
@@ -8,6 +8,17 @@ from sqlalchemy import pool
 
 LOG = logging.getLogger(__name__)
 
+POOL_CLASSES = {
+    'null': pool.NullPool,
+    'static': pool.StaticPool,
+    'singleton': pool.SingletonThreadPool,
+    'queue': pool.QueuePool,
+}
+
+# pragmas configurable using [database] sqlite_<pragma> options
+SQLITE_PRAGMAS = ('journal_mode', 'synchronous', 'cache_size', 'mmap_size',
+                  'temp_store', 'busy_timeout')
+
 
 def receive_connect(dbapi_con, con_record):
     """Ensures that the foreign key constraints are enforced in SQLite.
@@ -22,12 +33,39 @@ def receive_connect(dbapi_con, con_record):
     dbapi_con.execute('pragma foreign_keys=ON')
 
 
-def create_engine(sql_connection, idle_timeout=3600, connection_debug=0):
+def pragma_listener(pragmas):
+    """Creates a connect listener that applies the SQLite pragmas.
+
+    :param list pragmas: (name, value) of each pragma to apply
+    :return: listener for the connect event
+    """
+    statements = ['pragma {0}={1}'.format(name, value)
+                  for name, value in pragmas]
+
+    def receive_connect_pragmas(dbapi_con, con_record):
+        for statement in statements:
+            dbapi_con.execute(statement)
+
+    return receive_connect_pragmas
+
+
+def create_engine(sql_connection, idle_timeout=3600, connection_debug=0,
+                  pool_class=None, max_pool_size=None, max_overflow=None,
+                  pool_timeout=None, pragmas=None):
     """Return a new SQLAlchemy engine.
 
     :param sql_connection: sql connection string
     :param idle_timeout: timeout period the connection can be idle
     :param connection_debug: enable debugging for the connection
+    :param pool_class: name of connection pool (null, static, singleton,
+                       queue); defaults to null for SQLite and queue for
+                       database servers
+    :param max_pool_size: maximum connections kept open (queue pool)
+    :param max_overflow: connections allowed beyond max_pool_size
+                         (queue pool)
+    :param pool_timeout: seconds to wait for a connection (queue pool)
+    :param pragmas: (name, value) of each pragma applied to new SQLite
+                    connections
     """
 
     logger = logging.getLogger('sqlalchemy.engine')
@@ -40,17 +78,35 @@ def create_engine(sql_connection, idle_timeout=3600, connection_debug=0):
     else:
         logger.setLevel(logging.WARNING)
 
+    is_sqlite = sa.engine.url.make_url(
+        sql_connection).get_backend_name() == 'sqlite'
+    if pool_class is None:
+        pool_class = 'null' if is_sqlite else 'queue'
+
     engine_args = {
         'pool_recycle': idle_timeout,
         'convert_unicode': True,
-        'poolclass': pool.NullPool,
-        'connect_args': {'check_same_thread': False},
+        'poolclass': POOL_CLASSES[pool_class],
     }
+    if is_sqlite:
+        engine_args['connect_args'] = {'check_same_thread': False}
+
+    if pool_class == 'queue':
+        if max_pool_size is not None:
+            engine_args['pool_size'] = max_pool_size
+        if max_overflow is not None:
+            engine_args['max_overflow'] = max_overflow
+        if pool_timeout is not None:
+            engine_args['pool_timeout'] = pool_timeout
 
     engine = sa.create_engine(sql_connection, **engine_args)
-    # will associate with engine.pool
-    event.listen(engine, 'connect', receive_connect)
-    engine.connect()
+    if is_sqlite:
+        # will associate with engine.pool
+        event.listen(engine, 'connect', receive_connect)
+        if pragmas:
+            event.listen(engine, 'connect', pragma_listener(pragmas))
+    # verify the connection; returned to the pool for reuse
+    engine.connect().close()
     return engine
 
 
@@ -88,11 +144,27 @@ class EngineFacade(object):
                                (defaults to 3600)
         :keyword connection_debug: verbosity of SQL debugging information.
                                    0=None, 100=Everything (defaults to 0)
+        :keyword pool_class: name of connection pool (defaults to null for
+                             SQLite and queue for database servers)
+        :keyword max_pool_size: maximum connections kept open by queue pool
+        :keyword max_overflow: connections allowed beyond max_pool_size
+        :keyword pool_timeout: seconds to wait for a connection from pool
+        :keyword sqlite_<pragma>: value of SQLite pragma (journal_mode,
+                                  synchronous, cache_size, mmap_size,
+                                  temp_store, busy_timeout)
         """
+        pragmas = [(name, kwargs['sqlite_' + name])
+                   for name in SQLITE_PRAGMAS
+                   if kwargs.get('sqlite_' + name) is not None]
         self._engine = create_engine(
             sql_connection=sql_connection,
             idle_timeout=kwargs.get('idle_timeout', 3600),
-            connection_debug=kwargs.get('connection_debug', 0))
+            connection_debug=kwargs.get('connection_debug', 0),
+            pool_class=kwargs.get('pool_class'),
+            max_pool_size=kwargs.get('max_pool_size'),
+            max_overflow=kwargs.get('max_overflow'),
+            pool_timeout=kwargs.get('pool_timeout'),
+            pragmas=pragmas)
         self._session_maker = get_maker(engine=self._engine)
 
     @property
@@ -100,6 +172,20 @@ class EngineFacade(object):
         """Get the engine instance (note, that it's shared)."""
         return self._engine
 
+    def dispose(self, close=True):
+        """Release the connections held by the engine.
+
+        Connections inherited by a forked process are still used by the
+        parent process, so they are dropped without being closed.
+
+        :param bool close: flag to close the connections; otherwise the
+                           connections are dropped without being closed
+        """
+        if close:
+            self._engine.dispose()
+        else:
+            self._engine.pool = self._engine.pool.recreate()
+
     @property
     def session_maker(self):
         """Get the session maker instance"""
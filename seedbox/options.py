@@ -30,6 +30,13 @@ CLI_OPTS = [
                metavar='LOG_CONFIG',
                help='specific path and filename of logging configuration \
                     (override defaults)'),
+    cfg.StrOpt('command',
+               positional=True,
+               required=False,
+               default='process',
+               choices=['process', 'worker'],
+               help='process torrents (default) or execute the jobs queued '
+                    'for workers'),
 ]
 
 cfg.CONF.register_cli_opts(CLI_OPTS)
@@ -43,6 +50,15 @@ OPTS = [
     cfg.StrOpt('base_client_path',
                help='Location torrent client stores data files',
                sample_default='$base_path/torrents/data'),
+    cfg.BoolOpt('lock_wait',
+                default=False,
+                help='Wait for a run already in progress to finish; '
+                     'otherwise exit immediately'),
+    cfg.IntOpt('lock_stale_after',
+               default=3600,
+               min=0,
+               help='Seconds without progress after which a run in progress '
+                    'is reported as possibly stuck. 0 to disable'),
 ]
 
 cfg.CONF.register_opts(OPTS)
@@ -57,6 +73,90 @@ DB_OPTS = [
     cfg.IntOpt('connection_debug',
                default=0,
                help='Verbosity of SQL debugging information. 0=None, 100=All'),
+    cfg.StrOpt('pool_class',
+               choices=['null', 'static', 'singleton', 'queue'],
+               help='Connection pool used to reuse database connections: '
+                    'null (new connection each session), static (single '
+                    'shared connection), singleton (connection per thread), '
+                    'queue (pool of max_pool_size connections). Defaults to '
+                    'null for SQLite and queue for database servers'),
+    cfg.IntOpt('max_pool_size',
+               default=5,
+               help='Maximum number of connections kept open in the queue '
+                    'pool'),
+    cfg.IntOpt('max_overflow',
+               default=10,
+               help='Number of connections that can be opened beyond '
+                    'max_pool_size in the queue pool'),
+    cfg.IntOpt('pool_timeout',
+               default=30,
+               help='Seconds to wait for a connection from the queue pool'),
+    cfg.FloatOpt('vacuum_free_ratio',
+                 default=0.2,
+                 help='Reclaim unused space (VACUUM) once the ratio of free '
+                      'pages to total pages of the database exceeds this'),
+    cfg.IntOpt('vacuum_interval',
+               default=7,
+               help='Days between reclaiming unused space (VACUUM) '
+                    'regardless of free pages; 0 to disable'),
+    cfg.BoolOpt('backup_compress',
+                default=False,
+                help='Compress (gzip) database backups once rotated; the '
+                     'most recent backup is never compressed'),
+    cfg.IntOpt('backup_pages',
+               default=256,
+               help='Pages copied per step of the online database backup; '
+                    'other connections can write to the database between '
+                    'steps. -1 copies all pages in a single step'),
+    cfg.FloatOpt('backup_sleep',
+                 default=0,
+                 min=0,
+                 help='Seconds to pause between steps of the online database '
+                      'backup, allowing other connections to write to the '
+                      'database; 0 for no pause'),
+    cfg.IntOpt('fetch_chunk_size',
+               default=1000,
+               min=0,
+               help='Rows retrieved per query when fetching; results are '
+                    'fetched in chunks ordered by primary key to keep memory '
+                    'constant. 0 retrieves all rows with a single query'),
+    cfg.IntOpt('appstate_cache_ttl',
+               default=60,
+               min=0,
+               help='Seconds application state read from the database is '
+                    'served from memory; other processes (workers, admin) '
+                    'may change it meanwhile. 0 disables caching'),
+    cfg.IntOpt('purge_chunk_size',
+               default=500,
+               min=1,
+               help='Torrents purged or removed per statement during clean '
+                    'up; each chunk is a separate transaction'),
+    cfg.StrOpt('sqlite_journal_mode',
+               default='wal',
+               choices=['delete', 'truncate', 'persist', 'memory', 'wal'],
+               help='SQLite journal mode; wal allows reading the database '
+                    'while it is being written to'),
+    cfg.StrOpt('sqlite_synchronous',
+               default='normal',
+               choices=['off', 'normal', 'full', 'extra'],
+               help='SQLite synchronous mode; normal is safe with wal and '
+                    'avoids a fsync for each transaction'),
+    cfg.IntOpt('sqlite_cache_size',
+               default=-8000,
+               help='SQLite page cache size; negative values are in KiB, '
+                    'positive values in pages'),
+    cfg.IntOpt('sqlite_mmap_size',
+               default=67108864,
+               help='Bytes of the SQLite database file accessed using memory '
+                    'mapped I/O; 0 to disable'),
+    cfg.StrOpt('sqlite_temp_store',
+               default='memory',
+               choices=['default', 'file', 'memory'],
+               help='Where SQLite stores temporary tables and indices'),
+    cfg.IntOpt('sqlite_busy_timeout',
+               default=5000,
+               help='Milliseconds SQLite waits for a lock held by another '
+                    'connection to be released'),
 ]
 
 cfg.CONF.register_opts(DB_OPTS, 'database')
@@ -77,6 +177,39 @@ PROC_OPTS = [
                 default=[],
                 help='name of tasks associated with complete phase',
                 sample_default='filedelete'),
+    cfg.IntOpt('max_retries',
+               default=3,
+               help='Number of times a torrent is reprocessed after failing '
+                    'due to a transient error (e.g. network failure)'),
+    cfg.IntOpt('retry_delay',
+               default=300,
+               help='Seconds to wait before the first retry; doubled after '
+                    'each retry'),
+    cfg.IntOpt('retry_max_delay',
+               default=86400,
+               help='Maximum seconds to wait between retries'),
+    cfg.DictOpt('priority_rules',
+                default={},
+                help='Priority of torrents whose name matches a pattern '
+                     '(shell-style wildcards); the priorities of all the '
+                     'matching patterns are added up. Torrents of higher '
+                     'priority are processed first',
+                sample_default='*S[0-9][0-9]E[0-9][0-9]*:10'),
+    cfg.IntOpt('large_torrent_size',
+               default=0,
+               min=0,
+               help='Size (MB) of a torrent above which the priority is '
+                    'adjusted by large_torrent_priority. 0 to disable'),
+    cfg.IntOpt('large_torrent_priority',
+               default=-10,
+               help='Priority added to torrents larger than '
+                    'large_torrent_size'),
+    cfg.IntOpt('priority_aging',
+               default=1,
+               min=0,
+               help='Priority gained for each hour a torrent waits to be '
+                    'processed, such that torrents of low priority are '
+                    'eventually processed'),
 ]
 
 cfg.CONF.register_opts(PROC_OPTS, group='process')
@@ -92,7 +225,8 @@ cfg.CONF.register_opts(TASK_OPTS, group='tasks')
 SYNC_OPTS = [
     cfg.BoolOpt('dryrun',
                 default=False,
-                help='rsync dryrun option'),
+                help='rsync dryrun option; the delta backend skips the '
+                     'transfer'),
     cfg.BoolOpt('verbose',
                 default=False,
                 help='rsync verbose option'),
@@ -126,6 +260,36 @@ SYNC_OPTS = [
     cfg.StrOpt('remote_path',
                help='rsync destination path',
                sample_default='/media/downloads'),
+    cfg.IntOpt('bwlimit',
+               default=0,
+               help='Total bandwidth (KB/s) shared by all rsync processes '
+                    'running at the same time, including those of all '
+                    'workers (see [worker] workers); 0 for unlimited'),
+    cfg.ListOpt('bwlimit_schedule',
+                default=[],
+                help='Percent of bwlimit available during times of the day '
+                     '(HH:MM-HH:MM=PERCENT); full bwlimit used otherwise',
+                sample_default='07:00-17:00=50, 17:00-23:00=30'),
+    cfg.BoolOpt('track_progress',
+                default=False,
+                help='Capture rsync transfer progress (bytes, rate, eta) '
+                     'of each media file'),
+    cfg.IntOpt('progress_interval',
+               default=10,
+               help='Seconds between saving transfer progress of a media '
+                    'file'),
+    cfg.StrOpt('backend',
+               default='rsync',
+               help='Sync backend used to transfer media files (rsync, '
+                    'delta)'),
+    cfg.IntOpt('delta_port',
+               default=8730,
+               help='Port of the seedsync-receiver on the remote system '
+                    '(delta backend)'),
+    cfg.IntOpt('delta_block_size',
+               default=65536,
+               help='Size in bytes of the blocks compared between the local '
+                    'and remote copy of a file (delta backend)'),
 ]
 
 cfg.CONF.register_opts(SYNC_OPTS, group='tasks_filesync')
@@ -174,6 +338,78 @@ TORRENT_OPTS = [
 
 cfg.CONF.register_opts(TORRENT_OPTS, group='torrent')
 
+RETENTION_OPTS = [
+    cfg.IntOpt('max_rows',
+               default=1000,
+               min=1,
+               help='Maximum torrents purged (and removed) per run; spreads '
+                    'the clean up across runs'),
+    cfg.IntOpt('torrent_age',
+               default=7,
+               min=0,
+               help='Days after a torrent finished processing before the '
+                    'details of its media files are purged'),
+    cfg.IntOpt('torrent_count',
+               default=0,
+               min=0,
+               help='Number of most recent finished torrents whose media '
+                    'files are kept regardless of age; older ones are purged '
+                    'once the count is exceeded. 0 for no limit'),
+    cfg.IntOpt('max_db_size',
+               default=0,
+               min=0,
+               help='Size (MB) of the database above which media files of '
+                    'finished torrents are purged regardless of age. 0 for '
+                    'no limit'),
+    cfg.IntOpt('backup_count',
+               default=8,
+               min=1,
+               help='Number of database backups kept'),
+    cfg.IntOpt('backup_interval',
+               default=7,
+               min=0,
+               help='Days between database backups taken before purging'),
+]
+
+cfg.CONF.register_opts(RETENTION_OPTS, group='retention')
+
+WORKER_OPTS = [
+    cfg.BoolOpt('enabled',
+                default=False,
+                help='Queue tasks as jobs within the database, executed by '
+                     'any number of "seedmgr worker" processes (possibly on '
+                     'other hosts sharing the database), instead of the '
+                     'local process pool'),
+    cfg.IntOpt('workers',
+               default=1,
+               min=1,
+               help='Number of worker processes executing jobs, across all '
+                    'hosts; the bandwidth budget (bwlimit) is divided '
+                    'evenly between them'),
+    cfg.IntOpt('lease_timeout',
+               default=300,
+               min=1,
+               help='Seconds a claimed job is hidden from other workers; '
+                    'renewed while the job executes, such that the job of a '
+                    'worker that died is claimed by another once expired'),
+    cfg.IntOpt('max_attempts',
+               default=3,
+               min=1,
+               help='Times a job is claimed before it is abandoned and its '
+                    'media files marked as failed'),
+    cfg.IntOpt('poll_interval',
+               default=5,
+               min=1,
+               help='Seconds between checking for queued jobs, or for the '
+                    'completion of queued jobs'),
+    cfg.BoolOpt('exit_when_idle',
+                default=False,
+                help='Worker exits once no jobs are queued; otherwise waits '
+                     'for more jobs'),
+]
+
+cfg.CONF.register_opts(WORKER_OPTS, group='worker')
+
 
 def list_opts():
     """Returns a list of oslo_config options available in the library.
@@ -200,4 +436,6 @@ def list_opts():
     all_opts.extend(tools.make_opt_list([SYNC_OPTS], 'tasks_filesync'))
     all_opts.extend(tools.make_opt_list([SYNCLOG_OPTS], 'tasks_synclog'))
     all_opts.extend(tools.make_opt_list([TORRENT_OPTS], 'torrent'))
+    all_opts.extend(tools.make_opt_list([RETENTION_OPTS], 'retention'))
+    all_opts.extend(tools.make_opt_list([WORKER_OPTS], 'worker'))
     return all_opts
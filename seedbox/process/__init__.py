@@ -4,13 +4,18 @@ The core process flow for managing the syncing of torrents to remote location.
 """
 import logging
 
+from oslo_config import cfg
+
 from seedbox import db
+from seedbox.db import models
+from seedbox.process import jobqueue
 from seedbox.process import manager
-from seedbox.process import workflow
 from seedbox.torrent import loader
 
 LOG = logging.getLogger(__name__)
 
+cfg.CONF.import_group('worker', 'seedbox.options')
+
 
 def _get_work(dbapi):
 
@@ -27,20 +32,67 @@ def _get_work(dbapi):
         LOG.debug('torrent %s media files: %s',
                   tor.torrent_id, tor.media_files)
         if tor.media_files:
+            # xworkflows is only imported when there is work
+            from seedbox.process import workflow
+
             LOG.debug('creating workflow for torrent: %s', tor)
             flows.append(workflow.Workflow(dbapi, tor))
 
+    # the tasks of torrents with higher priority are dispatched first
+    flows.sort(key=lambda wf: wf.priority, reverse=True)
     return flows
 
 
-def start():
-    """The primary entry point for the process"""
+def save_results(dbapi, heartbeat=None):
+    """Creates the callback saving the results of each task as it completes.
+
+    The media files are saved along with a checkpoint of each media file
+    the task completed on, such that an interrupted run resumes without
+    executing the completed tasks again.
+
+    :param dbapi: an instance of the database API
+    :param heartbeat: callable invoked after saving the results (optional)
+    """
+    def _save(task, medias, started_at, finished_at):
+        task_medias = set(mf.media_id for mf in task.media_files)
+        checkpoints = [
+            models.TaskCheckpoint(checkpoint_id=None,
+                                  media_id=mf.media_id,
+                                  phase=task.phase,
+                                  task=type(task).__name__,
+                                  started_at=started_at,
+                                  finished_at=finished_at)
+            for mf in medias
+            if mf.media_id in task_medias and not mf.error_msg]
+        LOG.debug('saving media: %s', medias)
+        dbapi.save_task_results(medias, checkpoints)
+        if heartbeat is not None:
+            heartbeat()
+
+    return _save
+
+
+def _create_manager(dbapi, heartbeat=None):
+    if cfg.CONF.worker.enabled:
+        return jobqueue.JobManager(dbapi, heartbeat)
+    return manager.TaskManager()
+
+
+def start(heartbeat=None):
+    """The primary entry point for the process
+
+    :param heartbeat: callable invoked as progress is made (optional)
+    """
     dbapi = db.dbapi()
-    mgr = manager.TaskManager()
+    # created once there is work; a run without work never creates the
+    # process pool
+    mgr = None
     flows = []
 
     try:
         while True:
+            if heartbeat is not None:
+                heartbeat()
 
             # if no flows which should happen on initial run
             # or after processing all the previously found
@@ -53,16 +105,16 @@ def start():
                 if not flows:
                     break
 
+            if mgr is None:
+                mgr = _create_manager(dbapi, heartbeat)
+
             # for each flow get the next list of tasks to process
             for wf in flows:
                 mgr.add_tasks(list(wf.next_tasks()))
 
-            # now execute the via TaskManager
-            results = mgr.run()
-            for item in results:
-                LOG.debug('saving media: %s', item)
-                # the results should be the updated media so save it
-                dbapi.save_media(item)
+            # now execute the via TaskManager; the results are the updated
+            # media which are saved as each task completes.
+            mgr.run(on_done=save_results(dbapi, heartbeat))
 
             # for each flow execute it, if wf is done then remove it
             # from the list.
@@ -70,5 +122,6 @@ def start():
                 if wf.run():
                     flows.remove(wf)
     finally:
-        mgr.shutdown()
+        if mgr is not None:
+            mgr.shutdown()
         dbapi.clean_up()
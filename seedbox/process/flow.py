@@ -9,7 +9,9 @@ from oslo_config import cfg
 from stevedore import named
 import xworkflows
 
+from seedbox.common import timeutil
 from seedbox import constants
+from seedbox.torrent import priority
 
 LOG = logging.getLogger(__name__)
 
@@ -58,6 +60,9 @@ class BaseFlow(xworkflows.WorkflowEnabled):
         super(BaseFlow, self).__init__()
         self.dbapi = dbapi
         self.torrent = torrent
+        self.priority = priority.effective(torrent,
+                                           cfg.CONF.process.priority_aging,
+                                           timeutil.utcnow())
 
         # if we failed in the middle of the flow last time
         # we need to start from where we left off
@@ -101,15 +106,40 @@ class BaseFlow(xworkflows.WorkflowEnabled):
         :rtype: generator
         """
         LOG.debug('finding next tasks...')
+        medias = list(self.dbapi.get_medias_by(self.torrent.torrent_id,
+                                               missing=False,
+                                               skipped=False))
+        # when retrying only the media files that failed are processed
+        # again; the others already completed the current phase.
+        retries = [mf for mf in medias if mf.retryable]
+        if retries:
+            LOG.info('retrying %d media files of torrent %s',
+                     len(retries), self.torrent.name)
+            medias = retries
+
+        # tasks already completed when a previous run was interrupted
+        # are not executed again.
+        completed = set(
+            (cp.media_id, cp.task) for cp in self.dbapi.get_task_checkpoints(
+                [mf.media_id for mf in medias], self.phase))
+
+        actioned = set()
         for task in self.tasks:
             LOG.debug('checking task: %s', task)
-            for mf in list(self.dbapi.get_medias_by(self.torrent.torrent_id,
-                                                    missing=False,
-                                                    skipped=False)):
-                LOG.debug('test media actionable %s', mf)
-                if task.is_actionable(mf):
-                    LOG.debug('task actionable for media: %s', mf)
-                    yield task(mf)
+            pending = [mf for mf in medias
+                       if (mf.media_id, task.__name__) not in completed]
+            for item in task.create_tasks(pending):
+                LOG.debug('task actionable: %s', item)
+                item.phase = self.phase
+                item.priority = self.priority
+                actioned.update(mf.media_id for mf in item.media_files)
+                yield item
+
+        # nothing left to retry for these so stop restricting to them
+        for mf in retries:
+            if mf.media_id not in actioned:
+                mf.retryable = False
+                self.dbapi.save_media(mf)
 
     @xworkflows.on_enter_state()
     def update_state(self, *args, **kwargs):
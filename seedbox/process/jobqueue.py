@@ -0,0 +1,132 @@
+"""Manages the execution of tasks using jobs queued within the database.
+
+Each task is queued as a job, executed by any number of worker processes
+(``seedmgr worker``) possibly running on other hosts sharing the database.
+The workers save the outcome of each job, so the scheduler only waits for
+the queued jobs to complete.
+"""
+import logging
+import time
+
+from oslo_config import cfg
+
+from seedbox.common import timeutil
+from seedbox.db import models
+
+LOG = logging.getLogger(__name__)
+
+cfg.CONF.import_group('worker', 'seedbox.options')
+
+ABANDONED_MSG = 'job abandoned after {0} attempts'
+
+
+def _job_key(job):
+    return (job.torrent_id, job.phase, job.task, tuple(job.media_ids))
+
+
+def _is_abandoned(job, now, max_attempts):
+    # claimed too many times and the last lease expired
+    return (job.attempts >= max_attempts and
+            job.lease_expires_at is not None and
+            job.lease_expires_at <= now)
+
+
+class JobManager(object):
+    """Queues tasks as jobs and waits for the workers to execute them.
+
+    Provides the same interface as
+    :class:`~seedbox.process.manager.TaskManager`.
+
+    :param dbapi: an instance of the database API
+    :type dbapi: :class:`~seedbox.db.api.DBApi`
+    :param heartbeat: callable invoked while waiting on the workers
+                      (optional)
+    """
+
+    def __init__(self, dbapi, heartbeat=None):
+        self.dbapi = dbapi
+        self.heartbeat = heartbeat
+        self.poll_interval = cfg.CONF.worker.poll_interval
+        self.max_attempts = cfg.CONF.worker.max_attempts
+        self.tasks = []
+
+    def add_tasks(self, tasks):
+        """Adds tasks to list of tasks to be executed.
+
+        :param tasks: a task or list of tasks to add to the list of tasks to
+                      execute
+        """
+        if isinstance(tasks, list):
+            self.tasks.extend(tasks)
+        else:
+            self.tasks.append(tasks)
+
+    def _enqueue(self):
+        # jobs queued before an interrupted run are not queued again
+        queued = dict((_job_key(job), job) for job in self.dbapi.get_jobs())
+
+        jobs = []
+        new_jobs = []
+        for task in self.tasks:
+            job = models.Job(job_id=None,
+                             torrent_id=task.media_files[0].torrent_id,
+                             phase=task.phase,
+                             task=type(task).__name__,
+                             media_ids=[mf.media_id
+                                        for mf in task.media_files],
+                             priority=int(getattr(task, 'priority', 0)))
+            if _job_key(job) in queued:
+                jobs.append(queued[_job_key(job)])
+            else:
+                new_jobs.append(job)
+        del self.tasks[:]
+
+        if new_jobs:
+            jobs.extend(self.dbapi.enqueue_jobs(new_jobs))
+        LOG.info('queued %d jobs (%d previously queued)',
+                 len(new_jobs), len(jobs) - len(new_jobs))
+        return jobs
+
+    def _abandon(self, job):
+        """Marks the media files of a job claimed too many times as failed."""
+        LOG.warning('abandoning job %s of torrent %s after %d attempts',
+                    job.task, job.torrent_id, job.attempts)
+        medias = list(self.dbapi.get_medias({'in': {'id': job.media_ids}}))
+        for mf in medias:
+            mf.error_msg = ABANDONED_MSG.format(job.attempts)
+            mf.retryable = False
+        self.dbapi.save_task_results(medias, [])
+        self.dbapi.delete_jobs({'=': {'id': job.job_id}})
+
+    def run(self, on_done=None):
+        """Queues the list of tasks and waits for completion.
+
+        The workers save the outcome of each job; on_done is not invoked.
+        The heartbeat is invoked each time the jobs are checked, as the
+        workers make progress independently.
+
+        :param on_done: unused; accepted for compatibility with
+                        :class:`~seedbox.process.manager.TaskManager`
+        :return: an empty list; the outcome is saved by the workers
+        :rtype: list
+        """
+        pending = set(job.job_id for job in self._enqueue())
+        while pending:
+            time.sleep(self.poll_interval)
+            remaining = list(self.dbapi.get_jobs(
+                {'in': {'id': sorted(pending)}}))
+            now = timeutil.utcnow()
+            pending = set()
+            for job in remaining:
+                if _is_abandoned(job, now, self.max_attempts):
+                    self._abandon(job)
+                else:
+                    pending.add(job.job_id)
+            LOG.debug('waiting on %d jobs', len(pending))
+            if self.heartbeat is not None:
+                self.heartbeat()
+        return []
+
+    def shutdown(self):
+        """Nothing to release; the workers run independently."""
+        pass
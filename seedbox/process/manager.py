@@ -1,9 +1,13 @@
 """Manages the execution of tasks using parallel processes."""
+import collections
 import logging
 
 import concurrent.futures as conc_futures
 from oslo_config import cfg
 
+from seedbox.common import timeutil
+from seedbox import db
+
 LOG = logging.getLogger(__name__)
 
 cfg.CONF.import_group('process', 'seedbox.options')
@@ -16,10 +20,23 @@ class TaskManager(object):
     """
 
     def __init__(self):
-        self.executor = conc_futures.ProcessPoolExecutor(
-            cfg.CONF.process.max_processes)
+        self.max_processes = cfg.CONF.process.max_processes
+        self.executor = self._create_executor(self.max_processes)
         self.tasks = []
 
+    @staticmethod
+    def _create_executor(max_processes):
+        """Creates the process pool; each worker accesses the database
+        using its own connections.
+        """
+        try:
+            return conc_futures.ProcessPoolExecutor(
+                max_processes, initializer=db.init_worker)
+        except TypeError:
+            # initializer not supported (python < 3.7); the inherited
+            # database api is discarded on first use within the worker.
+            return conc_futures.ProcessPoolExecutor(max_processes)
+
     def add_tasks(self, tasks):
         """Adds tasks to list of tasks to be executed.
 
@@ -31,18 +48,59 @@ class TaskManager(object):
         else:
             self.tasks.append(tasks)
 
-    def run(self):
+    def _schedule(self, task, running, pending):
+        """Lets the task know how many of its kind may run alongside it.
+
+        Counts the tasks of its kind not yet completed, up to the number of
+        processes. The count only decreases as tasks complete, so the tasks
+        already running were scheduled for at least as many tasks as run
+        alongside the task; e.g. shares of a bandwidth budget allocated by
+        each never add up to more than the budget.
+        """
+        schedule = getattr(task, 'schedule', None)
+        if schedule is not None:
+            concurrency = 1 + sum(1 for other in running
+                                  if type(other) is type(task))
+            concurrency += sum(1 for other in pending
+                               if type(other) is type(task))
+            schedule(min(concurrency, self.max_processes))
+
+    def run(self, on_done=None):
         """Executes the list of tasks.
 
+        Tasks are only dispatched as a process becomes available, such that
+        each task is scheduled knowing the tasks running at that moment;
+        tasks of higher priority are dispatched first.
+
+        :param on_done: callable invoked with the task, its result, and
+                        when the task started and finished, as each task
+                        completes (optional)
         :return: the result/output from each tasks
         :rtype: list
         """
-        futures_task = [self.executor.submit(task) for task in self.tasks]
+        pending = collections.deque(
+            sorted(self.tasks, key=lambda task: getattr(task, 'priority', 0),
+                   reverse=True))
         del self.tasks[:]
 
+        running = {}
         results = []
-        for future in conc_futures.as_completed(futures_task):
-            results.extend(future.result())
+        while pending or running:
+            while pending and len(running) < self.max_processes:
+                task = pending.popleft()
+                self._schedule(task, [other for other, _ in
+                                      running.values()], pending)
+                running[self.executor.submit(task)] = (task,
+                                                       timeutil.utcnow())
+
+            done, _ = conc_futures.wait(
+                running, return_when=conc_futures.FIRST_COMPLETED)
+            for future in done:
+                task, started_at = running.pop(future)
+                result = future.result()
+                if on_done is not None:
+                    on_done(task, result, started_at, timeutil.utcnow())
+                results.extend(result)
 
         return results
 
@@ -0,0 +1,135 @@
+"""Executes the jobs queued within the database.
+
+Any number of workers, on any number of hosts sharing the database, claim
+and execute the jobs queued by the scheduler (see
+:mod:`~seedbox.process.jobqueue`)::
+
+    seedmgr worker
+
+A claimed job is leased to the worker; the lease is renewed while the job
+executes, such that the job of a worker that died is claimed by another
+worker once the lease expires.
+
+A worker executes a single task at a time; each sync is given an even share
+of the bandwidth budget (``bwlimit``) between the configured workers, such
+that all workers together stay within the budget.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+
+from oslo_config import cfg
+
+from seedbox.common import timeutil
+from seedbox import db
+from seedbox import process
+from seedbox.process import flow
+
+LOG = logging.getLogger(__name__)
+
+cfg.CONF.import_group('worker', 'seedbox.options')
+
+UNKNOWN_TASK_MSG = 'task {0} not configured for phase {1}'
+
+
+class _Heartbeat(threading.Thread):
+    """Renews the lease of a job while the job executes."""
+
+    def __init__(self, dbapi, job, lease_timeout):
+        super(_Heartbeat, self).__init__(name='heartbeat-%s' % job.job_id)
+        self.daemon = True
+        self.dbapi = dbapi
+        self.job = job
+        self.lease_timeout = lease_timeout
+        self._stopped = threading.Event()
+
+    def run(self):
+        # renewed well before expiring to allow for a slow database
+        while not self._stopped.wait(self.lease_timeout / 3.0):
+            if not self.dbapi.renew_job(self.job, self.lease_timeout):
+                LOG.warning('lease of job %s lost', self.job.job_id)
+                break
+
+    def stop(self):
+        """Stops renewing the lease."""
+        self._stopped.set()
+        self.join()
+
+
+def _get_task(phase, name):
+    for task in flow.get_tasks(phase):
+        if task.__name__ == name:
+            return task
+    return None
+
+
+def execute(dbapi, job, workers=1):
+    """Executes the tasks of a job and saves the outcome.
+
+    :param dbapi: an instance of the database API
+    :type dbapi: :class:`~seedbox.db.api.DBApi`
+    :param job: an instance of job claimed by the worker
+    :type job: :class:`~seedbox.db.models.Job`
+    :param int workers: number of workers sharing the bandwidth budget
+    """
+    medias = list(dbapi.get_medias({'in': {'id': job.media_ids}}))
+    task_cls = _get_task(job.phase, job.task)
+    if task_cls is None:
+        LOG.error('task %s not configured for phase %s; failing job %s',
+                  job.task, job.phase, job.job_id)
+        # the torrent must not advance without the task being executed
+        for mf in medias:
+            mf.error_msg = UNKNOWN_TASK_MSG.format(job.task, job.phase)
+            mf.retryable = False
+        dbapi.save_task_results(medias, [])
+        return
+
+    save_results = process.save_results(dbapi)
+    for task in task_cls.create_tasks(medias):
+        task.phase = job.phase
+        schedule = getattr(task, 'schedule', None)
+        if schedule is not None:
+            # the only task running within the worker, alongside the
+            # task of each of the other workers
+            schedule(workers)
+        started_at = timeutil.utcnow()
+        save_results(task, task(), started_at, timeutil.utcnow())
+
+
+def run(conf=cfg.CONF):
+    """Claims and executes queued jobs until stopped.
+
+    :param oslo_config.cfg.ConfigOpts conf: an instance of configuration
+    :return: total jobs executed
+    :rtype: int
+    """
+    dbapi = db.dbapi(conf)
+    owner = '{0}:{1}'.format(socket.gethostname(), os.getpid())
+    lease_timeout = conf.worker.lease_timeout
+    LOG.info('worker %s waiting for jobs', owner)
+
+    total = 0
+    while True:
+        job = dbapi.claim_job(owner, lease_timeout, conf.worker.max_attempts)
+        if job is None:
+            if conf.worker.exit_when_idle:
+                break
+            time.sleep(conf.worker.poll_interval)
+            continue
+
+        LOG.info('executing job %s: %s of torrent %s (attempt %d)',
+                 job.job_id, job.task, job.torrent_id, job.attempts)
+        heartbeat = _Heartbeat(dbapi, job, lease_timeout)
+        heartbeat.start()
+        try:
+            execute(dbapi, job, conf.worker.workers)
+        finally:
+            heartbeat.stop()
+        if not dbapi.complete_job(job):
+            LOG.warning('job %s was claimed by another worker', job.job_id)
+        total += 1
+
+    LOG.info('worker %s executed %d jobs', owner, total)
+    return total
@@ -12,12 +12,18 @@ Continues to process each step until the workflow reaches completion.
     wf.run()
 
 """
+import datetime
 import logging
 
+from oslo_config import cfg
+
+from seedbox.common import timeutil
 from seedbox.process import flow
 
 LOG = logging.getLogger(__name__)
 
+cfg.CONF.import_group('process', 'seedbox.options')
+
 
 class Workflow(flow.BaseFlow):
     """Implementation that handles the orchestration of the process"""
@@ -34,10 +40,67 @@ class Workflow(flow.BaseFlow):
                     flow.InvalidTransitionError,
                     flow.ForbiddenTransition) as wferr:
                 LOG.exception('workflow error:')
+                delay = self._prepare_retry()
+                # fetched after preparing the retry to include the updated
+                # media files.
                 self.torrent = self.dbapi.get_torrent(self.torrent.torrent_id)
                 self.torrent.error_msg = str(wferr)
-                self.torrent.failed = True
+                if delay is None:
+                    self.torrent.failed = True
+                else:
+                    self.torrent.retry_count = (
+                        self.torrent.retry_count or 0) + 1
+                    self.torrent.retry_at = (
+                        timeutil.utcnow() + datetime.timedelta(seconds=delay))
+                    LOG.info('retry %d of torrent %s in %d seconds',
+                             self.torrent.retry_count, self.torrent.name,
+                             delay)
                 self.torrent = self.dbapi.save_torrent(self.torrent)
                 return True
+            else:
+                self._reset_retry()
 
         return self.is_done()
+
+    def _reset_retry(self):
+        """Clears the retry details once a phase completes successfully.
+
+        A later failure then starts again with the shortest delay and all
+        retries available.
+        """
+        if (self.torrent.retry_count or self.torrent.retry_at or
+                self.torrent.error_msg):
+            self.torrent.retry_count = 0
+            self.torrent.retry_at = None
+            self.torrent.error_msg = None
+            self.torrent = self.dbapi.save_torrent(self.torrent)
+
+    def _prepare_retry(self):
+        """Prepares the torrent to be reprocessed at a later time.
+
+        Only possible when each media file failed due to a transient error
+        and the torrent has not already been retried too many times. The
+        delay before the retry doubles after each retry.
+
+        :return: seconds to wait before retrying or None if not retryable
+        :rtype: int
+        """
+        failures = [mf for mf in
+                    self.dbapi.get_medias_by(self.torrent.torrent_id,
+                                             missing=False,
+                                             skipped=False)
+                    if mf.error_msg]
+
+        retry_count = self.torrent.retry_count or 0
+        if (not failures or not all(mf.retryable for mf in failures) or
+                retry_count >= cfg.CONF.process.max_retries):
+            return None
+
+        # the media files keep the retryable flag so the retry only
+        # processes the media files that failed.
+        for mf in failures:
+            mf.error_msg = None
+            self.dbapi.save_media(mf)
+
+        return min(cfg.CONF.process.retry_delay * 2 ** retry_count,
+                   cfg.CONF.process.retry_max_delay)
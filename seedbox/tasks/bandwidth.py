@@ -0,0 +1,106 @@
+"""Bandwidth policy applied to syncing media files.
+
+A total bandwidth budget (KB/s) is shared by all syncs running at the same
+time. The budget can be reduced during specific times of the day by a
+schedule made up of entries in the format ``HH:MM-HH:MM=PERCENT``; e.g.::
+
+    bwlimit = 10000
+    bwlimit_schedule = 07:00-17:00=50, 17:00-23:00=30
+
+Outside of the scheduled windows the full budget is available. A window
+that ends before it starts (``22:00-02:00=20``) spans midnight.
+"""
+import datetime
+import logging
+
+from oslo_config import cfg
+
+LOG = logging.getLogger(__name__)
+
+cfg.CONF.import_group('tasks_filesync', 'seedbox.options')
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def _to_minutes(value):
+    hours, minutes = value.strip().split(':')
+    total = int(hours) * 60 + int(minutes)
+    if not 0 <= total <= MINUTES_PER_DAY:
+        raise ValueError('invalid time of day: {0}'.format(value))
+    return total
+
+
+def parse_schedule(entries):
+    """Parses the entries of a bandwidth schedule.
+
+    :param list entries: schedule entries (``HH:MM-HH:MM=PERCENT``)
+    :return: a list of (start minute, end minute, percent) tuples
+    :rtype: list
+    :raise ValueError: if an entry is not properly formatted
+    """
+    schedule = []
+    for entry in entries or []:
+        try:
+            window, percent = entry.split('=')
+            start, end = window.split('-')
+            schedule.append((_to_minutes(start), _to_minutes(end),
+                             int(percent)))
+        except ValueError:
+            raise ValueError(
+                'invalid bandwidth schedule entry: {0}'.format(entry))
+    return schedule
+
+
+def percent_available(schedule, now):
+    """Determines the percent of the budget available at a point in time.
+
+    :param list schedule: parsed bandwidth schedule
+    :param datetime.datetime now: the point in time to check
+    :return: percent of budget available
+    :rtype: int
+    """
+    minute = now.hour * 60 + now.minute
+    for start, end, percent in schedule:
+        if start <= end:
+            if start <= minute < end:
+                return percent
+        elif minute >= start or minute < end:
+            return percent
+    return 100
+
+
+def budget(now=None):
+    """Total bandwidth (KB/s) available to all syncs at a point in time.
+
+    :param datetime.datetime now: the point in time to check (default: now)
+    :return: bandwidth in KB/s; 0 when unlimited
+    :rtype: int
+    """
+    total = cfg.CONF.tasks_filesync.bwlimit
+    if not total:
+        return 0
+
+    if now is None:
+        now = datetime.datetime.now()
+    percent = percent_available(
+        parse_schedule(cfg.CONF.tasks_filesync.bwlimit_schedule), now)
+    # never return 0 as that would remove the limit altogether
+    return max(1, int(total * percent / 100))
+
+
+def allocate(concurrency, now=None):
+    """Share of the bandwidth budget for a single sync.
+
+    :param int concurrency: most syncs running at the same time as this
+                            one, including it
+    :param datetime.datetime now: the point in time to check (default: now)
+    :return: bandwidth in KB/s; 0 when unlimited
+    :rtype: int
+    """
+    total = budget(now)
+    if not total:
+        return 0
+    share = max(1, total // max(1, concurrency))
+    LOG.debug('bandwidth share %d KB/s of %d KB/s (%d syncs)',
+              share, total, concurrency)
+    return share
@@ -3,8 +3,10 @@
 Also handles execution and basic error handling.
 """
 import abc
+import errno
 import logging
 import os
+import socket
 import traceback
 
 from oslo_config import cfg
@@ -16,15 +18,51 @@ LOG = logging.getLogger(__name__)
 
 cfg.CONF.import_group('tasks', 'seedbox.options')
 
+# errors that are likely to go away when the task is executed again
+TRANSIENT_ERRNOS = frozenset([errno.EAGAIN,
+                              errno.EBUSY,
+                              errno.ECONNABORTED,
+                              errno.ECONNREFUSED,
+                              errno.ECONNRESET,
+                              errno.EHOSTUNREACH,
+                              errno.ENETDOWN,
+                              errno.ENETUNREACH,
+                              errno.EPIPE,
+                              errno.ETIMEDOUT])
+
 
 @six.add_metaclass(abc.ABCMeta)
 class BaseTask(object):
     """Provides the base definition of a task."""
 
+    # name of the workflow phase the task executes within, and priority of
+    # the torrent; assigned by the workflow creating the task.
+    phase = None
+    priority = 0
+
     def __init__(self, media_file):
         self.media_file = media_file
         self.gen_files = []
 
+    @classmethod
+    def create_tasks(cls, media_files):
+        """Creates the tasks to execute for the media files of a torrent.
+
+        :param list media_files: media files of a torrent
+        :returns: a task for each actionable media file
+        :rtype: list
+        """
+        return [cls(mf) for mf in media_files if cls.is_actionable(mf)]
+
+    @property
+    def media_files(self):
+        """The media files processed by the task.
+
+        :return: media files
+        :rtype: list
+        """
+        return [self.media_file]
+
     def __call__(self):
         """Provides ability to execute the task in a consistent manner."""
         try:
@@ -32,8 +70,10 @@ class BaseTask(object):
             self.execute()
             self.media_file.total_time = timeutil.delta_seconds(
                 _start, timeutil.utcnow())
-        except Exception:
+            self.media_file.retryable = False
+        except Exception as err:
             self.media_file.error_msg = traceback.format_exc()
+            self.media_file.retryable = self.is_transient(err)
         self.gen_files.append(self.media_file)
         return self.gen_files
 
@@ -54,6 +94,7 @@ class BaseTask(object):
         _base['missing'] = False
         _base['skipped'] = False
         _base['error_msg'] = None
+        _base['retryable'] = False
         _base['total_time'] = None
 
         for mf in files:
@@ -65,6 +106,32 @@ class BaseTask(object):
 
         LOG.debug('gen_files: %s', self.gen_files)
 
+    def schedule(self, concurrency):
+        """Invoked right before the task is dispatched for execution.
+
+        Allows a task to adjust itself based on how many tasks of the same
+        type will be running at the same time.
+
+        :param int concurrency: number of tasks of the same type running
+                                including this task
+        """
+        pass
+
+    def is_transient(self, error):
+        """Classifies an error raised while executing the task.
+
+        A transient error (e.g. network failure) is expected to go away
+        when the task is executed again, whereas a permanent error is not.
+
+        :param error: the exception raised by the task
+        :returns: a flag indicating the error is transient
+        :rtype: boolean
+        """
+        if isinstance(error, socket.timeout):
+            return True
+        return (isinstance(error, EnvironmentError) and
+                error.errno in TRANSIENT_ERRNOS)
+
     @staticmethod
     def is_actionable(media_file):
         """Perform check to determine if action should be taken.
@@ -85,3 +152,72 @@ class BaseTask(object):
         return '{0}: {1}'.format(self.__class__.__name__, self.__dict__)
 
     __repr__ = __str__
+
+
+class BatchTask(BaseTask):
+    """Provides the base definition of a task acting on many media files.
+
+    A single task is created for all the actionable media files of a
+    torrent, avoiding dispatching a task per media file when the action
+    performed on each is trivial.
+
+    :param list media_files: the media files to act on
+    """
+
+    def __init__(self, media_files):
+        super(BatchTask, self).__init__(None)
+        self._media_files = list(media_files)
+
+    @classmethod
+    def create_tasks(cls, media_files):
+        """Creates a single task for the media files of a torrent.
+
+        :param list media_files: media files of a torrent
+        :returns: a task for all actionable media files, if any
+        :rtype: list
+        """
+        batch = [mf for mf in media_files if cls.is_actionable(mf)]
+        return [cls(batch)] if batch else []
+
+    @property
+    def media_files(self):
+        """The media files processed by the task.
+
+        :return: media files
+        :rtype: list
+        """
+        return self._media_files
+
+    def __call__(self):
+        """Provides ability to execute the task in a consistent manner."""
+        _start = timeutil.utcnow()
+        try:
+            self.execute()
+        except Exception as err:
+            for mf in self.media_files:
+                if not mf.error_msg:
+                    self.fail(mf, err)
+
+        total_time = timeutil.delta_seconds(_start, timeutil.utcnow())
+        for mf in self.media_files:
+            if not mf.error_msg:
+                mf.retryable = False
+                mf.total_time = total_time / len(self.media_files)
+        return self.media_files + self.gen_files
+
+    def fail(self, media_file, error):
+        """Records an error for a single media file of the batch.
+
+        Must be invoked while handling the error.
+
+        :param media_file: the media file that failed
+        :param error: the exception raised
+        """
+        media_file.error_msg = traceback.format_exc()
+        media_file.retryable = self.is_transient(error)
+
+    def __str__(self):
+        return '{0}: {1}'.format(self.__class__.__name__,
+                                 [mf.filename for mf in self.media_files])
+
+    __repr__ = __str__
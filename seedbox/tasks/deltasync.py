@@ -0,0 +1,648 @@
+"""Native delta-transfer sync backend.
+
+Transfers a media file using the rsync algorithm implemented in python,
+without depending on an external ``rsync`` binary or SSH:
+
+#. the receiver splits its copy of the file (a previously completed or
+   partial transfer) into blocks and returns a weak (rolling adler32) and a
+   strong (md5) checksum of each block.
+#. the sender rolls the weak checksum over its file one byte at a time and
+   sends only a reference to each block the receiver already has, and the
+   literal data for everything else. Blocks matching at the same offset
+   (e.g. an unchanged file) are found without rolling.
+#. the receiver rebuilds the file from the references and the literal data,
+   then verifies the checksum of the whole file.
+
+An interrupted transfer leaves a ``.part`` file behind on the receiver, that
+is used as the basis for the next attempt, such that the transfer resumes
+instead of starting over; being a prefix of the file, the blocks of the
+``.part`` file are referenced and the rest is sent without rolling.
+
+The receiver runs either in process (local target directory) or as a
+separate process reachable over a socket::
+
+    seedsync-receiver --root /media/downloads --port 8730
+
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import socket
+import struct
+import time
+import zlib
+
+from oslo_config import cfg
+from six.moves import socketserver
+
+from seedbox.tasks import progress
+from seedbox.tasks import syncbackend
+
+LOG = logging.getLogger(__name__)
+
+cfg.CONF.import_group('tasks', 'seedbox.options')
+cfg.CONF.import_group('tasks_filesync', 'seedbox.options')
+
+MOD_ADLER = 65521
+PART_SUFFIX = '.part'
+TMP_SUFFIX = '.tmp'
+
+# frame types of the wire protocol
+HELLO = b'H'
+SIGNATURE = b'S'
+PARTIAL = b'P'
+COPY = b'C'
+DATA = b'D'
+END = b'E'
+STATUS = b'R'
+
+FRAME = struct.Struct('>cI')
+BLOCK = struct.Struct('>I16s')
+INDEX = struct.Struct('>I')
+
+
+class DeltaSyncError(Exception):
+    """Represents a failure to transfer a file using delta sync."""
+    pass
+
+
+class DeltaTransferError(DeltaSyncError):
+    """Represents a failure of the connection or protocol while transferring
+    a file; expected to go away when transferred again.
+    """
+    pass
+
+
+def weak_checksum(data):
+    """Computes the weak (adler32) checksum of a block of data.
+
+    :param data: block of data
+    :return: checksum
+    :rtype: int
+    """
+    return zlib.adler32(bytes(data)) & 0xffffffff
+
+
+def roll_checksum(checksum, block_size, out_byte, in_byte):
+    """Rolls the weak checksum forward by a single byte.
+
+    :param int checksum: weak checksum of the current window
+    :param int block_size: size of the window
+    :param int out_byte: byte leaving the window
+    :param int in_byte: byte entering the window
+    :return: weak checksum of the new window
+    :rtype: int
+    """
+    a = checksum & 0xffff
+    b = checksum >> 16
+    a = (a - out_byte + in_byte) % MOD_ADLER
+    b = (b - block_size * out_byte + a - 1) % MOD_ADLER
+    return (b << 16) | a
+
+
+def signature(fileobj, block_size):
+    """Computes the checksums of each block of a file.
+
+    :param fileobj: file to compute checksums of
+    :param int block_size: size of each block
+    :return: list of (weak, strong) checksums in order of the blocks
+    :rtype: list
+    """
+    blocks = []
+    while True:
+        data = fileobj.read(block_size)
+        if not data:
+            break
+        blocks.append((weak_checksum(data), hashlib.md5(data).digest()))
+    return blocks
+
+
+def delta(fileobj, blocks, block_size, checksum=None, partial=False):
+    """Computes the difference of a file against the checksums of a basis.
+
+    The blocks at the start of the file matching the block of the basis at
+    the same offset are referenced without rolling the weak checksum. When
+    the basis is a partial transfer (a prefix of the file) nothing after
+    the first block that differs can match, so the rest is literal data.
+
+    :param fileobj: file to transfer
+    :param list blocks: checksums of the basis (see :func:`signature`)
+    :param int block_size: size of each block
+    :param checksum: hash object updated with the content of the file
+                     (optional)
+    :param bool partial: flag indicating the basis is a partial transfer
+    :return: (COPY, block index) or (DATA, literal data) operations
+    :rtype: generator
+    """
+    def _track(data):
+        if checksum is not None:
+            checksum.update(data)
+        return data
+
+    data = b''
+    for index, (weak, strong) in enumerate(blocks):
+        data = fileobj.read(block_size)
+        if (not data or weak_checksum(data) != weak or
+                hashlib.md5(data).digest() != strong):
+            break
+        _track(data)
+        yield COPY, index
+        data = b''
+
+    # nothing else to compare against so everything is literal data
+    if partial or not blocks:
+        data = data or fileobj.read(block_size)
+        while data:
+            yield DATA, _track(data)
+            data = fileobj.read(block_size)
+        return
+
+    lookup = {}
+    for index, (weak, strong) in enumerate(blocks):
+        lookup.setdefault(weak, {}).setdefault(strong, index)
+
+    buf = bytearray(data)
+    pos = 0
+    eof = False
+    weak = None
+    literal = bytearray()
+
+    while True:
+        if not eof and len(buf) - pos <= block_size:
+            more = fileobj.read(block_size * 4)
+            if more:
+                buf = buf[pos:] + bytearray(more)
+                pos = 0
+            else:
+                eof = True
+
+        remaining = len(buf) - pos
+        if remaining == 0:
+            break
+
+        if remaining < block_size:
+            # the tail of the file can only match the last (short) block
+            # of the basis.
+            tail = buf[pos:]
+            index = lookup.get(weak_checksum(tail), {}).get(
+                hashlib.md5(tail).digest())
+            if index is None:
+                literal.extend(tail)
+            else:
+                if literal:
+                    yield DATA, _track(bytes(literal))
+                    literal = bytearray()
+                _track(bytes(tail))
+                yield COPY, index
+            break
+
+        if weak is None:
+            weak = weak_checksum(buf[pos:pos + block_size])
+
+        candidates = lookup.get(weak)
+        if candidates:
+            window = buf[pos:pos + block_size]
+            index = candidates.get(hashlib.md5(window).digest())
+            if index is not None:
+                if literal:
+                    yield DATA, _track(bytes(literal))
+                    literal = bytearray()
+                _track(bytes(window))
+                yield COPY, index
+                pos += block_size
+                weak = None
+                continue
+
+        # no match; move the window forward by a single byte
+        if pos + block_size < len(buf):
+            weak = roll_checksum(weak, block_size, buf[pos],
+                                 buf[pos + block_size])
+        else:
+            weak = None
+        literal.append(buf[pos])
+        pos += 1
+
+        if len(literal) >= block_size:
+            yield DATA, _track(bytes(literal))
+            literal = bytearray()
+
+    if literal:
+        yield DATA, _track(bytes(literal))
+
+
+def patch(basis, ops, out, block_size):
+    """Rebuilds a file from a basis and delta operations.
+
+    :param basis: file the delta was computed against
+    :param ops: delta operations (see :func:`delta`)
+    :param out: file to write the rebuilt content to
+    :param int block_size: size of each block
+    """
+    for op, value in ops:
+        if op == COPY:
+            basis.seek(value * block_size)
+            out.write(basis.read(block_size))
+        else:
+            out.write(value)
+
+
+def _target_path(root, filename):
+    root = os.path.abspath(root)
+    path = os.path.abspath(os.path.join(root, filename))
+    if os.path.isabs(filename) or not path.startswith(root + os.sep):
+        raise DeltaSyncError('invalid filename: {0}'.format(filename))
+    return path
+
+
+class DeltaReceiver(object):
+    """Rebuilds a transferred file within the root directory.
+
+    :param str root: directory files are transferred to
+    :param str filename: name of the file being transferred
+    :param int block_size: size of each block
+    """
+
+    def __init__(self, root, filename, block_size):
+        self.path = _target_path(root, filename)
+        self.part_path = self.path + PART_SUFFIX
+        self.tmp_path = self.path + TMP_SUFFIX
+        self.block_size = block_size
+        self.completed = False
+        self.partial = False
+        self._basis = None
+        self._out = None
+        self._checksum = hashlib.md5()
+
+    def signature(self):
+        """Prepares to receive the file.
+
+        :return: checksums of the existing copy of the file
+        :rtype: list
+        """
+        blocks = []
+        # a partial transfer is more recent than any previous copy
+        for basis_path in [self.part_path, self.path]:
+            if os.path.exists(basis_path):
+                LOG.debug('using basis %s', basis_path)
+                self.partial = basis_path == self.part_path
+                self._basis = open(basis_path, 'rb')
+                blocks = signature(self._basis, self.block_size)
+                break
+
+        target_dir = os.path.dirname(self.path)
+        if not os.path.exists(target_dir):
+            os.makedirs(target_dir)
+        self._out = open(self.tmp_path, 'wb')
+        return blocks
+
+    def apply(self, op, value):
+        """Applies a single delta operation.
+
+        :param op: type of operation (COPY or DATA)
+        :param value: block index or literal data
+        """
+        if op == COPY:
+            if self._basis is None:
+                raise DeltaTransferError('no basis to copy block from')
+            self._basis.seek(value * self.block_size)
+            value = self._basis.read(self.block_size)
+        self._out.write(value)
+        self._checksum.update(value)
+
+    def finish(self, digest):
+        """Completes the transfer once the rebuilt file is verified.
+
+        :param bytes digest: md5 digest of the file sent
+        :raise DeltaSyncError: if the rebuilt file does not match
+        """
+        self._close_files()
+        if digest != self._checksum.digest():
+            os.remove(self.tmp_path)
+            raise DeltaSyncError('checksum mismatch for {0}'.format(
+                self.path))
+
+        os.rename(self.tmp_path, self.path)
+        if os.path.exists(self.part_path):
+            os.remove(self.part_path)
+        self.completed = True
+
+    def close(self):
+        """Releases resources, keeping partial content for resuming."""
+        self._close_files()
+        if self.completed or not os.path.exists(self.tmp_path):
+            return
+
+        part_size = 0
+        if os.path.exists(self.part_path):
+            part_size = os.path.getsize(self.part_path)
+        if os.path.getsize(self.tmp_path) >= part_size:
+            os.rename(self.tmp_path, self.part_path)
+        else:
+            os.remove(self.tmp_path)
+
+    def _close_files(self):
+        for fileobj in [self._basis, self._out]:
+            if fileobj is not None:
+                fileobj.close()
+        self._basis = None
+        self._out = None
+
+
+def write_frame(stream, kind, payload=b''):
+    """Writes a single frame of the wire protocol.
+
+    :param stream: writable stream
+    :param bytes kind: type of frame
+    :param bytes payload: content of frame
+    """
+    stream.write(FRAME.pack(kind, len(payload)))
+    stream.write(payload)
+
+
+def _read_exact(stream, length):
+    data = stream.read(length)
+    if len(data) != length:
+        raise DeltaTransferError('connection closed during transfer')
+    return data
+
+
+def read_frame(stream):
+    """Reads a single frame of the wire protocol.
+
+    :param stream: readable stream
+    :return: type of frame, content of frame
+    :rtype: tuple
+    """
+    kind, length = FRAME.unpack(_read_exact(stream, FRAME.size))
+    return kind, _read_exact(stream, length)
+
+
+class LocalChannel(object):
+    """Transfers files to a directory on the local host.
+
+    :param str root: directory files are transferred to
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.partial = False
+        self._receiver = None
+
+    def signature(self, filename, block_size):
+        """Retrieves the checksums of the existing copy of the file."""
+        self._receiver = DeltaReceiver(self.root, filename, block_size)
+        blocks = self._receiver.signature()
+        self.partial = self._receiver.partial
+        return blocks
+
+    def apply(self, op, value):
+        """Sends a single delta operation."""
+        self._receiver.apply(op, value)
+
+    def finish(self, digest):
+        """Completes the transfer."""
+        self._receiver.finish(digest)
+
+    def close(self):
+        """Releases resources."""
+        if self._receiver is not None:
+            self._receiver.close()
+
+
+class SocketChannel(object):
+    """Transfers files to a receiver process over a socket.
+
+    :param str host: host name of the receiver
+    :param int port: port the receiver listens on
+    """
+
+    def __init__(self, host, port):
+        self.partial = False
+        self._sock = socket.create_connection((host, port))
+        self._rfile = self._sock.makefile('rb')
+        self._wfile = self._sock.makefile('wb')
+
+    def _status(self, payload):
+        status = json.loads(payload.decode('utf-8'))
+        if not status.get('ok'):
+            if status.get('transient'):
+                raise DeltaTransferError(status.get('error'))
+            raise DeltaSyncError(status.get('error'))
+
+    def signature(self, filename, block_size):
+        """Retrieves the checksums of the existing copy of the file."""
+        header = {'filename': filename, 'block_size': block_size}
+        write_frame(self._wfile, HELLO, json.dumps(header).encode('utf-8'))
+        self._wfile.flush()
+
+        kind, payload = read_frame(self._rfile)
+        if kind == STATUS:
+            self._status(payload)
+        self.partial = kind == PARTIAL
+        return [BLOCK.unpack_from(payload, offset)
+                for offset in range(0, len(payload), BLOCK.size)]
+
+    def apply(self, op, value):
+        """Sends a single delta operation."""
+        if op == COPY:
+            value = INDEX.pack(value)
+        write_frame(self._wfile, op, value)
+
+    def finish(self, digest):
+        """Completes the transfer."""
+        write_frame(self._wfile, END, digest)
+        self._wfile.flush()
+        _, payload = read_frame(self._rfile)
+        self._status(payload)
+
+    def close(self):
+        """Releases resources."""
+        for stream in [self._wfile, self._rfile]:
+            try:
+                stream.close()
+            except (IOError, OSError, socket.error):
+                pass
+        self._sock.close()
+
+
+def send_file(path, filename, channel, block_size, bwlimit=0,
+              recorder=None):
+    """Transfers a file using delta sync.
+
+    :param str path: location of the file to transfer
+    :param str filename: name of the file at the destination
+    :param channel: channel to the receiver
+    :param int block_size: size of each block
+    :param int bwlimit: maximum KB/s to send; 0 for unlimited
+    :param recorder: receives progress of the transfer (optional)
+    :type recorder: :class:`~seedbox.tasks.progress.ProgressRecorder`
+    :return: total bytes sent
+    :rtype: int
+    """
+    size = os.path.getsize(path)
+    checksum = hashlib.md5()
+    started = time.time()
+    sent = 0
+
+    try:
+        blocks = channel.signature(filename, block_size)
+        with open(path, 'rb') as source:
+            for op, value in delta(source, blocks, block_size, checksum,
+                                   channel.partial):
+                channel.apply(op, value)
+                sent += FRAME.size + (INDEX.size if op == COPY
+                                      else len(value))
+
+                elapsed = time.time() - started
+                if bwlimit:
+                    wait = sent / (bwlimit * 1024.0) - elapsed
+                    if wait > 0:
+                        time.sleep(wait)
+                        elapsed += wait
+
+                if recorder is not None and elapsed > 0:
+                    processed = min(source.tell(), size)
+                    eta = None
+                    if processed:
+                        eta = int((size - processed) * elapsed / processed)
+                    recorder.update(processed,
+                                    int(processed * 100 / size),
+                                    sent / elapsed,
+                                    eta)
+        channel.finish(checksum.digest())
+    finally:
+        channel.close()
+
+    LOG.debug('sent %d bytes for %s (%d bytes)', sent, filename, size)
+    return sent
+
+
+class DeltaBackend(syncbackend.SyncBackend):
+    """Transfers media files using the native delta-transfer algorithm.
+
+    When ``remote_host`` is configured the file is sent to the receiver
+    listening on ``delta_port``; otherwise it is transferred to the local
+    ``remote_path`` directory.
+    """
+
+    def sync(self, task):
+        """Transfers the media file of the sync task.
+
+        :param task: the sync task being executed
+        :type task: :class:`~seedbox.tasks.filesync.SyncFile`
+        """
+        conf = cfg.CONF.tasks_filesync
+        if conf.dryrun:
+            LOG.info('dryrun; skipping transfer of %s',
+                     task.media_file.filename)
+            return
+
+        if conf.remote_host:
+            channel = SocketChannel(conf.remote_host, conf.delta_port)
+        else:
+            channel = LocalChannel(conf.remote_path)
+
+        recorder = None
+        if conf.track_progress:
+            recorder = progress.ProgressRecorder(task.media_file)
+
+        send_file(os.path.join(cfg.CONF.tasks.sync_path,
+                               task.media_file.filename),
+                  task.media_file.filename,
+                  channel,
+                  conf.delta_block_size,
+                  task.bwlimit,
+                  recorder)
+
+        if recorder is not None:
+            recorder.flush()
+
+
+class _ReceiverHandler(socketserver.StreamRequestHandler):
+
+    def _transfer(self, receiver):
+        blocks = receiver.signature()
+        write_frame(self.wfile, PARTIAL if receiver.partial else SIGNATURE,
+                    b''.join(BLOCK.pack(weak, strong)
+                             for weak, strong in blocks))
+        self.wfile.flush()
+
+        while True:
+            kind, payload = read_frame(self.rfile)
+            if kind == COPY:
+                receiver.apply(COPY, INDEX.unpack(payload)[0])
+            elif kind == DATA:
+                receiver.apply(DATA, payload)
+            elif kind == END:
+                receiver.finish(payload)
+                break
+            else:
+                raise DeltaTransferError(
+                    'unexpected frame {0!r}'.format(kind))
+
+    def handle(self):
+        status = {'ok': True}
+        receiver = None
+        try:
+            kind, payload = read_frame(self.rfile)
+            if kind != HELLO:
+                raise DeltaTransferError(
+                    'unexpected frame {0!r}'.format(kind))
+            header = json.loads(payload.decode('utf-8'))
+            LOG.info('receiving %s', header['filename'])
+            receiver = DeltaReceiver(self.server.root,
+                                     header['filename'],
+                                     header['block_size'])
+            self._transfer(receiver)
+        except Exception as err:
+            LOG.exception('transfer failed:')
+            status = {'ok': False, 'error': str(err),
+                      'transient': isinstance(err, DeltaTransferError)}
+        finally:
+            if receiver is not None:
+                receiver.close()
+
+        try:
+            write_frame(self.wfile, STATUS,
+                        json.dumps(status).encode('utf-8'))
+            self.wfile.flush()
+        except (IOError, OSError, socket.error):
+            LOG.debug('unable to send status; sender went away')
+
+
+class Receiver(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    """Receives files sent by :class:`DeltaBackend` over a socket.
+
+    :param tuple address: host and port to listen on
+    :param str root: directory files are transferred to
+    """
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address, root):
+        socketserver.TCPServer.__init__(self, address, _ReceiverHandler)
+        self.root = root
+
+
+def main(args=None):
+    """Entry point for seedsync-receiver"""
+    parser = argparse.ArgumentParser(
+        description='Receives files sent using the delta sync backend')
+    parser.add_argument('--root', required=True,
+                        help='directory files are transferred to')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='host name/IP address to listen on')
+    parser.add_argument('--port', type=int, default=8730,
+                        help='port to listen on')
+    opts = parser.parse_args(args)
+
+    logging.basicConfig(level=logging.INFO)
+    server = Receiver((opts.host, opts.port), opts.root)
+    LOG.info('listening on %s:%d', opts.host, opts.port)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
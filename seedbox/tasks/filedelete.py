@@ -1,4 +1,12 @@
-"""DeleteFile task plugin for deleting a file from specified location."""
+"""DeleteFile task plugin for deleting files from specified location.
+
+Deletes all the synced media files of a torrent within a single task; the
+files are grouped by directory so each directory is listed only once, and
+directories left empty (e.g. created when extracting an archive) are
+removed as well.
+"""
+import collections
+import errno
 import logging
 import os
 
@@ -11,8 +19,36 @@ LOG = logging.getLogger(__name__)
 cfg.CONF.import_group('tasks', 'seedbox.options')
 
 
-class DeleteFile(base.BaseTask):
-    """Provides capability of deleting file from a specified location."""
+def _list_files(dirname):
+    """Lists the names of the files (non-directories) within a directory."""
+    try:
+        if hasattr(os, 'scandir'):
+            return set(entry.name for entry in os.scandir(dirname)
+                       if not entry.is_dir(follow_symlinks=False))
+        return set(name for name in os.listdir(dirname)
+                   if not os.path.isdir(os.path.join(dirname, name)))
+    except OSError as err:
+        if err.errno == errno.ENOENT:
+            return set()
+        raise
+
+
+def _remove_empty_dirs(dirname, root):
+    """Removes the directory and its parents up to root while empty."""
+    root = os.path.abspath(root)
+    dirname = os.path.abspath(dirname)
+    while dirname.startswith(root + os.sep):
+        try:
+            os.rmdir(dirname)
+        except OSError:
+            # not empty (or already removed) so nothing more to do
+            break
+        LOG.debug('removed empty directory: %s', dirname)
+        dirname = os.path.dirname(dirname)
+
+
+class DeleteFile(base.BatchTask):
+    """Provides capability of deleting files from a specified location."""
 
     @staticmethod
     def is_actionable(media_file):
@@ -23,12 +59,21 @@ class DeleteFile(base.BaseTask):
         :rtype: boolean
         """
         return (media_file.file_path == cfg.CONF.tasks.sync_path and
-                media_file.synced and
-                os.path.exists(os.path.join(cfg.CONF.tasks.sync_path,
-                                            media_file.filename)))
+                media_file.synced)
 
     def execute(self):
-        """Performs file deletion for the provided media_file."""
-        LOG.debug('delete file: %s', self.media_file.filename)
-        os.remove(os.path.join(cfg.CONF.tasks.sync_path,
-                               self.media_file.filename))
+        """Performs file deletion for the provided media files."""
+        by_dir = collections.defaultdict(dict)
+        for mf in self.media_files:
+            dirname, name = os.path.split(
+                os.path.join(cfg.CONF.tasks.sync_path, mf.filename))
+            by_dir[dirname][name] = mf
+
+        for dirname, medias in by_dir.items():
+            for name in _list_files(dirname) & set(medias):
+                LOG.debug('delete file: %s', medias[name].filename)
+                try:
+                    os.remove(os.path.join(dirname, name))
+                except OSError as err:
+                    self.fail(medias[name], err)
+            _remove_empty_dirs(dirname, cfg.CONF.tasks.sync_path)
@@ -4,17 +4,27 @@ Performs rsync of a file to a specified location.
 """
 import logging
 import os
+import subprocess
 
 from oslo_config import cfg
 
+from seedbox.tasks import bandwidth
 from seedbox.tasks import base
+from seedbox.tasks import deltasync
+from seedbox.tasks import progress
 from seedbox.tasks import subprocessext
+from seedbox.tasks import syncbackend
 
 LOG = logging.getLogger(__name__)
 
 cfg.CONF.import_group('tasks', 'seedbox.options')
 cfg.CONF.import_group('tasks_filesync', 'seedbox.options')
 
+# rsync exit codes caused by network/remote failures:
+# 10 socket I/O, 12 protocol data stream, 23 partial transfer,
+# 30 timeout, 35 daemon connection timeout, 255 ssh failure
+RSYNC_TRANSIENT_CODES = frozenset([10, 12, 23, 30, 35, 255])
+
 
 class SyncFile(base.BaseTask):
     """Provides the capability of rsync file to a specified location."""
@@ -23,6 +33,7 @@ class SyncFile(base.BaseTask):
         super(SyncFile, self).__init__(media_file)
         self._cmd = None
         self._destination = None
+        self.bwlimit = 0
 
     @property
     def cmd(self):
@@ -40,6 +51,8 @@ class SyncFile(base.BaseTask):
                 self._cmd.append('--verbose')
             if cfg.CONF.tasks_filesync.progress:
                 self._cmd.append('--progress')
+            if cfg.CONF.tasks_filesync.track_progress:
+                self._cmd.append('--info=progress2')
             if cfg.CONF.tasks_filesync.perms:
                 self._cmd.append('--perms')
             if cfg.CONF.tasks_filesync.delayupdates:
@@ -48,6 +61,8 @@ class SyncFile(base.BaseTask):
                 self._cmd.append('--recursive')
             if cfg.CONF.tasks_filesync.chmod:
                 self._cmd.append('--chmod=%s' % cfg.CONF.tasks_filesync.chmod)
+            if self.bwlimit:
+                self._cmd.append('--bwlimit=%d' % self.bwlimit)
 
             if (cfg.CONF.tasks_filesync.identity or
                     cfg.CONF.tasks_filesync.port):
@@ -85,6 +100,28 @@ class SyncFile(base.BaseTask):
         LOG.debug('destination: [%s]', self._destination)
         return ''.join(self._destination)
 
+    def schedule(self, concurrency):
+        """Allocates a share of the bandwidth budget to this sync.
+
+        :param int concurrency: most syncs running at the same time as this
+                                one, including it
+        """
+        self.bwlimit = bandwidth.allocate(concurrency)
+        self._cmd = None
+
+    def is_transient(self, error):
+        """Classifies an error raised while syncing the media file.
+
+        :param error: the exception raised by the sync backend
+        :returns: a flag indicating the error is transient
+        :rtype: boolean
+        """
+        if isinstance(error, subprocess.CalledProcessError):
+            return error.returncode in RSYNC_TRANSIENT_CODES
+        if isinstance(error, deltasync.DeltaTransferError):
+            return True
+        return super(SyncFile, self).is_transient(error)
+
     @staticmethod
     def is_actionable(media_file):
         """Perform check to determine if action should be taken.
@@ -99,5 +136,25 @@ class SyncFile(base.BaseTask):
     def execute(self):
         """Perform remote file copy for the provided media_file."""
         LOG.debug('syncing file %s', self.media_file.filename)
-        subprocessext.ProcessLogging.execute(self.cmd)
+        backend = syncbackend.get_backend(cfg.CONF.tasks_filesync.backend)
+        backend.sync(self)
         self.media_file.synced = True
+
+
+class RsyncBackend(syncbackend.SyncBackend):
+    """Transfers media files by running rsync."""
+
+    def sync(self, task):
+        """Runs the rsync command of the sync task.
+
+        :param task: the sync task being executed
+        :type task: :class:`~seedbox.tasks.filesync.SyncFile`
+        """
+        recorder = None
+        if cfg.CONF.tasks_filesync.track_progress:
+            recorder = progress.ProgressRecorder(task.media_file)
+
+        subprocessext.ProcessLogging.execute(task.cmd, recorder)
+
+        if recorder is not None:
+            recorder.flush()
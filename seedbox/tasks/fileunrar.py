@@ -6,7 +6,6 @@ import logging
 import os
 
 from oslo_config import cfg
-import rarfile
 
 from seedbox.tasks import base
 
@@ -30,6 +29,9 @@ class UnrarFile(base.BaseTask):
 
     def execute(self):
         """Perform file decompression for the provided media_file."""
+        # only needed when there are archives to decompress
+        import rarfile
+
         LOG.debug('decompressing file %s', self.media_file.filename)
         with rarfile.RarFile(
                 os.path.join(
@@ -0,0 +1,124 @@
+"""Tracks transfer progress of a media file while it is being synced.
+
+Parses the output of ``rsync --info=progress2`` as it is produced, and
+periodically saves the bytes transferred, transfer rate and estimated time
+remaining so the progress of a running sync is visible within the cache.
+
+Example of the output lines handled::
+
+          32,768   0%    0.00kB/s    0:00:00
+      56,328,192  48%   53.71MB/s    0:00:01
+     117,440,512 100%   55.12MB/s    0:00:02 (xfr#1, to-chk=0/1)
+
+"""
+import logging
+import re
+
+from oslo_config import cfg
+
+from seedbox.common import timeutil
+from seedbox import db
+from seedbox.db import models
+
+LOG = logging.getLogger(__name__)
+
+cfg.CONF.import_group('tasks_filesync', 'seedbox.options')
+
+PROGRESS_PATTERN = re.compile(
+    r'^\s*(?P<bytes>[\d,.]+)\s+(?P<percent>\d+)%\s+'
+    r'(?P<rate>[\d.,]+)(?P<unit>[kMGT]?B)/s\s+'
+    r'(?P<hours>\d+):(?P<minutes>\d{2}):(?P<seconds>\d{2})'
+    r'(?P<done>\s+\(xfr#)?')
+
+RATE_UNITS = {'B': 1, 'kB': 1024, 'MB': 1024 ** 2,
+              'GB': 1024 ** 3, 'TB': 1024 ** 4}
+
+
+def parse_progress(line):
+    """Parses a single line of rsync progress output.
+
+    :param str line: a line of output from rsync
+    :return: bytes transferred, percent, rate (bytes/sec), eta (seconds) or
+             None if the line does not contain progress details
+    :rtype: tuple
+    """
+    match = PROGRESS_PATTERN.match(line)
+    if match is None:
+        return None
+
+    transferred = int(re.sub(r'[,.]', '', match.group('bytes')))
+    percent = int(match.group('percent'))
+    rate = (float(match.group('rate').replace(',', '')) *
+            RATE_UNITS[match.group('unit')])
+
+    # once a file has completed rsync reports the elapsed time in place of
+    # the estimated time remaining.
+    if match.group('done'):
+        eta = 0
+    else:
+        eta = (int(match.group('hours')) * 3600 +
+               int(match.group('minutes')) * 60 +
+               int(match.group('seconds')))
+
+    return transferred, percent, rate, eta
+
+
+class ProgressRecorder(object):
+    """Receives output lines of a sync and saves progress periodically.
+
+    :param media_file: the media file being synced
+    :type media_file: :class:`~seedbox.db.models.MediaFile`
+    :param int interval: minimum seconds between saving progress
+    """
+
+    def __init__(self, media_file, interval=None):
+        self.media_file = media_file
+        if interval is None:
+            interval = cfg.CONF.tasks_filesync.progress_interval
+        self.interval = interval
+        self.progress = models.SyncProgress(media_file.media_id)
+        self._last_saved = None
+        self._dirty = False
+
+    def __call__(self, line):
+        """Handles a line of output produced by the sync.
+
+        :param str line: a line of output from rsync
+        """
+        details = parse_progress(line)
+        if details is None:
+            return
+        self.update(*details)
+
+    def update(self, transferred, percent, rate, eta):
+        """Captures the current progress of the sync.
+
+        :param int transferred: total bytes transferred so far
+        :param int percent: percentage of the file transferred
+        :param float rate: current transfer rate in bytes per second
+        :param int eta: estimated seconds remaining until completed
+        """
+        self.progress.bytes_transferred = transferred
+        self.progress.percent = percent
+        self.progress.rate = rate
+        self.progress.eta = eta
+        self._dirty = True
+
+        if (self._last_saved is None or
+                timeutil.is_older_than(self._last_saved, self.interval)):
+            self.flush()
+
+    def flush(self):
+        """Saves the most recent progress if not already saved."""
+        if not self._dirty or self.media_file.media_id is None:
+            return
+
+        try:
+            self.progress = db.dbapi().save_sync_progress(self.progress)
+        except Exception:
+            # progress is informational only; never fail the sync because
+            # the progress could not be saved.
+            LOG.warning('unable to save progress for media %s',
+                        self.media_file.media_id, exc_info=True)
+        self._last_saved = timeutil.utcnow()
+        self._dirty = False
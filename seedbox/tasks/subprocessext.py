@@ -27,6 +27,7 @@ testing, this was the result.
 import logging
 import os
 import subprocess
+import threading
 import time
 
 from oslo_config import cfg
@@ -54,12 +55,15 @@ def _log(name, filepath, unique_id, data):
 class ProcessLogging(subprocess.Popen):
     """Run a command as a subprocess sending output to a logger."""
 
-    def __init__(self, cmd):
+    def __init__(self, cmd, progress=None):
         """Initializes new instance.
 
         :param list cmd: command and options sent to subprocess to execute
+        :param progress: callable receiving each line of stdout as it is
+                         produced (optional)
         """
         self._cmd = cmd
+        self._progress = progress
 
         # delegate to parent to spawn the rsync process
         super(ProcessLogging, self).__init__(self._cmd, shell=False,
@@ -71,6 +75,32 @@ class ProcessLogging(subprocess.Popen):
         LOG.debug('Started subprocess, pid %s', self.pid)
         LOG.debug('Command:  %s', ' '.join(self._cmd))
 
+    def _stream(self):
+        """Reads stdout line by line as it is produced.
+
+        Each line is handed to the progress callable while stderr is drained
+        by a separate thread to avoid the child blocking on a full pipe.
+
+        :return: stdout, stderr
+        :rtype: tuple
+        """
+        errors = []
+        reader = threading.Thread(
+            target=lambda: errors.append(self.stderr.read()))
+        reader.daemon = True
+        reader.start()
+
+        lines = []
+        for line in iter(self.stdout.readline, ''):
+            lines.append(line)
+            self._progress(line)
+
+        self.wait()
+        reader.join()
+        self.stdout.close()
+        self.stderr.close()
+        return ''.join(lines), ''.join(errors)
+
     def complete(self):
         """Handle all the processing of the subprocess"""
         outdata = None
@@ -79,7 +109,10 @@ class ProcessLogging(subprocess.Popen):
         _uid = time.time()
 
         while self.returncode is None:
-            outdata, outerr = self.communicate()
+            if self._progress is None:
+                outdata, outerr = self.communicate()
+            else:
+                outdata, outerr = self._stream()
         else:
             if cfg.CONF.tasks_synclog.stderr_verbose and outerr:
                 _log('seedbox.tasks.subproc.stderr',
@@ -100,7 +133,7 @@ class ProcessLogging(subprocess.Popen):
                  outdata)
 
     @staticmethod
-    def execute(cmd):
+    def execute(cmd, progress=None):
         """Simple convenience method.
 
         Provide a convenience method for creating the object and
@@ -108,5 +141,7 @@ class ProcessLogging(subprocess.Popen):
         module level.
 
         :param list cmd: command and options sent to subprocess to execute
+        :param progress: callable receiving each line of stdout as it is
+                         produced (optional)
         """
-        ProcessLogging(cmd).complete()
+        ProcessLogging(cmd, progress).complete()
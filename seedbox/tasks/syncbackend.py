@@ -0,0 +1,42 @@
+"""Provides the definition of a sync backend.
+
+A sync backend performs the actual transfer of a media file to the remote
+location on behalf of :class:`~seedbox.tasks.filesync.SyncFile`. Backends
+are plugins registered within the ``seedbox.tasks.sync_backends`` entry point
+namespace and selected using ``[tasks_filesync] backend``.
+"""
+import abc
+import logging
+
+import six
+from stevedore import driver
+
+LOG = logging.getLogger(__name__)
+SYNC_BACKEND_NAMESPACE = 'seedbox.tasks.sync_backends'
+
+
+@six.add_metaclass(abc.ABCMeta)
+class SyncBackend(object):
+    """Base class for transferring a media file to the remote location."""
+
+    @abc.abstractmethod
+    def sync(self, task):
+        """Transfers the media file of the sync task.
+
+        :param task: the sync task being executed
+        :type task: :class:`~seedbox.tasks.filesync.SyncFile`
+        """
+        raise NotImplementedError
+
+
+def get_backend(name):
+    """Retrieves an instance of the named sync backend.
+
+    :param str name: name of the sync backend plugin
+    :return: sync backend instance
+    :rtype: :class:`~seedbox.tasks.syncbackend.SyncBackend`
+    """
+    LOG.debug('looking for %s backend in %s', name, SYNC_BACKEND_NAMESPACE)
+    mgr = driver.DriverManager(SYNC_BACKEND_NAMESPACE, name,
+                               invoke_on_load=True)
+    return mgr.driver
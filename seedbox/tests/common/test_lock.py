@@ -0,0 +1,65 @@
+import datetime
+import os
+import shutil
+import tempfile
+import threading
+
+from seedbox.common import lock
+from seedbox.common import timeutil
+from seedbox.tests import test
+
+
+class SingletonLockTest(test.BaseTestCase):
+
+    def setUp(self):
+        super(SingletonLockTest, self).setUp()
+        base_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, base_dir, ignore_errors=True)
+        self.path = os.path.join(base_dir, 'test.lock')
+
+    def test_lock(self):
+        self.assertEqual(lock.read_record(self.path), {})
+
+        with lock.SingletonLock(self.path) as held:
+            record = lock.read_record(self.path)
+            self.assertEqual(record['pid'], os.getpid())
+            self.assertIsInstance(record['started_at'], datetime.datetime)
+            self.assertLessEqual(record['started_at'], record['heartbeat_at'])
+
+            held.heartbeat()
+            self.assertGreaterEqual(
+                lock.read_record(self.path)['heartbeat_at'],
+                record['heartbeat_at'])
+
+            other = lock.SingletonLock(self.path)
+            err = self.assertRaises(lock.AlreadyLocked, other.acquire)
+            self.assertEqual(err.record['pid'], os.getpid())
+
+        self.assertEqual(lock.read_record(self.path), {})
+        with lock.SingletonLock(self.path):
+            pass
+
+    def test_lock_wait(self):
+        acquired = threading.Event()
+
+        def _wait():
+            with lock.SingletonLock(self.path, wait=True):
+                acquired.set()
+
+        held = lock.SingletonLock(self.path)
+        held.acquire()
+        waiter = threading.Thread(target=_wait)
+        waiter.start()
+        self.assertFalse(acquired.wait(0.2))
+
+        held.release()
+        waiter.join(5)
+        self.assertTrue(acquired.is_set())
+
+    def test_is_stale(self):
+        self.assertFalse(lock.is_stale({}, 60))
+
+        now = timeutil.utcnow()
+        self.assertFalse(lock.is_stale({'heartbeat_at': now}, 60))
+        self.assertTrue(lock.is_stale(
+            {'heartbeat_at': now - datetime.timedelta(seconds=120)}, 60))
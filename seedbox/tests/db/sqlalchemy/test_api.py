@@ -1,5 +1,8 @@
 from __future__ import print_function
 
+from sqlalchemy.dialects import mysql
+from sqlalchemy.dialects import postgresql
+
 from seedbox.db import models as api_model
 from seedbox.db.sqlalchemy import api
 from seedbox.db.sqlalchemy import models as db_model
@@ -37,6 +40,26 @@ class SAApiTestCase(test.ConfiguredBaseTestCase):
         self.dbconn.shrink_db()
         self.assertTrue(True)
 
+    def test_free_page_ratio(self):
+        for idx in range(200):
+            self.dbconn.save(api_model.Torrent(
+                torrent_id=None,
+                name='fake{0}.torrent'.format(idx),
+                error_msg='x' * 2000))
+        self.assertEqual(self.dbconn.free_page_ratio(), 0.0)
+
+        size = self.dbconn.db_size()
+        self.assertGreater(size, 200 * 2000)
+
+        self.dbconn.delete_by(api_model.Torrent,
+                              {'!=': {'name': 'fake0.torrent'}})
+        self.assertGreater(self.dbconn.free_page_ratio(), 0.5)
+        self.assertEqual(self.dbconn.db_size(), size)
+
+        self.dbconn.shrink_db()
+        self.assertEqual(self.dbconn.free_page_ratio(), 0.0)
+        self.assertLess(self.dbconn.db_size(), size / 2)
+
     def test_save(self):
 
         torrent = api_model.Torrent(torrent_id=None, name='fake1.torrent')
@@ -53,6 +76,17 @@ class SAApiTestCase(test.ConfiguredBaseTestCase):
         # self.assertIsNotNone(torrent.updated_at)
         self.assertIsNone(_saved_torrent.updated_at)
 
+    def test_save_all(self):
+
+        saved = self.dbconn.save_all(
+            [api_model.AppState(name='test1', value=1),
+             api_model.AppState(name='test1', value=2),
+             api_model.Torrent(torrent_id=None, name='fake1.torrent')])
+        self.assertEqual(len(saved), 3)
+        self.assertEqual(self.dbconn.fetch(api_model.AppState,
+                                           'test1').value, 2)
+        self.assertIsNotNone(saved[2].torrent_id)
+
     def test_bulk_create(self):
 
         torrent = api_model.Torrent(torrent_id=None, name='fake2.torrent')
@@ -126,3 +160,108 @@ class SAApiTestCase(test.ConfiguredBaseTestCase):
         qfilter = {'=': {'name': 'fake6.torrent'}}
         _torrent = self.dbconn.fetch_by(api_model.Torrent, qfilter)
         self.assertEqual(torrent, list(_torrent)[0])
+
+    def test_fetch_by_without_related(self):
+
+        torrent = api_model.Torrent(torrent_id=None, name='fake7.torrent')
+        torrent = self.dbconn.save(torrent)
+        self.dbconn.save(api_model.MediaFile(media_id=None,
+                                             torrent_id=torrent.torrent_id,
+                                             filename='movie-1.mp4',
+                                             file_ext='.mp4'))
+
+        qfilter = {'exists': {'media_files': True}}
+        _torrents = list(self.dbconn.fetch_by(api_model.Torrent, qfilter))
+        self.assertEqual(len(_torrents), 1)
+        self.assertEqual(len(_torrents[0].media_files), 1)
+
+        _torrents = list(self.dbconn.fetch_by(api_model.Torrent, qfilter,
+                                              with_related=False))
+        self.assertEqual(len(_torrents), 1)
+        self.assertIsNone(_torrents[0].media_files)
+
+        # saving without the media files loaded leaves them as is
+        _torrents[0].state = 'ready'
+        self.dbconn.save(_torrents[0])
+        _torrent = self.dbconn.fetch(api_model.Torrent, torrent.torrent_id)
+        self.assertEqual(_torrent.state, 'ready')
+        self.assertEqual(len(_torrent.media_files), 1)
+
+        qfilter = {'exists': {'media_files': False}}
+        self.assertEqual(
+            list(self.dbconn.fetch_by(api_model.Torrent, qfilter)), [])
+
+    def test_fetch_by_cached(self):
+
+        for name in ('fake8.torrent', 'fake9.torrent'):
+            self.dbconn.save(api_model.Torrent(torrent_id=None, name=name))
+
+        # same shape of filter with different values
+        for name in ('fake8.torrent', 'fake9.torrent'):
+            qfilter = {'in': {'name': [name]}}
+            _torrents = list(self.dbconn.fetch_by(api_model.Torrent, qfilter))
+            self.assertEqual([tor.name for tor in _torrents], [name])
+
+        qfilter = {'in': {'name': ['fake8.torrent', 'fake9.torrent']}}
+        _torrents = list(self.dbconn.fetch_by(api_model.Torrent, qfilter,
+                                              with_related=False))
+        self.assertEqual(len(_torrents), 2)
+
+        qfilter = {'in': {'name': []}}
+        self.assertEqual(
+            list(self.dbconn.fetch_by(api_model.Torrent, qfilter)), [])
+
+    def test_fetch_by_chunked(self):
+
+        for idx in range(5):
+            torrent = self.dbconn.save(
+                api_model.Torrent(torrent_id=None,
+                                  name='chunk-{0}.torrent'.format(idx)))
+            self.dbconn.save(
+                api_model.MediaFile(media_id=None,
+                                    torrent_id=torrent.torrent_id,
+                                    filename='movie-{0}.mp4'.format(idx),
+                                    file_ext='.mp4'))
+
+        qfilter = {'!=': {'name': 'chunk-2.torrent'}}
+        for chunk_size in (0, 2, 4, 10):
+            self.CONF.set_override('fetch_chunk_size', chunk_size,
+                                   'database')
+            _torrents = list(self.dbconn.fetch_by(api_model.Torrent,
+                                                  qfilter))
+            self.assertEqual([tor.name for tor in _torrents],
+                             ['chunk-0.torrent', 'chunk-1.torrent',
+                              'chunk-3.torrent', 'chunk-4.torrent'])
+            self.assertEqual(
+                [len(tor.media_files) for tor in _torrents], [1, 1, 1, 1])
+
+
+class ServerApiTestCase(SAApiTestCase):
+    """Runs the connection tests using the database server connection."""
+
+    def setUp(self):
+        super(ServerApiTestCase, self).setUp()
+
+        self.dbconn = api.ServerConnection(self.CONF)
+
+    def test_upsert_statement(self):
+
+        row = db_model.AppState('last_run', 10)
+        stmt = str(api.upsert_statement('postgresql', row).compile(
+            dialect=postgresql.dialect()))
+        self.assertIn('INSERT INTO app_states', stmt)
+        self.assertIn('ON CONFLICT (name) DO UPDATE SET', stmt)
+        self.assertIn('t_int = %(param_', stmt)
+
+        stmt = str(api.upsert_statement('mysql', row).compile(
+            dialect=mysql.dialect()))
+        self.assertIn('ON DUPLICATE KEY UPDATE', stmt)
+
+        row = db_model.SyncProgress(id=1, percent=10)
+        stmt = str(api.upsert_statement('postgresql', row).compile(
+            dialect=postgresql.dialect()))
+        # created_at only set on insert; updated_at set on update
+        self.assertNotIn('created_at =', stmt)
+        self.assertIn('updated_at = %(param_', stmt)
+
+        self.assertRaises(ValueError, api.upsert_statement, 'sqlite', row)
@@ -27,7 +27,33 @@ class DBMigrationTestCase(test.BaseTestCase):
 
         migration.db_sync(self.facade.engine)
         ver = migration.db_version(self.facade.engine)
-        self.assertEqual(ver, 4)
+        self.assertEqual(ver, 10)
+
+    def test_is_current(self):
+        dbname = 'sqlite:////tmp/' + str(uuid.uuid4()) + '.db'
+        self.facade = session.EngineFacade(dbname)
+
+        self.assertFalse(migration.is_current(self.facade.engine))
+        migration.db_sync(self.facade.engine)
+        self.assertTrue(migration.is_current(self.facade.engine))
+        self.assertIn(dbname, migration._CURRENT)
+
+        migration.db_sync(self.facade.engine, 6)
+        self.assertFalse(migration.is_current(self.facade.engine))
+
+    def test_is_current_memory(self):
+        # same connection is required to see the same in-memory database
+        self.facade = session.EngineFacade('sqlite://', pool_class='static')
+
+        migration.db_sync(self.facade.engine)
+        self.assertTrue(migration.is_current(self.facade.engine))
+        self.assertNotIn('sqlite://', migration._CURRENT)
+
+    def test_repo_info(self):
+        repository = migration._find_migrate_repo()
+        self.assertEqual(migration._repo_info(),
+                         (repository.id, repository.version_table,
+                          int(repository.latest)))
 
     def test_db_sync_bad_version(self):
         dbname = 'sqlite:////tmp/' + str(uuid.uuid4()) + '.db'
@@ -54,3 +54,42 @@ class ModelUtilTestCase(test.BaseTestCase):
 
         _db_tor = model_util.to_db(_tor)
         self.assertIsInstance(_db_tor, db_model.Torrent)
+
+    def test_round_trip(self):
+        _tor = db_model.Torrent(id=1, name='fake.torrent', state='init')
+        _tor.media_files = [db_model.MediaFile(id=2, filename='media.mp4',
+                                               file_ext='.mp4',
+                                               torrent_id=1)]
+
+        _pub_tor = model_util.from_db(_tor)
+        self.assertEqual(_pub_tor.torrent_id, 1)
+        self.assertEqual(_pub_tor.name, 'fake.torrent')
+        self.assertEqual(len(_pub_tor.media_files), 1)
+        self.assertIsInstance(_pub_tor.media_files[0], api_model.MediaFile)
+        self.assertEqual(_pub_tor.media_files[0].media_id, 2)
+        self.assertEqual(_pub_tor.fields, api_model.Torrent.field_names())
+
+        _db_tor = model_util.to_db(_pub_tor)
+        self.assertEqual(_db_tor.id, 1)
+        self.assertEqual(_db_tor.state, 'init')
+        self.assertEqual(_db_tor.media_files[0].filename, 'media.mp4')
+
+        _empty = db_model.Torrent(id=3, name='empty.torrent')
+        self.assertEqual(model_util.from_db(_empty).media_files, [])
+
+    def test_round_trip_appstate(self):
+        _state = api_model.AppState.make_empty()
+        _state.name = 'last_run'
+        _state.value = 10
+
+        _db_state = model_util.to_db(_state)
+        self.assertIsInstance(_db_state, db_model.AppState)
+        self.assertEqual(_db_state.get('value'), 10)
+
+        _pub_state = model_util.from_db(_db_state)
+        self.assertEqual(_pub_state.name, 'last_run')
+        self.assertEqual(_pub_state.value, 10)
+
+    def test_get_mapper(self):
+        self.assertIs(model_util.get_mapper('MediaFile'),
+                      model_util.get_mapper('MediaFile'))
@@ -122,3 +122,52 @@ class SAModelsTestCase(test.BaseTestCase):
         qfilter = {'not': {'=': {'name': 'test'}}}
         _query = transformer.apply_filter(qfilter)
         self.assertIsNotNone(_query.statement)
+
+    def test_query_transform_shape(self):
+
+        qfilter = {'and': [{'=': {'invalid': False}},
+                           {'in': {'state': ['init', 'ready']}},
+                           {'or': [{'=': {'retry_at': None}},
+                                   {'not': {'=': {'name': 'test'}}}]}
+                           ]}
+        shape, params = models.QueryTransformer.parameterize(qfilter)
+        self.assertEqual(params, {'p0': False,
+                                  'p1': ['init', 'ready'],
+                                  'p2': 'test'})
+
+        qfilter['and'][1] = {'in': {'state': ['done']}}
+        other, params = models.QueryTransformer.parameterize(qfilter)
+        self.assertEqual(shape, other)
+        self.assertEqual(params['p1'], ['done'])
+
+        qfilter['and'][2]['or'][0] = {'=': {'retry_at': 1}}
+        other, _ = models.QueryTransformer.parameterize(qfilter)
+        self.assertNotEqual(shape, other)
+
+        transformer = models.QueryTransformer(
+            models.Torrent, self.facade.session.query(models.Torrent))
+        _query = transformer.apply_shape(shape)
+        self.assertIn('retry_at IS NULL', str(_query.statement))
+        self.assertEqual(set(_query.statement.compile().params),
+                         set(['p0', 'p1', 'p2']))
+
+    def test_query_transform_select(self):
+
+        qfilter = {'in': {'torrent_id': {'model': 'Torrent',
+                                         'field': 'id',
+                                         'filter': {'=': {'purged': False}},
+                                         'limit': 10}}}
+
+        transformer = models.QueryTransformer(
+            models.MediaFile, self.facade.session.query(models.MediaFile))
+        stmt = str(transformer.apply_filter(qfilter).statement)
+        self.assertIn('media_files.torrent_id IN (SELECT', stmt)
+        self.assertIn('LIMIT', stmt)
+
+        shape, params = models.QueryTransformer.parameterize(qfilter)
+        self.assertEqual(params, {'p0': False})
+        transformer = models.QueryTransformer(
+            models.MediaFile, self.facade.session.query(models.MediaFile))
+        stmt = str(transformer.apply_shape(shape).statement)
+        self.assertIn('media_files.torrent_id IN (SELECT', stmt)
+        self.assertIn('torrents.purged = :p0', stmt)
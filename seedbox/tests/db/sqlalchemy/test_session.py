@@ -1,4 +1,8 @@
 import logging
+import os
+import shutil
+import tempfile
+
 import mock
 
 from seedbox.db.sqlalchemy import session
@@ -24,6 +28,23 @@ class EngineFacadeTestCase(test.BaseTestCase):
 
         self.assertIsNot(ses1, ses2)
 
+    def test_dispose(self):
+        facade = session.EngineFacade('sqlite://', pool_class='queue')
+        engine = facade.engine
+        inherited = engine.pool
+        conn = engine.connect()
+        dbapi_conn = conn.connection.connection
+        conn.close()
+
+        # connections dropped without closing are left usable
+        facade.dispose(close=False)
+        self.assertIsNot(engine.pool, inherited)
+        self.assertEqual(dbapi_conn.execute('select 1').fetchone(), (1,))
+        self.assertEqual(engine.execute('select 1').scalar(), 1)
+
+        facade.dispose()
+        self.assertEqual(engine.pool.checkedin(), 0)
+
     def test_get_session_maker(self):
         sm1 = self.facade.session_maker
         sm2 = self.facade.session_maker
@@ -55,6 +76,8 @@ class EngineFacadeTestCase(test.BaseTestCase):
         conf = mock.MagicMock()
         conf.database.items.return_value = [
             ('connection_debug', 100),
+            ('sqlite_journal_mode', 'wal'),
+            ('sqlite_mmap_size', None),
         ]
 
         session.EngineFacade.from_config('sqlite:///:memory:', conf)
@@ -64,5 +87,76 @@ class EngineFacadeTestCase(test.BaseTestCase):
             sql_connection='sqlite:///:memory:',
             connection_debug=100,
             idle_timeout=mock.ANY,
+            pool_class=mock.ANY,
+            max_pool_size=mock.ANY,
+            max_overflow=mock.ANY,
+            pool_timeout=mock.ANY,
+            pragmas=[('journal_mode', 'wal')],
         )
         get_maker.assert_called_once_with(engine=create_engine())
+
+    def test_create_engine_pool_class(self):
+        for name, poolclass in session.POOL_CLASSES.items():
+            engine = session.create_engine('sqlite://', pool_class=name,
+                                           max_pool_size=2,
+                                           max_overflow=1,
+                                           pool_timeout=5)
+            self.assertIsInstance(engine.pool, poolclass)
+            with engine.connect() as conn:
+                self.assertEqual(
+                    conn.execute('pragma foreign_keys').scalar(), 1)
+
+        engine = session.create_engine('sqlite://')
+        self.assertIsInstance(engine.pool, session.POOL_CLASSES['null'])
+
+        engine = session.create_engine('sqlite://', pool_class='queue',
+                                       max_pool_size=2,
+                                       max_overflow=1,
+                                       pool_timeout=5)
+        self.assertEqual(engine.pool.size(), 2)
+        self.assertEqual(engine.pool._max_overflow, 1)
+        self.assertEqual(engine.pool._timeout, 5)
+
+    @mock.patch('seedbox.db.sqlalchemy.session.event')
+    @mock.patch('sqlalchemy.create_engine')
+    def test_create_engine_server(self, create_engine, event):
+        session.create_engine('postgresql://user@localhost/seedbox',
+                              pragmas=[('journal_mode', 'wal')])
+        create_engine.assert_called_once_with(
+            'postgresql://user@localhost/seedbox',
+            pool_recycle=3600,
+            convert_unicode=True,
+            poolclass=session.POOL_CLASSES['queue'])
+        self.assertFalse(event.listen.called)
+
+    def test_create_engine_pragmas(self):
+        dbname = os.path.join(tempfile.mkdtemp(), 'pragma.db')
+        self.addCleanup(shutil.rmtree, os.path.dirname(dbname))
+
+        engine = session.create_engine('sqlite:///' + dbname,
+                                       pragmas=[('journal_mode', 'wal'),
+                                                ('synchronous', 'normal'),
+                                                ('cache_size', -4000),
+                                                ('temp_store', 'memory')])
+        with engine.connect() as conn:
+            self.assertEqual(
+                conn.execute('pragma journal_mode').scalar(), 'wal')
+            # normal
+            self.assertEqual(conn.execute('pragma synchronous').scalar(), 1)
+            self.assertEqual(
+                conn.execute('pragma cache_size').scalar(), -4000)
+            # memory
+            self.assertEqual(conn.execute('pragma temp_store').scalar(), 2)
+            self.assertEqual(
+                conn.execute('pragma foreign_keys').scalar(), 1)
+
+        # readers are not blocked by a pending write
+        with engine.connect() as writer, engine.connect() as reader:
+            writer.execute('create table sample (id integer)')
+            trans = writer.begin()
+            writer.execute('insert into sample values (1)')
+            self.assertEqual(
+                reader.execute('select count(*) from sample').scalar(), 0)
+            trans.commit()
+            self.assertEqual(
+                reader.execute('select count(*) from sample').scalar(), 1)
@@ -1,6 +1,11 @@
 from __future__ import print_function
 import datetime
 import os
+import pickle
+import time
+
+import mock
+import sqlalchemy as sa
 
 from seedbox import db
 from seedbox.db import models as api_model
@@ -15,10 +20,67 @@ class ApiDBTestCase(test.ConfiguredBaseTestCase):
         self.patch(db, '_DBAPI', {})
         self.dbapi = db.dbapi(self.CONF)
 
+    def _query_plans(self, func, *args):
+        """Captures the query plan of each select issued by func."""
+        engine = self.dbapi.impl._engine_facade.engine
+        statements = []
+
+        def _capture(conn, cursor, statement, parameters, context, many):
+            if statement.lstrip().upper().startswith('SELECT'):
+                statements.append((statement, parameters))
+
+        sa.event.listen(engine, 'before_cursor_execute', _capture)
+        try:
+            list(func(*args))
+        finally:
+            sa.event.remove(engine, 'before_cursor_execute', _capture)
+
+        plans = []
+        with engine.connect() as conn:
+            for statement, parameters in statements:
+                rows = conn.connection.execute(
+                    'EXPLAIN QUERY PLAN ' + statement, parameters)
+                plans.append(' '.join(row[-1] for row in rows))
+        return plans
+
+    def test_query_plans(self):
+        plans = self._query_plans(self.dbapi.get_torrents_active)
+        self.assertIn('USING INDEX ix_torrents_state', plans[0])
+
+        plans = self._query_plans(self.dbapi.get_medias_by, 1, None, None,
+                                  False, False, False)
+        self.assertIn('USING INDEX ix_media_files_torrent_id', plans[0])
+
+        plans = self._query_plans(self.dbapi.get_processed_medias, 1)
+        self.assertIn('USING INDEX ix_media_files_torrent_id', plans[0])
+
     def test_clear(self):
         self.dbapi.clear()
         self.assertTrue(True)
 
+    def test_dbapi_forked(self):
+        self.assertIs(db.dbapi(self.CONF), self.dbapi)
+
+        # simulates the database api inherited by a forked process
+        db._DBAPI['pid'] = -1
+        with mock.patch.object(self.dbapi.impl, 'dispose') as dispose:
+            with mock.patch.object(db.api.DBApi,
+                                   'shrink_db_if_needed') as shrink:
+                dbapi = db.dbapi(self.CONF)
+                self.assertIsNot(dbapi, self.dbapi)
+                dispose.assert_called_once_with(close=False)
+                self.assertFalse(shrink.called)
+
+        self.assertEqual(db._DBAPI['pid'], os.getpid())
+        self.assertIs(db.dbapi(self.CONF), dbapi)
+
+    def test_init_worker(self):
+        with mock.patch.object(self.dbapi.impl, 'dispose') as dispose:
+            db.init_worker()
+            dispose.assert_called_once_with(close=False)
+        self.assertTrue(db._DBAPI['worker'])
+        self.assertNotIn(db.DB_ENGINE_NAMESPACE, db._DBAPI)
+
     def test_backup(self):
         self.dbapi.backup()
         self.assertTrue(True)
@@ -27,6 +89,38 @@ class ApiDBTestCase(test.ConfiguredBaseTestCase):
         self.dbapi.shrink_db()
         self.assertTrue(True)
 
+    def test_shrink_db_if_needed(self):
+        calls = []
+        self.patch(self.dbapi, 'shrink_db', lambda: calls.append(1))
+        self.dbapi.delete_appstate(
+            self.dbapi.get_appstate('last_vacuum_date'))
+
+        # first run only starts the interval
+        self.assertFalse(self.dbapi.shrink_db_if_needed(0.2, 7))
+        self.assertIsNotNone(self.dbapi.get_appstate('last_vacuum_date'))
+        self.assertFalse(self.dbapi.shrink_db_if_needed(0.2, 7))
+        self.assertEqual(calls, [])
+
+        # too many unused pages
+        self.patch(self.dbapi.impl, 'free_page_ratio', lambda: 0.5)
+        self.assertTrue(self.dbapi.shrink_db_if_needed(0.2, 7))
+        self.assertEqual(len(calls), 1)
+
+        # interval passed
+        self.patch(self.dbapi.impl, 'free_page_ratio', lambda: 0.0)
+        self.dbapi.save_appstate(api_model.AppState(
+            'last_vacuum_date',
+            datetime.datetime.utcnow() - datetime.timedelta(days=8)))
+        self.assertTrue(self.dbapi.shrink_db_if_needed(0.2, 7))
+        self.assertEqual(len(calls), 2)
+        self.assertFalse(self.dbapi.shrink_db_if_needed(0.2, 7))
+
+        # interval disabled
+        self.dbapi.save_appstate(api_model.AppState(
+            'last_vacuum_date',
+            datetime.datetime.utcnow() - datetime.timedelta(days=8)))
+        self.assertFalse(self.dbapi.shrink_db_if_needed(0.2, 0))
+
     def test_save_torrent(self):
 
         torrent = api_model.Torrent(torrent_id=None, name='fake.torrent')
@@ -63,6 +157,29 @@ class ApiDBTestCase(test.ConfiguredBaseTestCase):
 
         self.assertIsNone(self.dbapi.get_torrent(torrent1.torrent_id))
 
+    def test_purge_torrents(self):
+        for idx in range(3):
+            torrent = self.dbapi.save_torrent(
+                api_model.Torrent(torrent_id=None,
+                                  name='fake{0}.torrent'.format(idx)))
+            self.dbapi.bulk_create_medias(
+                [api_model.MediaFile(media_id=None,
+                                     torrent_id=torrent.torrent_id,
+                                     filename='movie-{0}.mp4'.format(num),
+                                     file_ext='.mp4')
+                 for num in range(2)])
+
+        qfilter = {'=': {'purged': False}}
+        self.assertEqual(self.dbapi.purge_torrents(qfilter, 2), (2, 4))
+        names = ['fake{0}.torrent'.format(idx) for idx in range(3)]
+        for torrent in self.dbapi.get_torrents({'in': {'name': names}}):
+            self.assertEqual(torrent.purged, torrent.name != 'fake2.torrent')
+            self.assertEqual(len(torrent.media_files),
+                             0 if torrent.purged else 2)
+
+        self.assertEqual(self.dbapi.purge_torrents(qfilter, 2), (1, 2))
+        self.assertEqual(self.dbapi.purge_torrents(qfilter, 2), (0, 0))
+
     def test_get_torrents(self):
 
         self.dbapi.save_torrent(
@@ -100,6 +217,20 @@ class ApiDBTestCase(test.ConfiguredBaseTestCase):
 
         self.assertEqual(len(list(self.dbapi.get_torrents_active())), 3)
 
+        self.dbapi.save_torrent(
+            api_model.Torrent(torrent_id=None,
+                              name='fake4.torrent',
+                              retry_at=datetime.datetime.utcnow() +
+                              datetime.timedelta(hours=1)))
+
+        self.dbapi.save_torrent(
+            api_model.Torrent(torrent_id=None,
+                              name='fake5.torrent',
+                              retry_at=datetime.datetime.utcnow() -
+                              datetime.timedelta(hours=1)))
+
+        self.assertEqual(len(list(self.dbapi.get_torrents_active())), 4)
+
     def test_get_torrents_by_state(self):
 
         self.dbapi.save_torrent(
@@ -159,6 +290,59 @@ class ApiDBTestCase(test.ConfiguredBaseTestCase):
         self.assertEqual(
             len(list(self.dbapi.get_torrents_eligible_for_removal())), 2)
 
+    def test_torrents_parsed(self):
+
+        self.dbapi.save_torrent(
+            api_model.Torrent(torrent_id=None,
+                              name='fake1.torrent',
+                              invalid=True))
+
+        self.dbapi.save_torrent(
+            api_model.Torrent(torrent_id=None,
+                              name='fake2.torrent',
+                              purged=True))
+
+        torrent = self.dbapi.save_torrent(
+            api_model.Torrent(torrent_id=None,
+                              name='fake3.torrent'))
+        self.dbapi.save_media(
+            api_model.MediaFile(media_id=None,
+                                torrent_id=torrent.torrent_id,
+                                filename='movie-1.mp4',
+                                file_ext='.mp4'))
+
+        self.dbapi.save_torrent(
+            api_model.Torrent(torrent_id=None,
+                              name='fake4.torrent'))
+
+        torrents = list(self.dbapi.get_torrents_parsed())
+        self.assertEqual(sorted(tor.name for tor in torrents),
+                         ['fake1.torrent', 'fake2.torrent', 'fake3.torrent'])
+        self.assertTrue(all(tor.media_files is None for tor in torrents))
+
+    def test_save_torrent_unloaded_pickled(self):
+        torrent = self.dbapi.save_torrent(
+            api_model.Torrent(torrent_id=None,
+                              name='fake1.torrent'))
+        self.dbapi.save_media(
+            api_model.MediaFile(media_id=None,
+                                torrent_id=torrent.torrent_id,
+                                filename='movie-1.mp4',
+                                file_ext='.mp4'))
+
+        # e.g. sent to a worker process
+        torrent = pickle.loads(pickle.dumps(
+            self.dbapi.get_torrent_by_name('fake1.torrent',
+                                           with_media=False)[0]))
+        self.assertIsNone(torrent.media_files)
+        torrent.state = 'done'
+        self.dbapi.save_torrent(torrent)
+
+        self.assertEqual(
+            [mf.filename for mf in self.dbapi.get_torrent_by_name(
+                'fake1.torrent')[0].media_files],
+            ['movie-1.mp4'])
+
     def test_fetch_or_create_torrent(self):
 
         self.dbapi.save_torrent(
@@ -334,6 +518,119 @@ class ApiDBTestCase(test.ConfiguredBaseTestCase):
         self.assertEqual(
             len(list(self.dbapi.get_processed_medias(tor1.torrent_id))), 5)
 
+    def test_save_sync_progress(self):
+        media = self.dbapi.save_media(
+            api_model.MediaFile(media_id=None,
+                                torrent_id=None,
+                                filename='movie-1.mp4',
+                                file_ext='.mp4',
+                                file_path='/tmp/media'))
+
+        self.assertIsNone(self.dbapi.get_sync_progress(media.media_id))
+
+        progress = self.dbapi.save_sync_progress(
+            api_model.SyncProgress(media_id=media.media_id,
+                                   bytes_transferred=1024,
+                                   percent=10,
+                                   rate=512.0,
+                                   eta=18))
+        self.assertIsInstance(progress, api_model.SyncProgress)
+
+        progress.percent = 20
+        self.dbapi.save_sync_progress(progress)
+        self.assertEqual(
+            self.dbapi.get_sync_progress(media.media_id).percent, 20)
+
+        self.dbapi.delete_media(media)
+        self.assertIsNone(self.dbapi.get_sync_progress(media.media_id))
+
+    def test_task_checkpoints(self):
+        media = self.dbapi.save_media(
+            api_model.MediaFile(media_id=None,
+                                torrent_id=None,
+                                filename='movie-1.mp4',
+                                file_ext='.mp4',
+                                file_path='/tmp/media'))
+        media.synced = True
+
+        medias = self.dbapi.save_task_results(
+            [media],
+            [api_model.TaskCheckpoint(checkpoint_id=None,
+                                      media_id=media.media_id,
+                                      phase='activate',
+                                      task='SyncFile')])
+        self.assertEqual(len(medias), 1)
+        self.assertTrue(self.dbapi.get_media(media.media_id).synced)
+
+        checkpoints = list(self.dbapi.get_task_checkpoints(
+            [media.media_id], 'activate'))
+        self.assertEqual(len(checkpoints), 1)
+        self.assertEqual(checkpoints[0].task, 'SyncFile')
+        self.assertEqual(
+            list(self.dbapi.get_task_checkpoints([media.media_id],
+                                                 'complete')), [])
+
+        self.dbapi.delete_media(media)
+        self.assertEqual(
+            list(self.dbapi.get_task_checkpoints([media.media_id],
+                                                 'activate')), [])
+
+    def test_jobs(self):
+        tor1 = self.dbapi.save_torrent(
+            api_model.Torrent(torrent_id=None, name='fake1.torrent'))
+        jobs = self.dbapi.enqueue_jobs(
+            [api_model.Job(job_id=None, torrent_id=tor1.torrent_id,
+                           phase='activate', task='SyncFile',
+                           media_ids=[idx, idx + 1])
+             for idx in range(2)])
+        self.assertEqual([job.media_ids for job in jobs], [[0, 1], [1, 2]])
+
+        job1 = self.dbapi.claim_job('host:1', 60, 2)
+        job2 = self.dbapi.claim_job('host:2', 60, 2)
+        self.assertEqual(job1.job_id, jobs[0].job_id)
+        self.assertEqual(job2.job_id, jobs[1].job_id)
+        self.assertEqual(job1.attempts, 1)
+        self.assertTrue(job1.owner.startswith('host:1/'))
+        self.assertIsNone(self.dbapi.claim_job('host:3', 60, 2))
+
+        self.assertTrue(self.dbapi.renew_job(job1, 60))
+        self.assertTrue(self.dbapi.complete_job(job1))
+
+        # lease expired; claimed by another worker
+        self.dbapi.impl.bulk_update(
+            {'lease_expires_at': datetime.datetime.utcnow() -
+             datetime.timedelta(seconds=1)},
+            api_model.Job, {'=': {'id': job2.job_id}})
+        job3 = self.dbapi.claim_job('host:3', 60, 2)
+        self.assertEqual(job3.job_id, job2.job_id)
+        self.assertEqual(job3.attempts, 2)
+        self.assertFalse(self.dbapi.renew_job(job2, 60))
+        self.assertFalse(self.dbapi.complete_job(job2))
+
+        # claimed too many times
+        self.dbapi.impl.bulk_update(
+            {'lease_expires_at': datetime.datetime.utcnow() -
+             datetime.timedelta(seconds=1)},
+            api_model.Job, {'=': {'id': job3.job_id}})
+        self.assertIsNone(self.dbapi.claim_job('host:1', 60, 2))
+
+        self.assertEqual(self.dbapi.delete_jobs({'=': {'id': job3.job_id}}),
+                         1)
+        self.assertEqual(list(self.dbapi.get_jobs()), [])
+
+    def test_claim_job_priority(self):
+        tor1 = self.dbapi.save_torrent(
+            api_model.Torrent(torrent_id=None, name='fake1.torrent'))
+        jobs = self.dbapi.enqueue_jobs(
+            [api_model.Job(job_id=None, torrent_id=tor1.torrent_id,
+                           phase='activate', task='SyncFile',
+                           media_ids=[idx], priority=priority)
+             for idx, priority in enumerate([0, 5, 0, 10])])
+
+        claimed = [self.dbapi.claim_job('host:1', 60, 1).job_id
+                   for _ in jobs]
+        self.assertEqual(claimed, [jobs[idx].job_id for idx in (3, 1, 0, 2)])
+
     def test_save_appstate(self):
 
         appstate = api_model.AppState(name='test', value='fake')
@@ -348,6 +645,65 @@ class ApiDBTestCase(test.ConfiguredBaseTestCase):
         self.dbapi.delete_appstate(appstate)
         self.assertIsNone(self.dbapi.get_appstate('test'))
 
+    def test_get_appstate_cached(self):
+        self.dbapi.save_appstate(api_model.AppState(name='test', value='a'))
+
+        with mock.patch.object(self.dbapi.impl, 'fetch_by') as fetch_by:
+            appstate = self.dbapi.get_appstate('test')
+            self.assertEqual(appstate.value, 'a')
+            # modifying the instance returned leaves the cache as is
+            appstate.value = 'b'
+            self.assertEqual(self.dbapi.get_appstate('test').value, 'a')
+            self.assertFalse(fetch_by.called)
+
+        # not found is read again, e.g. once created by another process
+        self.assertIsNone(self.dbapi.get_appstate('missing'))
+        with mock.patch.object(self.dbapi.impl, 'fetch_by',
+                               return_value=[]) as fetch_by:
+            self.assertIsNone(self.dbapi.get_appstate('missing'))
+            self.assertTrue(fetch_by.called)
+
+        self.dbapi.save_appstate(api_model.AppState(name='missing', value=1))
+        self.assertEqual(self.dbapi.get_appstate('missing').value, 1)
+
+        self.dbapi.clear()
+        self.assertEqual(self.dbapi._appstates, {})
+
+    def test_get_appstate_expired(self):
+        self.dbapi.save_appstate(api_model.AppState(name='test', value='a'))
+        self.dbapi.get_appstate('test')
+        # changed by another process
+        self.dbapi.impl.save(api_model.AppState(name='test', value='b'))
+        self.assertEqual(self.dbapi.get_appstate('test').value, 'a')
+
+        expired = time.time() + self.CONF.database.appstate_cache_ttl + 1
+        with mock.patch.object(time, 'time', return_value=expired):
+            self.assertEqual(self.dbapi.get_appstate('test').value, 'b')
+
+    def test_get_appstate_not_cached(self):
+        self.CONF.set_override('appstate_cache_ttl', 0, group='database')
+        self.patch(db, '_DBAPI', {})
+        dbapi = db.dbapi(self.CONF)
+        dbapi.save_appstate(api_model.AppState(name='test', value='a'))
+        self.assertEqual(dbapi.get_appstate('test').value, 'a')
+
+        dbapi.impl.save(api_model.AppState(name='test', value='b'))
+        self.assertEqual(dbapi.get_appstate('test').value, 'b')
+        self.assertEqual(dbapi._appstates, {})
+
+    def test_appstates(self):
+        saved = self.dbapi.save_appstates(
+            [api_model.AppState(name='test1', value=1),
+             api_model.AppState(name='test2', value='two')])
+        self.assertEqual([appstate.name for appstate in saved],
+                         ['test1', 'test2'])
+
+        self.dbapi._appstates.clear()
+        appstates = self.dbapi.get_appstates(['test1', 'test2', 'test3'])
+        self.assertEqual(appstates['test1'].value, 1)
+        self.assertEqual(appstates['test2'].value, 'two')
+        self.assertIsNone(appstates['test3'])
+
     def test_clean_up(self):
         # initial call where there is no last_purge_date
         # appstate entry.
@@ -382,3 +738,51 @@ class ApiDBTestCase(test.ConfiguredBaseTestCase):
         open(os.path.join(self.CONF.torrent.torrent_path,
                           'fake2.torrent'), 'a').close()
         self.dbapi.clean_up()
+
+    def test_clean_up_chunked(self):
+        self.CONF.set_override('purge_chunk_size', 2, 'database')
+        self.CONF.set_override('torrent_age', 0, 'retention')
+
+        for idx in range(5):
+            torrent = self.dbapi.save_torrent(
+                api_model.Torrent(torrent_id=None,
+                                  name='fake{0}.torrent'.format(idx),
+                                  state='done' if idx else 'active'))
+            self.dbapi.save_media(
+                api_model.MediaFile(media_id=None,
+                                    torrent_id=torrent.torrent_id,
+                                    filename='movie-{0}.mp4'.format(idx),
+                                    file_ext='.mp4'))
+
+        open(os.path.join(self.CONF.torrent.torrent_path,
+                          'fake2.torrent'), 'a').close()
+        self.dbapi.clean_up()
+
+        # purged torrents are removed, except those still on disk
+        self.assertEqual(
+            sorted(tor.name for tor in self.dbapi.get_torrents({
+                '!=': {'name': ''}})),
+            ['fake0.torrent', 'fake2.torrent'])
+        self.assertTrue(self.dbapi.get_torrent_by_name(
+            'fake2.torrent')[0].purged)
+        self.assertEqual(
+            [mf.filename for mf in self.dbapi.get_medias({
+                '!=': {'filename': ''}})],
+            ['movie-0.mp4'])
+
+    def test_clean_up_missing_torrent_path(self):
+        self.dbapi.save_appstate(
+            api_model.AppState(name='last_purge_date',
+                               value=datetime.datetime.utcnow()))
+        self.dbapi.save_torrent(
+            api_model.Torrent(torrent_id=None,
+                              name='fake1.torrent',
+                              state='done',
+                              purged=True))
+
+        self.CONF.set_override('torrent_path',
+                               os.path.join(self.base_dir, 'missing'),
+                               'torrent')
+        self.dbapi.clean_up()
+        self.assertEqual(
+            len(list(self.dbapi.get_torrents_eligible_for_removal())), 1)
@@ -1,10 +1,14 @@
 import glob
+import gzip
 import os
+import sqlite3
 
+import mock
 import six.moves.urllib.parse as urlparse
 
 from seedbox import db
 from seedbox.db import maintenance
+from seedbox.db import models
 from seedbox.tests import test
 
 
@@ -14,6 +18,7 @@ class DbMaintenanceTest(test.ConfiguredBaseTestCase):
         super(DbMaintenanceTest, self).setUp()
 
         # initialize the database and schema details.
+        self.patch(db, '_DBAPI', {})
         db.dbapi(self.CONF)
 
     def test_backup_database(self):
@@ -36,3 +41,78 @@ class DbMaintenanceTest(test.ConfiguredBaseTestCase):
             os.remove(db_name)
         # perform backup
         maintenance.backup(self.CONF)
+
+    def test_backup_consistent(self):
+        db_name = urlparse.urlparse(
+            self.CONF.database.connection).path.replace('//', '/')
+        dbapi = db.dbapi(self.CONF)
+        dbapi.save_torrent(models.Torrent(torrent_id=None,
+                                          name='fake.torrent'))
+
+        self.CONF.set_override('backup_pages', 1, group='database')
+        maintenance.backup(self.CONF)
+
+        conn = sqlite3.connect(db_name + '.1')
+        try:
+            self.assertEqual(
+                conn.execute('pragma integrity_check').fetchone()[0], 'ok')
+            self.assertEqual(
+                conn.execute('select name from torrents').fetchall(),
+                [('fake.torrent',)])
+        finally:
+            conn.close()
+        self.assertFalse(os.path.exists(db_name + '.1.tmp'))
+
+    def test_backup_sleep(self):
+        db_name = urlparse.urlparse(
+            self.CONF.database.connection).path.replace('//', '/')
+        db.dbapi(self.CONF)
+
+        def _copy_db(source_name, target_name, pages, sleep):
+            open(target_name, 'w').close()
+
+        with mock.patch.object(maintenance, '_copy_db',
+                               side_effect=_copy_db) as copy_db:
+            maintenance.backup(self.CONF)
+            self.CONF.set_override('backup_sleep', 0.5, group='database')
+            maintenance.backup(self.CONF)
+        self.assertEqual([call[0][2:] for call in copy_db.call_args_list],
+                         [(256, 0), (256, 0.5)])
+        self.assertEqual(copy_db.call_args[0][0], db_name)
+
+    def test_backup_compress(self):
+        db_name = urlparse.urlparse(
+            self.CONF.database.connection).path.replace('//', '/')
+        self.CONF.set_override('backup_compress', True, group='database')
+
+        for _ in range(0, 10):
+            maintenance.backup(self.CONF)
+
+        self.assertTrue(os.path.exists(db_name + '.1'))
+        for idx in range(2, 9):
+            self.assertFalse(os.path.exists('%s.%d' % (db_name, idx)))
+            self.assertTrue(os.path.exists('%s.%d.gz' % (db_name, idx)))
+        self.assertEqual(len(glob.glob(db_name + '*')), 9)
+
+        with gzip.open(db_name + '.2.gz', 'rb') as backup:
+            self.assertTrue(backup.read(16).startswith(b'SQLite format 3'))
+
+        # switching compression off keeps rotating compressed backups
+        self.CONF.set_override('backup_compress', False, group='database')
+        maintenance.backup(self.CONF)
+        self.assertTrue(os.path.exists(db_name + '.2'))
+        self.assertTrue(os.path.exists(db_name + '.3.gz'))
+        self.assertEqual(len(glob.glob(db_name + '*')), 9)
+
+    def test_backup_count(self):
+        db_name = urlparse.urlparse(
+            self.CONF.database.connection).path.replace('//', '/')
+
+        for _ in range(0, 5):
+            maintenance.backup(self.CONF)
+        self.assertEqual(len(glob.glob(db_name + '.*')), 5)
+
+        self.CONF.set_override('backup_count', 2, group='retention')
+        maintenance.backup(self.CONF)
+        self.assertEqual(sorted(glob.glob(db_name + '.*')),
+                         [db_name + '.1', db_name + '.2'])
@@ -1,3 +1,5 @@
+import pickle
+
 import six
 import testtools
 from testtools import matchers
@@ -62,3 +64,43 @@ class DbModelTest(test.BaseTestCase):
     def test_appstate_model(self):
         appstate = models.AppState.make_empty()
         self.assertIsInstance(appstate, models.AppState)
+
+    def test_field_names(self):
+        self.assertEqual(FakeModel.field_names(), ('arg_a', 'arg_b', 'arg_c'))
+        self.assertIs(FakeModel.field_names(), FakeModel.field_names())
+
+    def test_from_values(self):
+        fake = FakeModel.from_values({'arg_a': 1, 'arg_b': 2, 'arg_c': 3})
+        self.assertIsInstance(fake, FakeModel)
+        self.assertEqual(fake, FakeModel(arg_a=1, arg_b=2, arg_c=3))
+        self.assertEqual(len(fake.as_dict()), 3)
+
+    def test_slots(self):
+        for model in (models.Torrent, models.MediaFile, models.AppState,
+                      models.SyncProgress, models.TaskCheckpoint):
+            self.assertEqual(model.__slots__, model.field_names())
+            self.assertFalse(hasattr(model.make_empty(), '__dict__'))
+
+    def test_pickle(self):
+        mf = models.MediaFile.make_empty()
+        mf.media_id = 1
+        mf.filename = 'media.mp4'
+        torrent = models.Torrent.make_empty()
+        torrent.torrent_id = 1
+        torrent.media_files = [mf]
+
+        other = pickle.loads(pickle.dumps(torrent))
+        self.assertIsInstance(other, models.Torrent)
+        self.assertEqual(other, torrent)
+        self.assertEqual(other.media_files[0].filename, 'media.mp4')
+
+        self.assertNotEqual(torrent, mf)
+        self.assertNotEqual(torrent, None)
+
+    def test_pickle_unloaded(self):
+        torrent = models.Torrent(torrent_id=1, name='fake.torrent')
+        torrent.media_files = None
+
+        other = pickle.loads(pickle.dumps(torrent))
+        self.assertIsNone(other.media_files)
+        self.assertEqual(other, torrent)
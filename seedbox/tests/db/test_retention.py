@@ -0,0 +1,111 @@
+import datetime
+import os
+
+from seedbox import db
+from seedbox.db import models as api_model
+from seedbox.db import retention
+from seedbox.tests import test
+
+
+class RetentionTestCase(test.ConfiguredBaseTestCase):
+
+    def setUp(self):
+        super(RetentionTestCase, self).setUp()
+
+        self.patch(db, '_DBAPI', {})
+        self.dbapi = db.dbapi(self.CONF)
+
+    def _add_torrent(self, name, state='done', days=0, on_disk=True):
+        if on_disk:
+            open(os.path.join(self.CONF.torrent.torrent_path, name),
+                 'a').close()
+        torrent = self.dbapi.save_torrent(
+            api_model.Torrent(torrent_id=None, name=name, state=state))
+        self.dbapi.save_media(
+            api_model.MediaFile(media_id=None,
+                                torrent_id=torrent.torrent_id,
+                                filename=name + '.mp4',
+                                file_ext='.mp4'))
+        if days:
+            updated_at = datetime.datetime.utcnow() - datetime.timedelta(
+                days=days)
+            self.dbapi.bulk_save_torrents(
+                {'updated_at': updated_at},
+                {'=': {'id': torrent.torrent_id}})
+        return torrent
+
+    def _purged(self):
+        return sorted(tor.name for tor in self.dbapi.get_torrents(
+            {'=': {'purged': True}}, with_media=False))
+
+    def test_age(self):
+        self._add_torrent('old.torrent', days=10)
+        self._add_torrent('new.torrent', days=1)
+        self._add_torrent('active.torrent', state='active', days=10)
+
+        stats = self.dbapi.clean_up()
+        self.assertEqual(stats['torrents_purged'], 1)
+        self.assertEqual(stats['medias_deleted'], 1)
+        self.assertEqual(self._purged(), ['old.torrent'])
+        self.assertEqual(
+            self.dbapi.get_appstate('last_purge_rows').value, 1)
+        self.assertIsNotNone(self.dbapi.get_appstate('last_backup_date'))
+
+        self.CONF.set_override('torrent_age', 0, 'retention')
+        self.dbapi.clean_up()
+        self.assertEqual(self._purged(), ['new.torrent', 'old.torrent'])
+
+    def test_count(self):
+        self.CONF.set_override('torrent_count', 2, 'retention')
+        for idx in range(4):
+            self._add_torrent('fake{0}.torrent'.format(idx))
+
+        self.dbapi.clean_up()
+        self.assertEqual(self._purged(), ['fake0.torrent', 'fake1.torrent'])
+
+    def test_max_db_size(self):
+        self._add_torrent('new.torrent')
+
+        self.CONF.set_override('max_db_size', 1024, 'retention')
+        self.dbapi.clean_up()
+        self.assertEqual(self._purged(), [])
+
+        qfilter = retention.purge_filter(self.CONF,
+                                         1025 * retention.MEGABYTE)
+        self.assertEqual(qfilter, retention.PURGE_FILTER)
+
+    def test_max_rows(self):
+        self.CONF.set_override('torrent_age', 0, 'retention')
+        self.CONF.set_override('max_rows', 3, 'retention')
+        self.CONF.set_override('purge_chunk_size', 2, 'database')
+        for idx in range(5):
+            self._add_torrent('fake{0}.torrent'.format(idx), on_disk=False)
+
+        # torrent files no longer exist
+        stats = self.dbapi.clean_up()
+        self.assertEqual(stats['torrents_purged'], 3)
+        self.assertEqual(stats['torrents_removed'], 3)
+
+        open(os.path.join(self.CONF.torrent.torrent_path,
+                          'fake4.torrent'), 'a').close()
+        stats = self.dbapi.clean_up()
+        self.assertEqual(stats['torrents_purged'], 2)
+        self.assertEqual(stats['torrents_removed'], 1)
+        self.assertEqual(self._purged(), ['fake4.torrent'])
+
+    def test_backup_interval(self):
+        self.CONF.set_override('torrent_age', 0, 'retention')
+        self._add_torrent('fake1.torrent')
+        self.dbapi.clean_up()
+        first = self.dbapi.get_appstate('last_backup_date').value
+
+        self._add_torrent('fake2.torrent')
+        self.dbapi.clean_up()
+        self.assertEqual(
+            self.dbapi.get_appstate('last_backup_date').value, first)
+
+        self.CONF.set_override('backup_interval', 0, 'retention')
+        self._add_torrent('fake3.torrent')
+        self.dbapi.clean_up()
+        self.assertNotEqual(
+            self.dbapi.get_appstate('last_backup_date').value, first)
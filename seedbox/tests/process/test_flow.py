@@ -59,3 +59,58 @@ class FlowTestCase(test.ConfiguredBaseTestCase):
 
         tasks = wf.next_tasks()
         self.assertEqual(len(list(tasks)), 2)
+
+    def test_next_tasks_retry(self):
+
+        _medias = []
+        for idx in range(3):
+            _medias.append(models.MediaFile(
+                media_id=None,
+                torrent_id=self.torrent.torrent_id,
+                filename='movie-{0}.mp4'.format(idx),
+                file_ext='.mp4',
+                file_path='/tmp/media/',
+                compressed=0,
+                synced=0,
+                missing=0,
+                skipped=0,
+                retryable=idx == 0
+                ))
+        self.dbapi.bulk_create_medias(_medias)
+
+        wf = flow.BaseFlow(self.dbapi, self.torrent)
+
+        tasks = list(wf.next_tasks())
+        self.assertEqual(len(tasks), 1)
+        self.assertEqual(tasks[0].media_file.filename, 'movie-0.mp4')
+
+    def test_next_tasks_checkpoint(self):
+
+        _medias = []
+        for idx in range(2):
+            _medias.append(models.MediaFile(
+                media_id=None,
+                torrent_id=self.torrent.torrent_id,
+                filename='movie-{0}.mp4'.format(idx),
+                file_ext='.mp4',
+                file_path='/tmp/media/',
+                compressed=0,
+                synced=0,
+                missing=0,
+                skipped=0
+                ))
+        medias = self.dbapi.bulk_create_medias(_medias)
+
+        # task completed before the previous run was interrupted
+        self.dbapi.save_task_results(
+            [], [models.TaskCheckpoint(checkpoint_id=None,
+                                       media_id=medias[0].media_id,
+                                       phase='prepare',
+                                       task='CopyFile')])
+
+        wf = flow.BaseFlow(self.dbapi, self.torrent)
+
+        tasks = list(wf.next_tasks())
+        self.assertEqual(len(tasks), 1)
+        self.assertEqual(tasks[0].media_file.filename, 'movie-1.mp4')
+        self.assertEqual(tasks[0].phase, 'prepare')
@@ -0,0 +1,98 @@
+import mock
+
+from seedbox import db
+from seedbox.db import models
+from seedbox.process import jobqueue
+from seedbox.tests import test
+
+
+class SampleTask(object):
+
+    def __init__(self, media_files):
+        self.media_files = media_files
+        self.phase = 'activate'
+
+
+class JobManagerTestCase(test.ConfiguredBaseTestCase):
+
+    def setUp(self):
+        super(JobManagerTestCase, self).setUp()
+
+        self.patch(db, '_DBAPI', {})
+        self.dbapi = db.dbapi(self.CONF)
+
+        self.torrent = self.dbapi.save_torrent(
+            models.Torrent(torrent_id=None, name='fake1.torrent'))
+        self.medias = self.dbapi.bulk_create_medias(
+            [models.MediaFile(media_id=None,
+                              torrent_id=self.torrent.torrent_id,
+                              filename='movie-{0}.mp4'.format(idx),
+                              file_ext='.mp4',
+                              file_path='/tmp/media')
+             for idx in range(3)])
+
+    def test_run(self):
+        mgr = jobqueue.JobManager(self.dbapi)
+        mgr.add_tasks([SampleTask(self.medias[:2])])
+        mgr.add_tasks(SampleTask(self.medias[2:]))
+
+        def _work(seconds):
+            # a worker executing the queued jobs
+            for job in list(self.dbapi.get_jobs()):
+                self.dbapi.delete_jobs({'=': {'id': job.job_id}})
+
+        with mock.patch.object(jobqueue.time, 'sleep',
+                               side_effect=_work) as sleep:
+            self.assertEqual(mgr.run(), [])
+            self.assertEqual(sleep.call_count, 1)
+        self.assertEqual(mgr.tasks, [])
+        mgr.shutdown()
+
+    def test_run_queued(self):
+        # queued before an interrupted run
+        queued = self.dbapi.enqueue_jobs(
+            [models.Job(job_id=None, torrent_id=self.torrent.torrent_id,
+                        phase='activate', task='SampleTask',
+                        media_ids=[self.medias[0].media_id])])
+
+        mgr = jobqueue.JobManager(self.dbapi)
+        mgr.add_tasks([SampleTask(self.medias[:1]),
+                       SampleTask(self.medias[1:])])
+        jobs = mgr._enqueue()
+        self.assertEqual(len(jobs), 2)
+        self.assertIn(queued[0].job_id, [job.job_id for job in jobs])
+        self.assertEqual(len(list(self.dbapi.get_jobs())), 2)
+
+    def test_run_abandoned(self):
+        self.CONF.set_override('max_attempts', 1, group='worker')
+        mgr = jobqueue.JobManager(self.dbapi)
+        mgr.add_tasks(SampleTask(self.medias))
+
+        def _work(seconds):
+            # a worker that died while executing the job
+            self.dbapi.claim_job('host:1', 0, 1)
+
+        with mock.patch.object(jobqueue.time, 'sleep', side_effect=_work):
+            mgr.run()
+
+        self.assertEqual(list(self.dbapi.get_jobs()), [])
+        for mf in self.dbapi.get_medias_by_torrent(self.torrent.torrent_id):
+            self.assertEqual(mf.error_msg,
+                             jobqueue.ABANDONED_MSG.format(1))
+            self.assertFalse(mf.retryable)
+
+    def test_run_heartbeat(self):
+        heartbeat = mock.Mock()
+        mgr = jobqueue.JobManager(self.dbapi, heartbeat)
+        mgr.add_tasks(SampleTask(self.medias))
+
+        def _work(seconds):
+            # a worker executing the queued job on the second check
+            if heartbeat.call_count:
+                for job in list(self.dbapi.get_jobs()):
+                    self.dbapi.delete_jobs({'=': {'id': job.job_id}})
+
+        with mock.patch.object(jobqueue.time, 'sleep', side_effect=_work):
+            mgr.run()
+
+        self.assertEqual(heartbeat.call_count, 2)
@@ -1,4 +1,6 @@
+from seedbox import db
 from seedbox.process import manager
+from seedbox.tasks import bandwidth
 from seedbox.tests import test
 
 
@@ -8,6 +10,39 @@ class SampleTask(object):
         return [True]
 
 
+class ScheduledTask(SampleTask):
+
+    def __init__(self):
+        self.concurrency = None
+
+    def schedule(self, concurrency):
+        self.concurrency = concurrency
+
+
+class BandwidthTask(SampleTask):
+
+    def __init__(self):
+        self.bwlimit = 0
+
+    def schedule(self, concurrency):
+        self.bwlimit = bandwidth.allocate(concurrency)
+
+
+class PriorityTask(SampleTask):
+
+    def __init__(self, priority):
+        self.priority = priority
+
+    def __call__(self):
+        return [self.priority]
+
+
+class WorkerTask(object):
+
+    def __call__(self):
+        return [db._DBAPI.get('worker')]
+
+
 class ManagerTestCase(test.ConfiguredBaseTestCase):
 
     def test_manager(self):
@@ -28,3 +63,79 @@ class ManagerTestCase(test.ConfiguredBaseTestCase):
         self.assertEqual(len(results), 4)
 
         mgr.shutdown()
+
+    def test_manager_schedule(self):
+        self.CONF.set_override('max_processes', 3, group='process')
+        mgr = manager.TaskManager()
+
+        # all dispatched at once, each knowing the others of its kind
+        _tasks = [ScheduledTask(), SampleTask(), ScheduledTask()]
+        mgr.add_tasks(_tasks)
+
+        results = mgr.run()
+        self.assertEqual(len(results), 3)
+        self.assertEqual(_tasks[0].concurrency, 2)
+        self.assertEqual(_tasks[2].concurrency, 2)
+
+        mgr.shutdown()
+
+    def test_manager_schedule_bandwidth(self):
+        self.CONF.set_override('max_processes', 4, group='process')
+        self.CONF.set_override('bwlimit', 1000, group='tasks_filesync')
+        mgr = manager.TaskManager()
+
+        allocated = []
+        schedule = mgr._schedule
+
+        def _schedule(task, running, pending):
+            schedule(task, running, pending)
+            allocated.append(sum(other.bwlimit for other in running
+                                 if isinstance(other, BandwidthTask)) +
+                             getattr(task, 'bwlimit', 0))
+
+        self.patch(mgr, '_schedule', _schedule)
+        mgr.add_tasks([BandwidthTask(), SampleTask(), BandwidthTask(),
+                       BandwidthTask(), BandwidthTask(), SampleTask(),
+                       BandwidthTask(), BandwidthTask()])
+
+        self.assertEqual(len(mgr.run()), 8)
+        self.assertTrue(allocated)
+        # the shares of the syncs running at the same time
+        for total in allocated:
+            self.assertLessEqual(total, 1000)
+
+        mgr.shutdown()
+
+    def test_manager_worker(self):
+        mgr = manager.TaskManager()
+        mgr.add_tasks([WorkerTask(), WorkerTask()])
+
+        self.assertEqual(mgr.run(), [True, True])
+        mgr.shutdown()
+
+    def test_manager_on_done(self):
+        mgr = manager.TaskManager()
+        _tasks = [SampleTask(), SampleTask()]
+        mgr.add_tasks(_tasks)
+
+        done = []
+
+        def _on_done(task, result, started_at, finished_at):
+            self.assertLessEqual(started_at, finished_at)
+            done.append((task, result))
+
+        mgr.run(on_done=_on_done)
+        self.assertEqual(sorted(id(task) for task, _ in done),
+                         sorted(id(task) for task in _tasks))
+        self.assertEqual([result for _, result in done], [[True], [True]])
+        mgr.shutdown()
+
+    def test_manager_priority(self):
+        self.CONF.set_override('max_processes', 1, group='process')
+        mgr = manager.TaskManager()
+        mgr.add_tasks([PriorityTask(0), PriorityTask(5), SampleTask(),
+                       PriorityTask(10)])
+
+        # executed one at a time so completed in the order dispatched
+        self.assertEqual(mgr.run(), [10, 5, 0, True])
+        mgr.shutdown()
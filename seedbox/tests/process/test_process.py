@@ -1,6 +1,7 @@
 from seedbox import db
 from seedbox.db import models
 from seedbox import process
+from seedbox.tasks import filecopy
 from seedbox.tests import test
 
 
@@ -16,7 +17,7 @@ class FakeManager(object):
         def add_tasks(self, tasks):
             self.tasks.extend(tasks)
 
-        def run(self):
+        def run(self, on_done=None):
             _medias = []
             for i in range(1, 3):
                 _medias.append(models.MediaFile(
@@ -27,6 +28,8 @@ class FakeManager(object):
                     file_path='/tmp/media'))
             medias = FakeManager.DBAPI.bulk_create_medias(_medias)
 
+            for task in self.tasks:
+                on_done(task, task.media_files, None, None)
             return medias
 
         def shutdown(self):
@@ -78,3 +81,56 @@ class ProcessTestCase(test.ConfiguredBaseTestCase):
 
         process.start()
         self.assertTrue(True)
+
+    def test_save_results(self):
+        tor1 = self.dbapi.save_torrent(
+            models.Torrent(torrent_id=None,
+                           name='fake22.torrent'))
+
+        _medias = []
+        for i in range(1, 3):
+            _medias.append(models.MediaFile(
+                media_id=None,
+                torrent_id=tor1.torrent_id,
+                filename='movie-{0}.mp4'.format(i),
+                file_ext='.mp4',
+                file_path='/tmp/media'))
+        medias = self.dbapi.bulk_create_medias(_medias)
+
+        task = filecopy.CopyFile(medias[0])
+        task.phase = 'prepare'
+        medias[0].file_path = '/tmp/sync'
+        process.save_results(self.dbapi)(task, [medias[0]], None, None)
+
+        task = filecopy.CopyFile(medias[1])
+        task.phase = 'prepare'
+        medias[1].error_msg = 'failed'
+        process.save_results(self.dbapi)(task, [medias[1]], None, None)
+
+        self.assertEqual(
+            self.dbapi.get_media(medias[0].media_id).file_path, '/tmp/sync')
+        self.assertEqual(
+            self.dbapi.get_media(medias[1].media_id).error_msg, 'failed')
+        checkpoints = list(self.dbapi.get_task_checkpoints(
+            [mf.media_id for mf in medias], 'prepare'))
+        self.assertEqual([(cp.media_id, cp.task) for cp in checkpoints],
+                         [(medias[0].media_id, 'CopyFile')])
+
+    def test_get_work_priority(self):
+        for name, priority in [('fake23.torrent', None),
+                               ('fake24.torrent', 10),
+                               ('fake25.torrent', -5)]:
+            tor = self.dbapi.save_torrent(
+                models.Torrent(torrent_id=None, name=name,
+                               priority=priority))
+            self.dbapi.bulk_create_medias(
+                [models.MediaFile(media_id=None,
+                                  torrent_id=tor.torrent_id,
+                                  filename='movie.mp4',
+                                  file_ext='.mp4',
+                                  file_path='/tmp/media')])
+
+        flows = process._get_work(self.dbapi)
+        self.assertEqual([wf.torrent.name for wf in flows],
+                         ['fake24.torrent', 'fake23.torrent',
+                          'fake25.torrent'])
@@ -0,0 +1,143 @@
+import multiprocessing
+
+import mock
+
+from seedbox import db
+from seedbox.db import models
+from seedbox.process import worker
+from seedbox.tasks import bandwidth
+from seedbox.tasks import base
+from seedbox.tests import test
+
+
+class SampleTask(base.BaseTask):
+
+    def execute(self):
+        self.media_file.synced = True
+
+
+class ScheduledTask(SampleTask):
+
+    scheduled = []
+
+    def schedule(self, concurrency):
+        ScheduledTask.scheduled.append(bandwidth.allocate(concurrency))
+
+
+class FailedTask(base.BaseTask):
+
+    def execute(self):
+        raise ValueError('failed')
+
+
+class WorkerTestCase(test.ConfiguredBaseTestCase):
+
+    def setUp(self):
+        super(WorkerTestCase, self).setUp()
+
+        self.patch(db, '_DBAPI', {})
+        self.dbapi = db.dbapi(self.CONF)
+        self.CONF.set_override('exit_when_idle', True, group='worker')
+
+        self.torrent = self.dbapi.save_torrent(
+            models.Torrent(torrent_id=None, name='fake1.torrent'))
+        self.medias = self.dbapi.bulk_create_medias(
+            [models.MediaFile(media_id=None,
+                              torrent_id=self.torrent.torrent_id,
+                              filename='movie-{0}.mp4'.format(idx),
+                              file_ext='.mp4',
+                              file_path='/tmp/media')
+             for idx in range(6)])
+
+        self.patch(worker.flow, 'get_tasks',
+                   lambda phase: [SampleTask, ScheduledTask, FailedTask])
+
+    def _enqueue(self, task):
+        return self.dbapi.enqueue_jobs(
+            [models.Job(job_id=None, torrent_id=self.torrent.torrent_id,
+                        phase='activate', task=task,
+                        media_ids=[mf.media_id])
+             for mf in self.medias])
+
+    def _checkpoints(self):
+        return list(self.dbapi.get_task_checkpoints(
+            [mf.media_id for mf in self.medias], 'activate'))
+
+    def test_run(self):
+        self._enqueue('SampleTask')
+
+        self.assertEqual(worker.run(self.CONF), 6)
+        self.assertEqual(list(self.dbapi.get_jobs()), [])
+        for mf in self.dbapi.get_medias_by_torrent(self.torrent.torrent_id):
+            self.assertTrue(mf.synced)
+        self.assertEqual(len(self._checkpoints()), 6)
+
+    def test_run_scheduled(self):
+        self._enqueue('ScheduledTask')
+        self.patch(ScheduledTask, 'scheduled', [])
+        self.CONF.set_override('bwlimit', 1000, group='tasks_filesync')
+
+        self.assertEqual(worker.run(self.CONF), 6)
+        self.assertEqual(ScheduledTask.scheduled, [1000] * 6)
+
+    def test_run_scheduled_workers(self):
+        self._enqueue('ScheduledTask')
+        self.patch(ScheduledTask, 'scheduled', [])
+        self.CONF.set_override('bwlimit', 1000, group='tasks_filesync')
+        self.CONF.set_override('workers', 3, group='worker')
+
+        self.assertEqual(worker.run(self.CONF), 6)
+        self.assertEqual(ScheduledTask.scheduled, [333] * 6)
+        # all workers running at the same time stay within the budget
+        self.assertLessEqual(
+            max(ScheduledTask.scheduled) * self.CONF.worker.workers, 1000)
+
+    def test_run_failed(self):
+        self._enqueue('FailedTask')
+
+        self.assertEqual(worker.run(self.CONF), 6)
+        for mf in self.dbapi.get_medias_by_torrent(self.torrent.torrent_id):
+            self.assertIn('failed', mf.error_msg)
+        self.assertEqual(self._checkpoints(), [])
+
+    def test_run_unknown_task(self):
+        self._enqueue('UnknownTask')
+
+        self.assertEqual(worker.run(self.CONF), 6)
+        self.assertEqual(list(self.dbapi.get_jobs()), [])
+        self.assertEqual(self._checkpoints(), [])
+        for mf in self.dbapi.get_medias_by_torrent(self.torrent.torrent_id):
+            self.assertEqual(mf.error_msg,
+                             worker.UNKNOWN_TASK_MSG.format('UnknownTask',
+                                                            'activate'))
+            self.assertFalse(mf.retryable)
+
+    def test_run_many(self):
+        self._enqueue('SampleTask')
+
+        workers = [multiprocessing.Process(target=worker.run,
+                                           args=(self.CONF,))
+                   for _ in range(3)]
+        for proc in workers:
+            proc.start()
+        for proc in workers:
+            proc.join(30)
+            self.assertEqual(proc.exitcode, 0)
+
+        # each job executed by exactly one of the workers
+        self.assertEqual(list(self.dbapi.get_jobs()), [])
+        self.assertEqual(
+            sorted(cp.media_id for cp in self._checkpoints()),
+            sorted(mf.media_id for mf in self.medias))
+
+    def test_heartbeat(self):
+        job = self._enqueue('SampleTask')[0]
+        dbapi = mock.Mock()
+        dbapi.renew_job.return_value = False
+
+        heartbeat = worker._Heartbeat(dbapi, job, 0.03)
+        heartbeat.start()
+        heartbeat.join(5)
+        self.assertFalse(heartbeat.is_alive())
+        dbapi.renew_job.assert_called_once_with(job, 0.03)
+        heartbeat.stop()
@@ -1,4 +1,5 @@
 from seedbox import db
+from seedbox.common import timeutil
 from seedbox.db import models
 from seedbox.process import workflow
 from seedbox.tests import test
@@ -51,3 +52,68 @@ class WorkflowTestCase(test.ConfiguredBaseTestCase):
         wf = workflow.Workflow(self.dbapi, torrent)
         status = wf.run()
         self.assertTrue(status)
+        torrent = self.dbapi.get_torrent(torrent.torrent_id)
+        self.assertTrue(torrent.failed)
+
+    def test_retry_workflow(self):
+        self.CONF.set_override('max_retries', 1, group='process')
+
+        torrent = self.dbapi.save_torrent(
+            models.Torrent(torrent_id=None,
+                           name='fake178.torrent',
+                           state='active'))
+
+        media = models.MediaFile(media_id=None,
+                                 torrent_id=torrent.torrent_id,
+                                 filename='movie-178.mp4',
+                                 file_ext='.mp4',
+                                 file_path='/tmp/media',
+                                 error_msg='network went away',
+                                 retryable=True)
+        media = self.dbapi.save_media(media)
+
+        wf = workflow.Workflow(self.dbapi, torrent)
+        status = wf.run()
+        self.assertTrue(status)
+
+        torrent = self.dbapi.get_torrent(torrent.torrent_id)
+        self.assertFalse(torrent.failed)
+        self.assertEqual(torrent.retry_count, 1)
+        self.assertIsNotNone(torrent.retry_at)
+        media = self.dbapi.get_media(media.media_id)
+        self.assertIsNone(media.error_msg)
+        self.assertTrue(media.retryable)
+        # not eligible again until the retry time is reached
+        self.assertNotIn(torrent.torrent_id,
+                         [tor.torrent_id
+                          for tor in self.dbapi.get_torrents_active()])
+
+        # retries exhausted
+        media.error_msg = 'network went away again'
+        self.dbapi.save_media(media)
+        wf = workflow.Workflow(self.dbapi, torrent)
+        status = wf.run()
+        self.assertTrue(status)
+
+        torrent = self.dbapi.get_torrent(torrent.torrent_id)
+        self.assertTrue(torrent.failed)
+        self.assertEqual(torrent.retry_count, 1)
+
+    def test_retry_workflow_recovered(self):
+        torrent = self.dbapi.save_torrent(
+            models.Torrent(torrent_id=None,
+                           name='fake179.torrent',
+                           state='init',
+                           retry_count=2,
+                           retry_at=timeutil.utcnow(),
+                           error_msg='network went away'))
+
+        wf = workflow.Workflow(self.dbapi, torrent)
+        status = wf.run()
+        self.assertFalse(status)
+
+        torrent = self.dbapi.get_torrent(torrent.torrent_id)
+        self.assertEqual(torrent.state, 'ready')
+        self.assertEqual(torrent.retry_count, 0)
+        self.assertIsNone(torrent.retry_at)
+        self.assertIsNone(torrent.error_msg)
@@ -0,0 +1,60 @@
+import datetime
+
+import testtools
+
+from seedbox.tasks import bandwidth
+from seedbox.tests import test
+
+
+class BandwidthTest(test.ConfiguredBaseTestCase):
+
+    def setUp(self):
+        super(BandwidthTest, self).setUp()
+
+        self.CONF.set_override('bwlimit_schedule',
+                               ['07:00-17:00=50', '22:00-02:00=20'],
+                               group='tasks_filesync')
+
+    def _at(self, hour, minute=0):
+        return datetime.datetime(2015, 6, 1, hour, minute)
+
+    def test_parse_schedule(self):
+        self.assertEqual(bandwidth.parse_schedule(None), [])
+        self.assertEqual(bandwidth.parse_schedule(['07:30-17:00=50']),
+                         [(450, 1020, 50)])
+
+        with testtools.ExpectedException(ValueError):
+            bandwidth.parse_schedule(['07:00=50'])
+
+        with testtools.ExpectedException(ValueError):
+            bandwidth.parse_schedule(['25:00-26:00=50'])
+
+    def test_percent_available(self):
+        schedule = bandwidth.parse_schedule(
+            self.CONF.tasks_filesync.bwlimit_schedule)
+
+        self.assertEqual(
+            bandwidth.percent_available(schedule, self._at(6, 59)), 100)
+        self.assertEqual(
+            bandwidth.percent_available(schedule, self._at(7)), 50)
+        self.assertEqual(
+            bandwidth.percent_available(schedule, self._at(17)), 100)
+        self.assertEqual(
+            bandwidth.percent_available(schedule, self._at(23)), 20)
+        self.assertEqual(
+            bandwidth.percent_available(schedule, self._at(1, 30)), 20)
+
+    def test_unlimited(self):
+        self.assertEqual(bandwidth.budget(self._at(12)), 0)
+        self.assertEqual(bandwidth.allocate(4, self._at(12)), 0)
+
+    def test_allocate(self):
+        self.CONF.set_override('bwlimit', 1000, group='tasks_filesync')
+
+        self.assertEqual(bandwidth.budget(self._at(3)), 1000)
+        self.assertEqual(bandwidth.budget(self._at(12)), 500)
+
+        self.assertEqual(bandwidth.allocate(1, self._at(3)), 1000)
+        self.assertEqual(bandwidth.allocate(4, self._at(3)), 250)
+        self.assertEqual(bandwidth.allocate(4, self._at(23)), 50)
+        self.assertEqual(bandwidth.allocate(5000, self._at(23)), 1)
@@ -0,0 +1,227 @@
+import hashlib
+import io
+import os
+import random
+import threading
+
+from seedbox.db import models
+from seedbox.tasks import deltasync
+from seedbox.tasks import filesync
+from seedbox.tasks import syncbackend
+from seedbox.tests import test
+
+
+def _content(size, seed=1):
+    rand = random.Random(seed)
+    return bytes(bytearray(rand.getrandbits(8) for _ in range(size)))
+
+
+class DeltaAlgorithmTest(test.BaseTestCase):
+
+    block_size = 64
+
+    def _roundtrip(self, basis, source, partial=False):
+        blocks = deltasync.signature(io.BytesIO(basis), self.block_size)
+        checksum = hashlib.md5()
+        ops = list(deltasync.delta(io.BytesIO(source), blocks,
+                                   self.block_size, checksum, partial))
+        out = io.BytesIO()
+        deltasync.patch(io.BytesIO(basis), ops, out, self.block_size)
+        self.assertEqual(out.getvalue(), source)
+        self.assertEqual(checksum.digest(), hashlib.md5(source).digest())
+        return ops
+
+    def test_roll_checksum(self):
+        data = _content(200)
+        weak = deltasync.weak_checksum(data[:self.block_size])
+        for pos in range(1, len(data) - self.block_size):
+            weak = deltasync.roll_checksum(
+                weak, self.block_size,
+                bytearray(data)[pos - 1],
+                bytearray(data)[pos + self.block_size - 1])
+            self.assertEqual(
+                weak,
+                deltasync.weak_checksum(data[pos:pos + self.block_size]))
+
+    def test_no_basis(self):
+        ops = self._roundtrip(b'', _content(300))
+        self.assertTrue(all(op == deltasync.DATA for op, _ in ops))
+
+    def test_identical(self):
+        source = _content(1000)
+        ops = self._roundtrip(source, source)
+        self.assertTrue(all(op == deltasync.COPY for op, _ in ops))
+
+    def test_modified(self):
+        basis = _content(1000)
+        source = basis[:100] + b'inserted' + basis[100:900] + _content(50, 2)
+        ops = self._roundtrip(basis, source)
+        literal = sum(len(value) for op, value in ops
+                      if op == deltasync.DATA)
+        self.assertLess(literal, len(source) // 2)
+
+    def test_partial(self):
+        source = _content(1000)
+        ops = self._roundtrip(source[:500], source)
+        copied = [value for op, value in ops if op == deltasync.COPY]
+        self.assertEqual(copied, list(range(500 // self.block_size)))
+
+    def test_partial_basis(self):
+        source = _content(1000)
+        ops = self._roundtrip(source[:500], source, partial=True)
+        copied = [value for op, value in ops if op == deltasync.COPY]
+        self.assertEqual(copied, list(range(500 // self.block_size)))
+        # everything after the copied blocks is literal data
+        self.assertEqual([op for op, _ in ops[len(copied):]],
+                         [deltasync.DATA] * len(ops[len(copied):]))
+
+        ops = self._roundtrip(_content(500, 2), source, partial=True)
+        self.assertFalse([op for op, _ in ops if op == deltasync.COPY])
+
+    def test_empty(self):
+        self.assertEqual(self._roundtrip(_content(100), b''), [])
+
+
+class DeltaTransferTest(test.ConfiguredBaseTestCase):
+
+    block_size = 128
+
+    def setUp(self):
+        super(DeltaTransferTest, self).setUp()
+        self.src_dir = self._make_dir('src')
+        self.dest_dir = self._make_dir('dest')
+
+    def _source(self, content, name='media.mp4'):
+        path = os.path.join(self.src_dir, name)
+        with open(path, 'wb') as fd:
+            fd.write(content)
+        return path
+
+    def _read(self, name):
+        with open(os.path.join(self.dest_dir, name), 'rb') as fd:
+            return fd.read()
+
+    def test_local(self):
+        content = _content(5000)
+        path = self._source(content)
+        deltasync.send_file(path, 'media.mp4',
+                            deltasync.LocalChannel(self.dest_dir),
+                            self.block_size)
+        self.assertEqual(self._read('media.mp4'), content)
+
+        # resend a modified file; only the difference is sent
+        content = content[:2000] + b'changed' + content[2000:]
+        path = self._source(content)
+        sent = deltasync.send_file(path, 'media.mp4',
+                                   deltasync.LocalChannel(self.dest_dir),
+                                   self.block_size)
+        self.assertEqual(self._read('media.mp4'), content)
+        self.assertLess(sent, len(content) // 2)
+
+    def test_resume(self):
+        content = _content(5000)
+        path = self._source(content)
+
+        channel = deltasync.LocalChannel(self.dest_dir)
+        channel.signature('media.mp4', self.block_size)
+        channel.apply(deltasync.DATA, content[:3000])
+        # interrupted before finishing
+        channel.close()
+
+        part = os.path.join(self.dest_dir, 'media.mp4.part')
+        self.assertTrue(os.path.exists(part))
+        self.assertFalse(os.path.exists(part[:-5] + '.tmp'))
+
+        channel = deltasync.LocalChannel(self.dest_dir)
+        sent = deltasync.send_file(path, 'media.mp4', channel,
+                                   self.block_size)
+        self.assertTrue(channel.partial)
+        self.assertEqual(self._read('media.mp4'), content)
+        self.assertFalse(os.path.exists(part))
+        self.assertLess(sent, 2500)
+
+    def test_checksum_mismatch(self):
+        channel = deltasync.LocalChannel(self.dest_dir)
+        channel.signature('media.mp4', self.block_size)
+        channel.apply(deltasync.DATA, b'data')
+        self.assertRaises(deltasync.DeltaSyncError,
+                          channel.finish, b'0' * 16)
+        channel.close()
+        self.assertFalse(os.path.exists(
+            os.path.join(self.dest_dir, 'media.mp4')))
+
+    def test_invalid_filename(self):
+        self.assertRaises(deltasync.DeltaSyncError,
+                          deltasync.DeltaReceiver,
+                          self.dest_dir, '../escape.mp4', self.block_size)
+        self.assertRaises(deltasync.DeltaSyncError,
+                          deltasync.DeltaReceiver,
+                          self.dest_dir, '/etc/passwd', self.block_size)
+
+    def test_socket(self):
+        server = deltasync.Receiver(('127.0.0.1', 0), self.dest_dir)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        host, port = server.server_address
+
+        content = _content(5000)
+        path = self._source(content)
+        for _ in range(2):
+            deltasync.send_file(path, 'sub/media.mp4',
+                                deltasync.SocketChannel(host, port),
+                                self.block_size)
+            self.assertEqual(self._read('sub/media.mp4'), content)
+
+        err = self.assertRaises(deltasync.DeltaSyncError,
+                                deltasync.send_file,
+                                path, '../media.mp4',
+                                deltasync.SocketChannel(host, port),
+                                self.block_size)
+        self.assertNotIsInstance(err, deltasync.DeltaTransferError)
+
+    def test_connection_closed(self):
+        self.assertRaises(deltasync.DeltaTransferError,
+                          deltasync.read_frame, io.BytesIO(b'D'))
+
+    def test_backend(self):
+        self.CONF.set_override('sync_path', self.src_dir, group='tasks')
+        self.CONF.set_override('remote_path', self.dest_dir,
+                               group='tasks_filesync')
+        self.CONF.set_override('backend', 'delta', group='tasks_filesync')
+        self.CONF.set_override('track_progress', True,
+                               group='tasks_filesync')
+
+        self.assertIsInstance(syncbackend.get_backend('rsync'),
+                              filesync.RsyncBackend)
+        self.assertIsInstance(syncbackend.get_backend('delta'),
+                              deltasync.DeltaBackend)
+
+        content = _content(3000)
+        self._source(content)
+        media_file = models.MediaFile.make_empty()
+        media_file.filename = 'media.mp4'
+        media_file.file_path = self.src_dir
+        media_file.synced = False
+
+        files = filesync.SyncFile(media_file)()
+        self.assertTrue(files[0].synced)
+        self.assertEqual(self._read('media.mp4'), content)
+
+    def test_backend_dryrun(self):
+        self.CONF.set_override('sync_path', self.src_dir, group='tasks')
+        self.CONF.set_override('remote_path', self.dest_dir,
+                               group='tasks_filesync')
+        self.CONF.set_override('backend', 'delta', group='tasks_filesync')
+        self.CONF.set_override('dryrun', True, group='tasks_filesync')
+
+        self._source(_content(3000))
+        media_file = models.MediaFile.make_empty()
+        media_file.filename = 'media.mp4'
+        media_file.file_path = self.src_dir
+        media_file.synced = False
+
+        filesync.SyncFile(media_file)()
+        self.assertEqual(os.listdir(self.dest_dir), [])
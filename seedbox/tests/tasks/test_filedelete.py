@@ -1,5 +1,7 @@
 import os
 
+import mock
+
 from seedbox.db import models
 from seedbox.tasks import filedelete
 from seedbox.tests import test
@@ -13,20 +15,72 @@ class FileDeleteTest(test.ConfiguredBaseTestCase):
         if not os.path.exists(self.CONF.tasks.sync_path):
             os.mkdir(self.CONF.tasks.sync_path)
 
-        self.media_file = models.MediaFile.make_empty()
-        self.media_file.synced = 1
-        self.media_file.filename = 'fake_copy.mp4'
-        self.media_file.file_path = self.CONF.tasks.sync_path
+        self.media_file = self._media('fake_copy.mp4')
+
+    def _media(self, filename):
+        media_file = models.MediaFile.make_empty()
+        media_file.synced = 1
+        media_file.filename = filename
+        media_file.file_path = self.CONF.tasks.sync_path
 
-        open(os.path.join(self.CONF.tasks.sync_path,
-                          'fake_copy.mp4'), 'w').close()
+        path = os.path.join(self.CONF.tasks.sync_path, filename)
+        if not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        open(path, 'w').close()
+        return media_file
 
     def test_actionable(self):
         self.assertTrue(filedelete.DeleteFile.is_actionable(self.media_file))
 
+    def test_create_tasks(self):
+        other = self._media('other.mp4')
+        other.synced = 0
+        tasks = filedelete.DeleteFile.create_tasks([self.media_file, other])
+        self.assertEqual(len(tasks), 1)
+        self.assertEqual(tasks[0].media_files, [self.media_file])
+
+        self.assertEqual(filedelete.DeleteFile.create_tasks([other]), [])
+
     def test_execute(self):
-        task = filedelete.DeleteFile(self.media_file)
+        task = filedelete.DeleteFile([self.media_file])
 
         task()
         self.assertFalse(os.path.exists(
             os.path.join(self.CONF.tasks.sync_path, 'fake_copy.mp4')))
+
+    def test_execute_batch(self):
+        medias = [self.media_file,
+                  self._media('extracted/a.mkv'),
+                  self._media('extracted/sub/b.mkv'),
+                  self._media('kept/c.mkv')]
+        open(os.path.join(self.CONF.tasks.sync_path, 'kept', 'other'),
+             'w').close()
+        # already removed files are ignored
+        os.remove(os.path.join(self.CONF.tasks.sync_path, 'extracted',
+                               'a.mkv'))
+
+        results = filedelete.DeleteFile(medias)()
+        self.assertEqual(len(results), 4)
+        self.assertFalse([mf for mf in results if mf.error_msg])
+        self.assertFalse(os.path.exists(
+            os.path.join(self.CONF.tasks.sync_path, 'extracted')))
+        self.assertEqual(
+            os.listdir(os.path.join(self.CONF.tasks.sync_path, 'kept')),
+            ['other'])
+        self.assertTrue(os.path.exists(self.CONF.tasks.sync_path))
+
+    def test_execute_failure(self):
+        other = self._media('other.mp4')
+        real_remove = os.remove
+
+        def _remove(path):
+            if path.endswith('other.mp4'):
+                raise OSError(13, 'permission denied')
+            real_remove(path)
+
+        with mock.patch.object(filedelete.os, 'remove', _remove):
+            results = filedelete.DeleteFile([self.media_file, other])()
+
+        self.assertIsNone(results[0].error_msg)
+        self.assertIsNotNone(results[1].error_msg)
+        self.assertFalse(results[1].retryable)
@@ -1,6 +1,8 @@
 import os
+import subprocess
 
 from seedbox.db import models
+from seedbox.tasks import deltasync
 from seedbox.tasks import filesync
 from seedbox.tests import test
 
@@ -91,11 +93,34 @@ class FileSyncTest(test.ConfiguredBaseTestCase):
         self.assertIsNotNone(task.cmd)
         self.assertIn('rsync', task.cmd)
 
+    def test_schedule(self):
+        task = filesync.SyncFile(self.media_file)
+        task.schedule(2)
+        self.assertFalse([opt for opt in task.cmd if '--bwlimit' in opt])
+
+        self.CONF.set_override('bwlimit', 1000, group='tasks_filesync')
+        task.schedule(2)
+        self.assertIn('--bwlimit=500', task.cmd)
+
     def test_destination(self):
         task = filesync.SyncFile(self.media_file)
         self.assertIsNotNone(task.destination)
         self.assertIn('fake_user', task.destination)
 
+    def test_is_transient(self):
+        task = filesync.SyncFile(self.media_file)
+        self.assertTrue(task.is_transient(
+            subprocess.CalledProcessError(255, task.cmd)))
+        self.assertTrue(task.is_transient(
+            subprocess.CalledProcessError(30, task.cmd)))
+        self.assertFalse(task.is_transient(
+            subprocess.CalledProcessError(3, task.cmd)))
+        self.assertTrue(task.is_transient(
+            deltasync.DeltaTransferError('connection closed')))
+        self.assertFalse(task.is_transient(
+            deltasync.DeltaSyncError('checksum mismatch')))
+        self.assertFalse(task.is_transient(ValueError()))
+
     def test_execute(self):
         task = filesync.SyncFile(self.media_file)
 
@@ -103,10 +128,32 @@ class FileSyncTest(test.ConfiguredBaseTestCase):
             class ProcessLogging(object):
 
                 @staticmethod
-                def execute(cmd):
+                def execute(cmd, progress=None):
                     pass
 
         self.patch(filesync, 'subprocessext', Dummy)
         files = task()
         print(files[0])
         self.assertTrue(files[0].synced)
+
+    def test_execute_track_progress(self):
+        self.CONF.set_override('track_progress',
+                               True,
+                               group='tasks_filesync')
+        task = filesync.SyncFile(self.media_file)
+        self.assertIn('--info=progress2', task.cmd)
+
+        lines = []
+
+        class Dummy(object):
+            class ProcessLogging(object):
+
+                @staticmethod
+                def execute(cmd, progress=None):
+                    lines.append(progress)
+                    progress('  56,328,192  48%   53.50MB/s    0:01:05')
+
+        self.patch(filesync, 'subprocessext', Dummy)
+        files = task()
+        self.assertTrue(files[0].synced)
+        self.assertEqual(lines[0].progress.percent, 48)
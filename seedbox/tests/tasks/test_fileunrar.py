@@ -1,5 +1,8 @@
 from __future__ import print_function
 import os
+import sys
+
+import mock
 
 from seedbox.db import models
 from seedbox.tasks import fileunrar
@@ -51,7 +54,7 @@ class FileUnrarTest(test.ConfiguredBaseTestCase):
     def test_execute(self):
         task = fileunrar.UnrarFile(self.media_file)
 
-        self.patch(fileunrar, 'rarfile', FakeRarfile)
-        files = task()
+        with mock.patch.dict(sys.modules, {'rarfile': FakeRarfile}):
+            files = task()
 
         self.assertEqual(len(files), 2)
@@ -0,0 +1,68 @@
+from seedbox import db
+from seedbox.db import models
+from seedbox.tasks import progress
+from seedbox.tests import test
+
+
+class ProgressTest(test.ConfiguredBaseTestCase):
+
+    def setUp(self):
+        super(ProgressTest, self).setUp()
+
+        self.patch(db, '_DBAPI', {})
+        self.dbapi = db.dbapi(self.CONF)
+
+        self.media_file = self.dbapi.save_media(
+            models.MediaFile(media_id=None,
+                             torrent_id=None,
+                             filename='movie-1.mp4',
+                             file_ext='.mp4',
+                             file_path=self.CONF.tasks.sync_path))
+
+    def test_parse_progress(self):
+        self.assertIsNone(progress.parse_progress('sending incremental'))
+
+        self.assertEqual(
+            progress.parse_progress('     32,768   0%    0.00kB/s    0:00:00'),
+            (32768, 0, 0.0, 0))
+
+        self.assertEqual(
+            progress.parse_progress(
+                '  56,328,192  48%   53.50MB/s    0:01:05'),
+            (56328192, 48, 53.5 * 1024 ** 2, 65))
+
+        self.assertEqual(
+            progress.parse_progress(
+                ' 117,440,512 100%   55.12MB/s    0:00:02 '
+                '(xfr#1, to-chk=0/1)'),
+            (117440512, 100, 55.12 * 1024 ** 2, 0))
+
+    def test_recorder(self):
+        recorder = progress.ProgressRecorder(self.media_file, interval=3600)
+
+        recorder('sending incremental file list')
+        self.assertIsNone(
+            self.dbapi.get_sync_progress(self.media_file.media_id))
+
+        recorder('  56,328,192  48%   53.50MB/s    0:01:05')
+        saved = self.dbapi.get_sync_progress(self.media_file.media_id)
+        self.assertEqual(saved.bytes_transferred, 56328192)
+        self.assertEqual(saved.eta, 65)
+
+        # within the interval so only captured in memory
+        recorder(' 117,440,512 100%   55.12MB/s    0:00:02 (xfr#1)')
+        saved = self.dbapi.get_sync_progress(self.media_file.media_id)
+        self.assertEqual(saved.percent, 48)
+
+        recorder.flush()
+        saved = self.dbapi.get_sync_progress(self.media_file.media_id)
+        self.assertEqual(saved.percent, 100)
+        self.assertEqual(saved.eta, 0)
+        self.assertIsNotNone(saved.created_at)
+
+    def test_recorder_unsaved_media(self):
+        media_file = models.MediaFile.make_empty()
+        recorder = progress.ProgressRecorder(media_file)
+
+        recorder('  56,328,192  48%   53.50MB/s    0:01:05')
+        self.assertEqual(recorder.progress.percent, 48)
@@ -55,6 +55,16 @@ class SubprocessExtTest(test.ConfiguredBaseTestCase):
             # it will complete with no return value or an exception
             self.assertTrue(True)
 
+    def test_progress_cmd(self):
+        lines = []
+        cmd = ['ls', '-la', self.py_lib]
+        subprocessext.ProcessLogging.execute(cmd, lines.append)
+        self.assertTrue(lines)
+
+        with testtools.ExpectedException(subprocess.CalledProcessError):
+            subprocessext.ProcessLogging.execute(
+                ['ls', 'some_unknown_or_missing_file'], lines.append)
+
     def test_bad_cmd(self):
         cmd = ['ls', 'some_unknown_or_missing_file']
         # should result in exception because it is a bad command!!!
@@ -1,5 +1,7 @@
 from __future__ import print_function
+import errno
 import os
+import socket
 from testtools import matchers
 
 from seedbox.db import models
@@ -19,6 +21,12 @@ class ExceptionTask(base.BaseTask):
         raise RuntimeError('task failed')
 
 
+class TransientTask(base.BaseTask):
+
+    def execute(self):
+        raise socket.error(errno.ECONNRESET, 'connection reset')
+
+
 class BaseTasksTest(test.ConfiguredBaseTestCase):
 
     def test_task_str(self):
@@ -62,3 +70,22 @@ class BaseTasksTest(test.ConfiguredBaseTestCase):
         medias = task()
         self.assertThat(medias[0].error_msg.strip(),
                         matchers.EndsWith('task failed'))
+        self.assertFalse(medias[0].retryable)
+
+    def test_execute_transient(self):
+
+        mf = models.MediaFile.make_empty()
+        task = TransientTask(mf)
+
+        medias = task()
+        self.assertIsNotNone(medias[0].error_msg)
+        self.assertTrue(medias[0].retryable)
+
+    def test_is_transient(self):
+        task = SampleTask(None)
+        self.assertTrue(task.is_transient(socket.timeout()))
+        self.assertTrue(task.is_transient(
+            OSError(errno.ETIMEDOUT, 'timed out')))
+        self.assertFalse(task.is_transient(
+            OSError(errno.ENOENT, 'no such file')))
+        self.assertFalse(task.is_transient(RuntimeError('task failed')))
@@ -1,7 +1,12 @@
+import datetime
+
 import mock
+from oslo_config import cfg
 
 from seedbox import cli
+from seedbox.common import lock
 from seedbox import db
+from seedbox import options
 from seedbox.tests import test
 
 
@@ -15,3 +20,40 @@ class CliTestCase(test.ConfiguredBaseTestCase):
     @mock.patch('seedbox.service.prepare_service')
     def test_cli(self, mock_service):
         self.assertIsNone(cli.main())
+
+    def test_cli_default_command(self):
+        # e.g. seedmgr run by cron without any arguments
+        conf = cfg.ConfigOpts()
+        conf.register_cli_opts(options.CLI_OPTS)
+        conf([], project='seedbox', default_config_files=[])
+        self.assertEqual(conf.command, 'process')
+
+    @mock.patch('seedbox.process.worker.run')
+    @mock.patch('seedbox.service.prepare_service')
+    def test_cli_worker(self, mock_service, mock_run):
+        self.CONF.set_override('command', 'worker')
+        self.assertIsNone(cli.main())
+        mock_run.assert_called_once_with()
+
+    @mock.patch('seedbox.process.start')
+    @mock.patch('seedbox.service.prepare_service')
+    def test_cli_locked(self, mock_service, mock_start):
+        with lock.SingletonLock(cli.LOCK_PATH):
+            with mock.patch.object(cli.LOG, 'info') as info:
+                self.assertIsNone(cli.main())
+                self.assertTrue(info.called)
+        self.assertFalse(mock_start.called)
+
+        self.assertIsNone(cli.main())
+        self.assertTrue(mock_start.called)
+
+    @mock.patch('seedbox.process.start')
+    @mock.patch('seedbox.service.prepare_service')
+    def test_cli_locked_stale(self, mock_service, mock_start):
+        record = {'pid': 1, 'heartbeat_at': datetime.datetime(2015, 1, 1)}
+        with mock.patch.object(lock.SingletonLock, 'acquire',
+                               side_effect=lock.AlreadyLocked(record)):
+            with mock.patch.object(cli.LOG, 'warning') as warning:
+                self.assertIsNone(cli.main())
+                self.assertTrue(warning.called)
+        self.assertFalse(mock_start.called)
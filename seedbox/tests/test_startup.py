@@ -0,0 +1,94 @@
+"""
+Test case for the startup cost of seedmgr
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from seedbox.tests import test
+
+# heavy dependencies only imported once needed
+DEFERRED_MODULES = ['concurrent.futures.process',
+                    'migrate',
+                    'rarfile',
+                    'seedbox.process.worker',
+                    'sqlalchemy.dialects.mysql',
+                    'sqlalchemy.dialects.postgresql',
+                    'xworkflows']
+
+# microseconds spent importing seedbox.cli, including its dependencies;
+# generous to allow for slow machines, catching only gross regressions.
+IMPORT_BUDGET = 1500000
+
+NO_WORK_RUN = """
+import sys
+from oslo_config import cfg
+from seedbox import cli
+cfg.CONF(['--config-dir', sys.argv[1]], project='seedbox',
+         default_config_files=[])
+cli._process()
+"""
+
+CONFIG = """
+[DEFAULT]
+base_path = {0}
+[torrent]
+torrent_path = {0}
+media_paths = {0}
+incomplete_path = {0}
+[database]
+connection = sqlite:///{0}/seedbox.db
+"""
+
+
+def _import_times(*args):
+    """Runs python with -X importtime.
+
+    :return: cumulative microseconds spent importing each module
+    :rtype: dict
+    """
+    output = subprocess.check_output(
+        [sys.executable, '-X', 'importtime'] + list(args),
+        stderr=subprocess.STDOUT, universal_newlines=True)
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, _, cumulative, name = [col.strip() for col in
+                                  line.replace('import time:', '|', 1)
+                                  .split('|')]
+        if cumulative.isdigit():
+            times[name] = int(cumulative)
+    return times
+
+
+class StartupTestCase(test.BaseTestCase):
+
+    def setUp(self):
+        super(StartupTestCase, self).setUp()
+        if sys.version_info < (3, 7):
+            self.skipTest('-X importtime requires python 3.7')
+
+    def test_import(self):
+        times = _import_times('-c', 'import seedbox.cli')
+        self.assertIn('seedbox.process', times)
+        for name in DEFERRED_MODULES:
+            self.assertNotIn(name, times)
+        self.assertLess(times['seedbox.cli'], IMPORT_BUDGET)
+
+    def test_no_work_run(self):
+        base_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, base_dir, ignore_errors=True)
+        with open(os.path.join(base_dir, 'seedbox.conf'), 'w') as conf:
+            conf.write(CONFIG.format(base_dir))
+
+        # the first run creates the database
+        times = _import_times('-c', NO_WORK_RUN, base_dir)
+        self.assertIn('migrate', times)
+
+        times = _import_times('-c', NO_WORK_RUN, base_dir)
+        self.assertIn('sqlalchemy', times)
+        for name in DEFERRED_MODULES:
+            self.assertNotIn(name, times)
@@ -35,6 +35,25 @@ class TorrentLoaderTest(test.ConfiguredBaseTestCase):
     def test_load_torrents(self):
         loader.load_torrents(self.dbapi)
 
+    def test_load_torrents_priority(self):
+        self.CONF.set_override('priority_rules', {'*': '5'}, group='process')
+        self.patch(loader, '_is_torrent_downloading', lambda items: False)
+
+        names = sorted(os.path.basename(tor) for tor in
+                       glob.glob(os.path.join(torrent_path, '*.torrent')))
+        _tor = models.Torrent.make_empty()
+        _tor.name = names[0]
+        _tor.priority = 1
+        self.dbapi.save_torrent(_tor)
+
+        loader.load_torrents(self.dbapi)
+
+        torrents = list(self.dbapi.get_torrents({'=': {'invalid': False}},
+                                                with_media=False))
+        self.assertTrue(torrents)
+        for tor in torrents:
+            self.assertEqual(tor.priority, 1 if tor.name == names[0] else 5)
+
     def test_load_torrents_still_downloading(self):
 
         def _is_torrent_downloading(media_items):
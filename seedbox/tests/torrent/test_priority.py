@@ -0,0 +1,45 @@
+import datetime
+
+from seedbox.db import models
+from seedbox.tests import test
+from seedbox.torrent import priority
+
+
+class PriorityTest(test.ConfiguredBaseTestCase):
+
+    def test_assign(self):
+        self.assertEqual(priority.assign('show.S01E02.mkv.torrent', 0,
+                                         self.CONF), 0)
+
+        self.CONF.set_override('priority_rules',
+                               {'*S[0-9][0-9]E[0-9][0-9]*': '10',
+                                '*.mkv*': '2',
+                                '*archive*': '-5'},
+                               group='process')
+        self.assertEqual(priority.assign('show.S01E02.mkv.torrent', 0,
+                                         self.CONF), 12)
+        self.assertEqual(priority.assign('archive.torrent', 0,
+                                         self.CONF), -5)
+
+    def test_assign_large(self):
+        self.CONF.set_override('large_torrent_size', 100, group='process')
+        size = 100 * priority.MEGABYTE
+
+        self.assertEqual(priority.assign('archive.torrent', size,
+                                         self.CONF), 0)
+        self.assertEqual(priority.assign('archive.torrent', size + 1,
+                                         self.CONF), -10)
+
+    def test_effective(self):
+        now = datetime.datetime(2015, 1, 1, 12, 0)
+        torrent = models.Torrent(torrent_id=1, name='fake.torrent',
+                                 created_at=now - datetime.timedelta(hours=3))
+
+        self.assertEqual(priority.effective(torrent, 0, now), 0)
+        self.assertEqual(priority.effective(torrent, 2, now), 6)
+
+        torrent.priority = -10
+        self.assertEqual(priority.effective(torrent, 2, now), -4)
+
+        torrent.created_at = None
+        self.assertEqual(priority.effective(torrent, 2, now), -10)
@@ -13,6 +13,7 @@ from seedbox.common import tools
 from seedbox import constants
 from seedbox.db import models
 from seedbox.torrent import parser
+from seedbox.torrent import priority
 
 LOG = logging.getLogger(__name__)
 
@@ -29,12 +30,18 @@ def load_torrents(dbapi):
     a record in the cache for each torrent.
     """
 
+    # torrents previously parsed are skipped without fetching each one
+    parsed = set(tor.name for tor in dbapi.get_torrents_parsed())
+
     for torrent_file in glob.glob(os.path.join(cfg.CONF.torrent.torrent_path,
                                                '*.torrent')):
 
+        torrent_name = os.path.basename(torrent_file)
+        if torrent_name in parsed:
+            continue
+
         # get the entry in the cache or creates it if it doesn't exist
-        torrent = dbapi.fetch_or_create_torrent(
-            os.path.basename(torrent_file))
+        torrent = dbapi.fetch_or_create_torrent(torrent_name)
 
         if _is_parsing_required(torrent):
 
@@ -61,6 +68,13 @@ def load_torrents(dbapi):
             dbapi.bulk_create_medias(
                 _filter_media(torrent.torrent_id, media_items))
 
+            # priority set beforehand (e.g. using the admin UI) is kept
+            if torrent.priority is None:
+                dbapi.bulk_save_torrents(
+                    {'priority': priority.assign(
+                        torrent_name, sum(size for _, size in media_items))},
+                    {'=': {'id': torrent.torrent_id}})
+
 
 def _is_parsing_required(torrent):
     """Determines if parsing is required.
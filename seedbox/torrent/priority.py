@@ -0,0 +1,61 @@
+"""Determines the priority of processing torrents.
+
+The priority of a torrent is assigned once the torrent is parsed, based on
+the configured rules for the name and size of the torrent; afterwards the
+priority may be changed at will (e.g. using the admin UI). While waiting to
+be processed a torrent gains priority, such that torrents of low priority
+are never starved by a steady stream of torrents of higher priority.
+"""
+import fnmatch
+import logging
+
+from oslo_config import cfg
+import six
+
+from seedbox.common import timeutil
+
+LOG = logging.getLogger(__name__)
+
+cfg.CONF.import_group('process', 'seedbox.options')
+
+MEGABYTE = 1024 * 1024
+
+
+def assign(name, size, conf=cfg.CONF):
+    """Determines the priority of a torrent using the configured rules.
+
+    :param str name: name of the torrent
+    :param int size: total size of the files of the torrent in bytes
+    :param oslo_config.cfg.ConfigOpts conf: an instance of configuration
+    :return: priority of the torrent
+    :rtype: int
+    """
+    priority = 0
+    for pattern, value in six.iteritems(conf.process.priority_rules):
+        if fnmatch.fnmatch(name, pattern):
+            priority += int(value)
+
+    if (conf.process.large_torrent_size and
+            size > conf.process.large_torrent_size * MEGABYTE):
+        priority += conf.process.large_torrent_priority
+
+    LOG.debug('priority of torrent %s: %d', name, priority)
+    return priority
+
+
+def effective(torrent, aging, now=None):
+    """Determines the priority of a torrent including the time waited.
+
+    :param torrent: an instance of a torrent
+    :type torrent: :class:`~seedbox.db.models.Torrent`
+    :param int aging: priority gained for each hour waited
+    :param datetime.datetime now: current date (default: utcnow)
+    :return: priority of the torrent
+    :rtype: float
+    """
+    priority = torrent.priority or 0
+    if aging and torrent.created_at is not None:
+        waited = timeutil.delta_seconds(torrent.created_at,
+                                        now or timeutil.utcnow())
+        priority += aging * max(waited, 0) / 3600.0
+    return priority
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+"""Measures the latency of database API calls.
+
+Creates a database populated with a realistic number of torrents and media
+files, then times the DBApi calls made while processing torrents using each
+of the supported connection pools::
+
+    python tools/db_benchmark.py --torrents 2000 --medias 5 --repeat 200
+
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import shutil
+import tempfile
+import timeit
+
+from oslo_config import cfg
+
+from seedbox import db
+from seedbox.db import models
+from seedbox import options
+
+POOLS = ['null', 'static', 'singleton', 'queue']
+
+
+def _populate(dbapi, torrents, medias):
+    for idx in range(torrents):
+        torrent = dbapi.save_torrent(
+            models.Torrent(torrent_id=None,
+                           name='torrent-{0}.torrent'.format(idx),
+                           state='active' if idx % 4 else 'done'))
+        dbapi.bulk_create_medias(
+            [models.MediaFile(media_id=None,
+                              torrent_id=torrent.torrent_id,
+                              filename='media-{0}-{1}.mkv'.format(idx, num),
+                              file_ext='.mkv',
+                              file_path='/tmp/sync',
+                              size=1024 * 1024 * 700)
+             for num in range(medias)])
+
+
+def _benchmark(dbapi, repeat):
+    torrent = dbapi.get_torrent_by_name('torrent-1.torrent')[0]
+    media = list(dbapi.get_medias_by_torrent(torrent.torrent_id))[0]
+
+    calls = [
+        ('get_torrent', lambda: dbapi.get_torrent(torrent.torrent_id)),
+        ('get_medias_by', lambda: list(dbapi.get_medias_by(
+            torrent.torrent_id, missing=False, skipped=False))),
+        ('save_media', lambda: dbapi.save_media(media)),
+        ('get_appstate', lambda: dbapi.get_appstate('last_backup_date')),
+        ('get_torrents_active', lambda: list(dbapi.get_torrents_active())),
+    ]
+
+    results = []
+    for name, call in calls:
+        # the active torrents query is far more expensive than the others
+        number = max(1, repeat // 20) if name == 'get_torrents_active' \
+            else repeat
+        elapsed = min(timeit.repeat(call, number=number, repeat=3))
+        results.append((name, elapsed / number * 1000))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--torrents', type=int, default=2000,
+                        help='number of torrents to create')
+    parser.add_argument('--medias', type=int, default=5,
+                        help='number of media files per torrent')
+    parser.add_argument('--repeat', type=int, default=200,
+                        help='number of calls made per measurement')
+    parser.add_argument('--pools', default=','.join(POOLS),
+                        help='comma separated list of pools to measure')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='seedbox-bench-')
+    conf = cfg.ConfigOpts()
+    try:
+        for opts_group, opts in options.list_opts():
+            conf.register_opts(opts, group=opts_group)
+        connection = 'sqlite:///' + os.path.join(workdir, 'torrent.db')
+        conf.set_override('connection', connection, group='database')
+
+        print('populating {0} torrents with {1} media files each...'.format(
+            args.torrents, args.medias))
+        _populate(db.dbapi(conf), args.torrents, args.medias)
+        db._DBAPI.clear()
+
+        report = {}
+        for pool in args.pools.split(','):
+            conf.set_override('pool_class', pool, group='database')
+            report[pool] = dict(_benchmark(db.dbapi(conf), args.repeat))
+            db._DBAPI.clear()
+
+        pools = args.pools.split(',')
+        print('\n{0:<22}'.format('call (ms/call)') +
+              ''.join('{0:>12}'.format(pool) for pool in pools))
+        for name in report[pools[0]]:
+            print('{0:<22}'.format(name) +
+                  ''.join('{0:>12.3f}'.format(report[pool][name])
+                          for pool in pools))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
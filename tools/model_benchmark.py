@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+"""Measures the cost of converting between database rows and api models.
+
+Times :func:`~seedbox.db.sqlalchemy.model_util.from_db` and
+:func:`~seedbox.db.sqlalchemy.model_util.to_db` for a number of MediaFile
+rows, and for Torrent rows holding media files::
+
+    python tools/model_benchmark.py --rows 10000
+
+"""
+from __future__ import print_function
+
+import argparse
+import datetime
+import timeit
+
+from seedbox.db.sqlalchemy import model_util
+from seedbox.db.sqlalchemy import models as db_model
+
+
+def _media_rows(count, torrent_id=1):
+    return [db_model.MediaFile(id=idx,
+                               torrent_id=torrent_id,
+                               filename='media-{0}.mkv'.format(idx),
+                               file_ext='.mkv',
+                               file_path='/tmp/sync',
+                               size=1024 * 1024 * 700,
+                               compressed=False,
+                               synced=False,
+                               missing=False,
+                               skipped=False,
+                               total_time=1.5)
+            for idx in range(count)]
+
+
+def _torrent_rows(count, medias):
+    now = datetime.datetime.utcnow()
+    return [db_model.Torrent(id=idx,
+                             name='torrent-{0}.torrent'.format(idx),
+                             created_at=now,
+                             updated_at=now,
+                             state='active',
+                             media_files=_media_rows(medias, idx))
+            for idx in range(count)]
+
+
+def _measure(func, items, repeat):
+    elapsed = min(timeit.repeat(lambda: [func(item) for item in items],
+                                number=1, repeat=repeat))
+    return elapsed * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000,
+                        help='number of media file rows to convert')
+    parser.add_argument('--medias', type=int, default=5,
+                        help='number of media files per torrent')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='number of measurements; best is reported')
+    args = parser.parse_args()
+
+    medias = _media_rows(args.rows)
+    torrents = _torrent_rows(args.rows // args.medias, args.medias)
+    api_medias = [model_util.from_db(row) for row in medias]
+
+    print('{0:<40}{1:>10}'.format('conversion', 'ms'))
+    print('{0:<40}{1:>10.1f}'.format(
+        'from_db {0} MediaFile'.format(len(medias)),
+        _measure(model_util.from_db, medias, args.repeat)))
+    print('{0:<40}{1:>10.1f}'.format(
+        'from_db {0} Torrent ({1} media each)'.format(len(torrents),
+                                                      args.medias),
+        _measure(model_util.from_db, torrents, args.repeat)))
+    print('{0:<40}{1:>10.1f}'.format(
+        'to_db {0} MediaFile'.format(len(api_medias)),
+        _measure(model_util.to_db, api_medias, args.repeat)))
+
+
+if __name__ == '__main__':
+    main()
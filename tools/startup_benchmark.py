@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+"""Measures the cost of importing seedmgr and its dependencies.
+
+Runs ``python -X importtime`` (python 3.7+) in a new interpreter a number of
+times, reporting the best time of the modules taking the longest to import
+including the modules they import::
+
+    python tools/startup_benchmark.py --module seedbox.cli --top 20
+
+"""
+from __future__ import print_function
+
+import argparse
+import subprocess
+import sys
+
+
+def _import_times(module):
+    output = subprocess.check_output(
+        [sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+        stderr=subprocess.STDOUT, universal_newlines=True)
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, self_us, cumulative_us, name = [
+            col.strip() for col in
+            line.replace('import time:', '|', 1).split('|')]
+        if cumulative_us.isdigit():
+            times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--module', default='seedbox.cli',
+                        help='module to import')
+    parser.add_argument('--top', type=int, default=20,
+                        help='number of modules reported')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='number of measurements; best is reported')
+    args = parser.parse_args()
+
+    best = {}
+    for _ in range(args.repeat):
+        for name, times in _import_times(args.module).items():
+            best[name] = min(best.get(name, times), times,
+                             key=lambda t: t[1])
+
+    print('{0:<50}{1:>10}{2:>10}'.format('module', 'self ms', 'total ms'))
+    for name, (self_us, cumulative_us) in sorted(
+            best.items(), key=lambda item: item[1][1],
+            reverse=True)[:args.top]:
+        print('{0:<50}{1:>10.1f}{2:>10.1f}'.format(
+            name, self_us / 1000.0, cumulative_us / 1000.0))
+
+
+if __name__ == '__main__':
+    main()